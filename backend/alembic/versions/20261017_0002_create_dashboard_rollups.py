@@ -0,0 +1,32 @@
+"""create dashboard rollups table
+
+Revision ID: 20261017_0002
+Revises: 20260112_0001
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0002"
+down_revision = "20260112_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Filled by `python -m app.cli rebuild-rollups` (run from entrypoint.sh).
+    op.create_table(
+        "dashboard_rollups",
+        sa.Column("metric", sa.String(length=16), primary_key=True),
+        sa.Column("watermark_enabled", sa.Boolean(), primary_key=True),
+        sa.Column("bucket", sa.Integer(), primary_key=True),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dashboard_rollups")
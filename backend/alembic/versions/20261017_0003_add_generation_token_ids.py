@@ -0,0 +1,25 @@
+"""add generations.output_token_ids
+
+Revision ID: 20261017_0003
+Revises: 20261017_0002
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0003"
+down_revision = "20261017_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("generations", sa.Column("output_token_ids", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("generations", "output_token_ids")
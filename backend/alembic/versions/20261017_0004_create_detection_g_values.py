@@ -0,0 +1,37 @@
+"""add detection_g_values
+
+Revision ID: 20261017_0004
+Revises: 20261017_0003
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0004"
+down_revision = "20261017_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "detection_g_values",
+        sa.Column(
+            "detection_id",
+            sa.Integer(),
+            sa.ForeignKey("detections.detection_id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("num_positions", sa.Integer(), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.Column("g_values", sa.LargeBinary(), nullable=False),
+        sa.Column("mask", sa.LargeBinary(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("detection_g_values")
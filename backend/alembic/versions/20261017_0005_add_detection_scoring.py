@@ -0,0 +1,28 @@
+"""add detections.scoring
+
+Revision ID: 20261017_0005
+Revises: 20261017_0004
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0005"
+down_revision = "20261017_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "detections",
+        sa.Column("scoring", sa.String(length=16), nullable=False, server_default=sa.text("'mean'")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("detections", "scoring")
@@ -0,0 +1,25 @@
+"""add generations.attack_seed
+
+Revision ID: 20261017_0006
+Revises: 20261017_0005
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0006"
+down_revision = "20261017_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("generations", sa.Column("attack_seed", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("generations", "attack_seed")
@@ -0,0 +1,38 @@
+"""create watermark_keys, add generations.watermark_key_scheme
+
+Revision ID: 20261018_0008
+Revises: 20261018_0007
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261018_0008"
+down_revision = "20261018_0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "watermark_keys",
+        sa.Column("scheme", sa.String(length=16), primary_key=True),
+        sa.Column("name", sa.String(length=256), primary_key=True),
+        sa.Column("depth", sa.Integer(), primary_key=True),
+        sa.Column("keys", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    # Every existing row was generated with the character-sum derivation.
+    op.add_column(
+        "generations",
+        sa.Column("watermark_key_scheme", sa.String(length=16), nullable=False, server_default=sa.text("'legacy'")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("generations", "watermark_key_scheme")
+    op.drop_table("watermark_keys")
@@ -0,0 +1,25 @@
+"""add generations.seed
+
+Revision ID: 20261018_0009
+Revises: 20261018_0008
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261018_0009"
+down_revision = "20261018_0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("generations", sa.Column("seed", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("generations", "seed")
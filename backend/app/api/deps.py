@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.session import get_session
+from app.db.session import get_async_session, get_session
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -14,3 +15,10 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    db = get_async_session()
+    try:
+        yield db
+    finally:
+        await db.close()
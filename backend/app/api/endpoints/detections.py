@@ -1,26 +1,45 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db
+from app.api.deps import get_async_db
+from app.api.pagination import TotalMode, count_total, paginate
 from app.models.detection import Detection
+from app.models.detection_g_values import DetectionGValues
 from app.schemas.common import Page, make_preview
-from app.schemas.detections import DetectionListItem, DetectionOut
+from app.schemas.detections import (
+    DetectionAttributionCreate,
+    DetectionAttributionItem,
+    DetectionAttributionOut,
+    DetectionBatchCreate,
+    DetectionBatchOut,
+    DetectionListItem,
+    DetectionOut,
+    DetectionRescoreCreate,
+    DetectionRescoreItem,
+    DetectionRescoreOut,
+)
+from app.services import scoring
+from app.services.ai import attribute_text
+from app.services.detections import detect_and_store
 
 router = APIRouter()
 
 
 @router.get("", response_model=Page[DetectionListItem])
-def list_detections(
+async def list_detections(
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page; overrides page"),
+    total_mode: TotalMode = Query(default="exact"),
     is_watermarked: Optional[bool] = Query(default=None),
     min_confidence: Optional[float] = Query(default=None, ge=0.0, le=1.0),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     stmt = select(Detection)
     if is_watermarked is not None:
@@ -28,14 +47,12 @@ def list_detections(
     if min_confidence is not None:
         stmt = stmt.where(Detection.confidence >= min_confidence)
 
-    total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+    filtered = is_watermarked is not None or min_confidence is not None
+    total = await db.run_sync(count_total, stmt, Detection.__tablename__, filtered=filtered, mode=total_mode)
 
-    stmt = (
-        stmt.order_by(Detection.created_at.desc(), Detection.detection_id.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
+    rows, next_cursor = await db.run_sync(
+        paginate, stmt, Detection.created_at, Detection.detection_id, page=page, page_size=page_size, cursor=cursor
     )
-    rows = db.execute(stmt).scalars().all()
 
     items = [
         DetectionListItem(
@@ -44,17 +61,98 @@ def list_detections(
             created_at=r.created_at,
             input_text_preview=make_preview(r.input_text, 100),
             is_watermarked=r.is_watermarked,
+            scoring=r.scoring,
             z_score=r.z_score,
             confidence=r.confidence,
         )
         for r in rows
     ]
-    return Page(total=total, page=page, page_size=page_size, items=items)
+    return Page(total=total, page=page, page_size=page_size, items=items, next_cursor=next_cursor)
+
+
+@router.post("/batch", response_model=DetectionBatchOut)
+async def create_detections_batch(
+    payload: DetectionBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+) -> DetectionBatchOut:
+    """Score many generations/texts in one request; submit a ``detection_batch`` job for large ones."""
+    try:
+        return await detect_and_store(db, payload)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+
+@router.post("/attribution", response_model=DetectionAttributionOut)
+async def attribute_detection(payload: DetectionAttributionCreate) -> DetectionAttributionOut:
+    """Rank candidate watermark keys for a text; nothing is stored."""
+    keys = list(dict.fromkeys(payload.watermark_keys))
+    ranked = await attribute_text(
+        payload.text,
+        keys,
+        {"model": payload.model, "scoring": payload.scoring, "watermark_key_scheme": payload.watermark_key_scheme},
+    )
+    items = [
+        DetectionAttributionItem(
+            rank=rank,
+            watermark_key=result["watermark_key"],
+            is_watermarked=bool(result.get("is_watermarked")),
+            z_score=result.get("z_score"),
+            p_value=result.get("p_value"),
+            confidence=result.get("confidence"),
+        )
+        for rank, result in enumerate(ranked, start=1)
+    ]
+    return DetectionAttributionOut(scoring=payload.scoring, items=items)
+
+
+def _rescore(
+    rows: List[Tuple[bytes, bytes, int, int]], z_threshold: Optional[float], mode: str
+) -> List[Optional[Dict[str, Any]]]:
+    return scoring.score_rows([scoring.unpack_g_values(*row) for row in rows], z_threshold, mode=mode)
+
+
+@router.post("/rescore", response_model=DetectionRescoreOut)
+async def rescore_detections(
+    payload: DetectionRescoreCreate,
+    db: AsyncSession = Depends(get_async_db),
+) -> DetectionRescoreOut:
+    """Re-score stored detections from their persisted g-values, without the model.
+
+    Any scoring mode can be applied, whichever one the detection was created
+    with. Read-only: the stored Detection rows keep their original score.
+    """
+    ids = list(dict.fromkeys(payload.detection_ids))
+    stored = {
+        r.detection_id: r
+        for r in (await db.execute(select(DetectionGValues).where(DetectionGValues.detection_id.in_(ids)))).scalars()
+    }
+    found = [i for i in ids if i in stored]
+
+    items: List[DetectionRescoreItem] = []
+    if found:
+        rows = [(r.g_values, r.mask, r.num_positions, r.depth) for r in (stored[i] for i in found)]
+        # CPU-bound; kept off the event loop.
+        results = await asyncio.to_thread(_rescore, rows, payload.z_threshold, payload.scoring)
+        for detection_id, result in zip(found, results):
+            if result is None:
+                items.append(
+                    DetectionRescoreItem(
+                        detection_id=detection_id,
+                        is_watermarked=False,
+                        scoring=payload.scoring,
+                        z_score=0.0,
+                        confidence=0.0,
+                    )
+                )
+            else:
+                items.append(DetectionRescoreItem(detection_id=detection_id, **result))
+
+    return DetectionRescoreOut(items=items, missing=[i for i in ids if i not in stored])
 
 
 @router.get("/{detection_id}", response_model=DetectionOut)
-def get_detection(detection_id: int, db: Session = Depends(get_db)) -> Detection:
-    row = db.get(Detection, detection_id)
+async def get_detection(detection_id: int, db: AsyncSession = Depends(get_async_db)) -> Detection:
+    row = await db.get(Detection, detection_id)
     if row is None:
         raise HTTPException(status_code=404, detail="Detection not found")
     return row
@@ -1,60 +1,105 @@
 from __future__ import annotations
 
-from typing import Optional
+import json
+from typing import Any, AsyncIterator, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
-from app.api.deps import get_db
+from app.api.deps import get_async_db
+from app.api.pagination import TotalMode, count_total, paginate
+from app.db.session import get_async_session
 from app.models.generation import Generation
 from app.models.detection import Detection
-from app.schemas.attacks import AttackCreate
+from app.models.detection_g_values import DetectionGValues
+from app.schemas.attacks import AttackBatchCreate, AttackBatchOut, AttackCreate
 from app.schemas.common import Page
-from app.schemas.detections import DetectionOut
+from app.schemas.detections import DetectionOut, ScoringMode
 from app.schemas.generations import GenerationCreate, GenerationListItem, GenerationOut
-from app.services.ai import attack_text, detect_text, generate_text
-import sacrebleu
+from app.services.ai import detect_text, generate_text, generate_text_stream
+from app.services.ai import bleu_score as compute_bleu
+from app.services import attacks, rollups, scoring
+from app.services.generation_cache import generation_cache, request_key
+from app.services.generations import generate_one, generation_row, store_generations
+from app.services.tokens import unpack_token_ids
 
 router = APIRouter()
 
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post("", response_model=GenerationOut)
-async def create_generation(payload: GenerationCreate, db: Session = Depends(get_db)) -> Generation:
+async def create_generation(payload: GenerationCreate, db: AsyncSession = Depends(get_async_db)) -> Any:
+    # Only seeded requests are cached: an unseeded one asks for a fresh sample.
+    if payload.cache and payload.seed is not None:
+        key = request_key(payload)
+        generation_id, cache_hit = await generation_cache.get_or_create(key, lambda: generate_one(payload))
+        row = await db.get(Generation, generation_id)
+        if row is None:
+            # Deleted since it was cached; generate afresh.
+            generation_cache.discard(key)
+            generation_id, cache_hit = await generation_cache.get_or_create(key, lambda: generate_one(payload))
+            row = await db.get(Generation, generation_id)
+        return GenerationOut.model_validate(row).model_copy(update={"cache_hit": cache_hit})
+
     output = await generate_text(payload.input_text, payload.model_dump())
 
-    row = Generation(
-        original_id=None,
-        input_text=payload.input_text,
-        output_text=output,
-        model=payload.model,
-        quantization=payload.quantization,
-        temperature=payload.temperature,
-        top_k=payload.top_k,
-        top_p=payload.top_p,
-        max_tokens=payload.max_tokens,
-        watermark_enabled=payload.watermark_enabled,
-        context_width=payload.context_width,
-        tournament_size=payload.tournament_size,
-        g_value=payload.g_value,
-        watermark_key=payload.watermark_key,
-        attack_type=None,
-        attack_intensity=None,
-    )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
+    row = generation_row(payload, output)
+    await store_generations(db, [row])
+    await db.refresh(row)
     return row
 
 
+@router.post("/stream")
+async def stream_generation(payload: GenerationCreate) -> StreamingResponse:
+    """Stream watermarked output as Server-Sent Events.
+
+    Emits ``token`` events with text deltas, then a single ``done`` event carrying
+    the persisted generation. If the client disconnects first, decoding stops and
+    nothing is stored.
+    """
+    events = generate_text_stream(payload.input_text, payload.model_dump())
+    # Pull the first event eagerly so a full inference queue or a model load
+    # failure still surfaces as a regular HTTP error instead of a broken stream.
+    first = await events.__anext__()
+
+    async def event_source() -> AsyncIterator[str]:
+        try:
+            event, data = first
+            while event == "token":
+                yield _sse("token", {"text": data})
+                event, data = await events.__anext__()
+
+            async with get_async_session() as db:
+                row = generation_row(payload, data)
+                await store_generations(db, [row])
+                await db.refresh(row)
+            yield _sse("done", GenerationOut.model_validate(row).model_dump(mode="json"))
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("", response_model=Page[GenerationListItem])
-def list_generations(
+async def list_generations(
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page; overrides page"),
+    total_mode: TotalMode = Query(default="exact"),
     model: Optional[str] = Query(default=None),
     watermark_enabled: Optional[bool] = Query(default=None),
     attack_type: Optional[str] = Query(default=None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     stmt = select(Generation)
     if model is not None:
@@ -64,14 +109,12 @@ def list_generations(
     if attack_type is not None:
         stmt = stmt.where(Generation.attack_type == attack_type)
 
-    total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+    filtered = model is not None or watermark_enabled is not None or attack_type is not None
+    total = await db.run_sync(count_total, stmt, Generation.__tablename__, filtered=filtered, mode=total_mode)
 
-    stmt = (
-        stmt.order_by(Generation.created_at.desc(), Generation.generation_id.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
+    rows, next_cursor = await db.run_sync(
+        paginate, stmt, Generation.created_at, Generation.generation_id, page=page, page_size=page_size, cursor=cursor
     )
-    rows = db.execute(stmt).scalars().all()
 
     items = [
         GenerationListItem(
@@ -86,62 +129,97 @@ def list_generations(
         )
         for r in rows
     ]
-    return Page(total=total, page=page, page_size=page_size, items=items)
+    return Page(total=total, page=page, page_size=page_size, items=items, next_cursor=next_cursor)
 
 
 @router.get("/{generation_id}", response_model=GenerationOut)
-def get_generation(generation_id: int, db: Session = Depends(get_db)) -> Generation:
-    row = db.get(Generation, generation_id)
+async def get_generation(generation_id: int, db: AsyncSession = Depends(get_async_db)) -> Generation:
+    row = await db.get(Generation, generation_id)
     if row is None:
         raise HTTPException(status_code=404, detail="Generation not found")
     return row
 
 
+@router.post("/attacks/batch", response_model=AttackBatchOut)
+async def create_attack_generations_batch(
+    payload: AttackBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+) -> AttackBatchOut:
+    """Apply one attack config to many generations.
+
+    Row ``i`` is attacked with seed ``seed + i``, which is stored as its
+    ``attack_seed`` so every row can be reproduced on its own.
+    """
+    ids = list(dict.fromkeys(payload.generation_ids))
+    originals = {
+        g.generation_id: g
+        for g in (await db.execute(select(Generation).where(Generation.generation_id.in_(ids)))).scalars()
+    }
+    missing = [i for i in ids if i not in originals]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Generation not found: {missing}")
+
+    base_seed = payload.seed if payload.seed is not None else attacks.new_seed()
+    seeds = [(base_seed + i) % 2**62 for i in range(len(ids))]
+    attacked = await attacks.apply_attacks_by_model(
+        [originals[i].output_text for i in ids],
+        [payload.model or originals[i].model for i in ids],
+        payload.attack_type,
+        payload.attack_intensity,
+        seeds,
+    )
+
+    rows = [
+        attacks.attack_row(originals[i], payload.attack_type, payload.attack_intensity, text, seed)
+        for i, text, seed in zip(ids, attacked, seeds)
+    ]
+    inserted = (await db.scalars(insert(Generation).returning(Generation, sort_by_parameter_order=True), rows)).all()
+    await db.run_sync(rollups.record_attacks, [r.watermark_enabled for r in inserted])
+    await db.commit()
+    return AttackBatchOut(items=[GenerationOut.model_validate(r) for r in inserted])
+
+
 @router.post("/{generation_id}/attacks", response_model=GenerationOut)
-async def create_attack_generation(generation_id: int, payload: AttackCreate, db: Session = Depends(get_db)) -> Generation:
-    original = db.get(Generation, generation_id)
+async def create_attack_generation(
+    generation_id: int,
+    payload: AttackCreate,
+    db: AsyncSession = Depends(get_async_db),
+) -> Generation:
+    original = await db.get(Generation, generation_id)
     if original is None:
         raise HTTPException(status_code=404, detail="Generation not found")
 
-    attacked = await attack_text(original.output_text, payload.attack_type, payload.attack_intensity)
+    seed = payload.seed if payload.seed is not None else attacks.new_seed()
+    attacked = await attacks.apply_attack(
+        original.output_text, payload.attack_type, payload.attack_intensity, seed, payload.model or original.model
+    )
 
     row = Generation(
-        original_id=original.generation_id,
-        input_text=original.input_text,
-        output_text=attacked,
-        model=original.model,
-        quantization=original.quantization,
-        temperature=original.temperature,
-        top_k=original.top_k,
-        top_p=original.top_p,
-        max_tokens=original.max_tokens,
-        watermark_enabled=original.watermark_enabled,
-        context_width=original.context_width,
-        tournament_size=original.tournament_size,
-        g_value=original.g_value,
-        watermark_key=original.watermark_key,
-        attack_type=payload.attack_type,
-        attack_intensity=payload.attack_intensity,
+        **attacks.attack_row(original, payload.attack_type, payload.attack_intensity, attacked, seed)
     )
     db.add(row)
-    db.commit()
-    db.refresh(row)
+    await db.run_sync(rollups.record_attacks, [original.watermark_enabled])
+    await db.commit()
+    await db.refresh(row)
     return row
 
 
 @router.post("/{generation_id}/detections", response_model=DetectionOut)
-async def create_detection(generation_id: int, db: Session = Depends(get_db)) -> Detection:
-    gen = db.get(Generation, generation_id)
+async def create_detection(
+    generation_id: int,
+    scoring_mode: ScoringMode = Query(default="mean", alias="scoring"),
+    db: AsyncSession = Depends(get_async_db),
+) -> Detection:
+    gen = await db.get(Generation, generation_id, options=[undefer(Generation.output_token_ids)])
     if gen is None:
         raise HTTPException(status_code=404, detail="Generation not found")
 
     # Calculate BLEU if this is an attacked/modified text
     bleu_score = None
     if gen.original_id:
-        original = db.get(Generation, gen.original_id)
+        original = await db.get(Generation, gen.original_id)
         if original:
-             # BLEU expects a list of reference strings
-            bleu_score = sacrebleu.sentence_bleu(gen.output_text, [original.output_text]).score
+            bleu_score = compute_bleu(gen.output_text, original.output_text)
 
     result = await detect_text(
         gen.output_text,
@@ -150,13 +228,17 @@ async def create_detection(generation_id: int, db: Session = Depends(get_db)) ->
             "model": gen.model,
             "g_value": gen.g_value,
             "tournament_size": gen.tournament_size,
-        }
+            "scoring": scoring_mode,
+            "watermark_key_scheme": gen.watermark_key_scheme,
+        },
+        token_ids=unpack_token_ids(gen.output_token_ids),
     )
 
     row = Detection(
         generation_id=gen.generation_id,
         input_text=gen.output_text,
         is_watermarked=bool(result.get("is_watermarked")),
+        scoring=scoring_mode,
         z_score=result.get("z_score"),
         p_value=result.get("p_value"),
         confidence=result.get("confidence"),
@@ -166,7 +248,12 @@ async def create_detection(generation_id: int, db: Session = Depends(get_db)) ->
         bleu_score=bleu_score,
     )
     db.add(row)
-    db.commit()
-    db.refresh(row)
+    await db.flush()
+    g_values = scoring.g_values_row(row.detection_id, result)
+    if g_values is not None:
+        db.add(DetectionGValues(**g_values))
+    await db.run_sync(rollups.record_detections, [(row, gen.watermark_enabled)])
+    await db.commit()
+    await db.refresh(row)
     return row
 
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_async_db
+from app.api.pagination import TotalMode, count_total, paginate
+from app.models.job import Job
+from app.schemas.common import Page
+from app.schemas.jobs import JobCreate, JobListItem, JobOut
+from app.services.jobs import FINISHED_STATUSES, UnknownJobKind, job_queue
+
+router = APIRouter()
+
+
+@router.post("", response_model=JobOut, status_code=202)
+async def create_job(payload: JobCreate, db: AsyncSession = Depends(get_async_db)) -> Job:
+    try:
+        return await db.run_sync(job_queue.submit, payload.kind, payload.params)
+    except UnknownJobKind as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False))
+
+
+@router.get("", response_model=Page[JobListItem])
+async def list_jobs(
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=20, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page; overrides page"),
+    total_mode: TotalMode = Query(default="exact"),
+    status: Optional[str] = Query(default=None),
+    kind: Optional[str] = Query(default=None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = select(Job)
+    if status is not None:
+        stmt = stmt.where(Job.status == status)
+    if kind is not None:
+        stmt = stmt.where(Job.kind == kind)
+
+    filtered = status is not None or kind is not None
+    total = await db.run_sync(count_total, stmt, Job.__tablename__, filtered=filtered, mode=total_mode)
+
+    rows, next_cursor = await db.run_sync(
+        paginate, stmt, Job.created_at, Job.job_id, page=page, page_size=page_size, cursor=cursor
+    )
+    items = [JobListItem.model_validate(r) for r in rows]
+    return Page(total=total, page=page, page_size=page_size, items=items, next_cursor=next_cursor)
+
+
+@router.get("/{job_id}", response_model=JobOut)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_async_db)) -> Job:
+    row = await db.get(Job, job_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return row
+
+
+@router.post("/{job_id}/cancel", response_model=JobOut)
+async def cancel_job(job_id: int, db: AsyncSession = Depends(get_async_db)) -> Job:
+    """Cancel a pending job, or ask a running one to stop at its next progress report."""
+    row = await db.get(Job, job_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if row.status in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {row.status}")
+    return await db.run_sync(job_queue.cancel, job_id)
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_async_db
+from app.models.generation import Generation
+from app.models.job import Job
+from app.schemas.jobs import JobOut
+from app.schemas.sweeps import SweepCreate
+from app.services.jobs import job_queue
+
+router = APIRouter()
+
+
+@router.post("", response_model=JobOut, status_code=202)
+async def create_sweep(payload: SweepCreate, db: AsyncSession = Depends(get_async_db)) -> Job:
+    """Queue a robustness sweep job; poll ``GET /jobs/{job_id}`` for progress and the curves."""
+    ids = set(payload.generation_ids)
+    found = set((await db.execute(select(Generation.generation_id).where(Generation.generation_id.in_(ids)))).scalars())
+    missing = sorted(ids - found)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Generation not found: {missing}")
+    return await db.run_sync(job_queue.submit, "sweep", payload)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+
+from app.core.llm import llm_manager
+from app.db.instrumentation import pool_stats, query_metrics
+from app.db.session import async_engine, engine
+from app.services.ai import generation_batcher, prefix_cache
+from app.services.inference import inference_pool
+from app.services.tokens import token_cache
+from app.services.watermark import processor_cache
+from app.services.watermark_keys import key_registry
+
+router = APIRouter()
+
+
+@router.get("/inference")
+def get_inference_status():
+    return {
+        **inference_pool.stats(),
+        "batch_pending": generation_batcher.pending(),
+    }
+
+
+@router.get("/caches")
+def get_cache_stats():
+    return {
+        "watermark_processors": processor_cache.stats(),
+        "tokens": token_cache.stats(),
+        "prefix_kv": prefix_cache.stats(),
+        "watermark_keys": key_registry.stats(),
+    }
+
+
+@router.get("/models")
+def get_model_status():
+    return llm_manager.status()
+
+
+@router.get("/db")
+def get_db_stats():
+    return {
+        "pools": {
+            "async": pool_stats(async_engine.sync_engine),
+            "sync": pool_stats(engine),
+        },
+        **query_metrics.stats(),
+    }
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Literal, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, func, select, text, tuple_
+from sqlalchemy.orm import Session
+
+TotalMode = Literal["exact", "estimate", "none"]
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps({"c": created_at.isoformat(), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["c"]), int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    db: Session,
+    stmt: Select,
+    created_col: Any,
+    id_col: Any,
+    *,
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+) -> Tuple[Sequence[Any], Optional[str]]:
+    """Fetch one page newest-first and return (rows, next_cursor).
+
+    With a cursor the query seeks on ``(created_at, id) < cursor`` and uses the
+    composite ``created_at, id`` index, so every page costs the same as the
+    first one. Without a cursor it falls back to ``page``/OFFSET. Either way a
+    ``next_cursor`` is returned while more rows exist.
+    """
+    stmt = stmt.order_by(created_col.desc(), id_col.desc())
+    if cursor is not None:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(created_col, id_col) < tuple_(created_at, row_id))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+
+    # One extra row tells us whether there is a next page without a COUNT.
+    rows = db.execute(stmt.limit(page_size + 1)).scalars().all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def count_total(db: Session, stmt: Select, table_name: str, *, filtered: bool, mode: TotalMode) -> Optional[int]:
+    """Total row count for a listing.
+
+    ``estimate`` reads the planner statistics (``pg_class.reltuples``) when no
+    filter is applied, which is O(1); filtered listings are counted exactly
+    because they go through the column indexes. ``none`` skips counting.
+    """
+    if mode == "none":
+        return None
+    if mode == "estimate" and not filtered:
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"), {"name": table_name}
+        ).scalar()
+        # reltuples is -1 (or 0) until the table has been vacuumed/analyzed at least once.
+        if estimate is not None and estimate > 0:
+            return int(estimate)
+    return db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
@@ -3,10 +3,16 @@ from fastapi import APIRouter
 from app.api.endpoints.detections import router as detections_router
 from app.api.endpoints.generations import router as generations_router
 from app.api.endpoints.dashboard import router as dashboard_router
+from app.api.endpoints.system import router as system_router
+from app.api.endpoints.sweeps import router as sweeps_router
+from app.api.endpoints.jobs import router as jobs_router
 
 api_router = APIRouter()
 
 api_router.include_router(generations_router, prefix="/generations", tags=["generations"])
 api_router.include_router(detections_router, prefix="/detections", tags=["detections"])
 api_router.include_router(dashboard_router, prefix="/dashboard", tags=["dashboard"])
+api_router.include_router(system_router, prefix="/system", tags=["system"])
+api_router.include_router(sweeps_router, prefix="/sweeps", tags=["sweeps"])
+api_router.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
 
@@ -0,0 +1,47 @@
+"""Maintenance commands: ``python -m app.cli <command>``."""
+
+from __future__ import annotations
+
+import argparse
+from typing import List, Optional
+
+from app.db.session import get_session
+from app.services import rollups
+
+
+def rebuild_rollups(if_empty: bool = False) -> None:
+    db = get_session()
+    try:
+        if if_empty and not rollups.is_empty(db):
+            print("Dashboard rollups already filled; skipping the rebuild.")
+            return
+        n = rollups.rebuild(db)
+    finally:
+        db.close()
+    print(f"Rebuilt dashboard rollups ({n} rows).")
+
+
+# name -> (function, help, [(flag, argparse options)])
+COMMANDS = {
+    "rebuild-rollups": (
+        rebuild_rollups,
+        "Recompute dashboard_rollups from detections and generations.",
+        [("--if-empty", {"action": "store_true", "help": "only when the table has no rows yet"})],
+    ),
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text, arguments) in COMMANDS.items():
+        command = sub.add_parser(name, help=help_text)
+        for flag, options in arguments:
+            command.add_argument(flag, **options)
+
+    args = vars(parser.parse_args(argv))
+    COMMANDS[args.pop("command")][0](**args)
+
+
+if __name__ == "__main__":
+    main()
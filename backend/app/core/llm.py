@@ -1,38 +1,238 @@
 from __future__ import annotations
 
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, PreTrainedTokenizer, PreTrainedModel
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
 from app.core.config import settings
+from app.core.metrics import MODEL_LOAD_SECONDS
+
+if TYPE_CHECKING:
+    from transformers import PreTrainedModel, PreTrainedTokenizer
+
+logger = logging.getLogger(__name__)
+
+# Model Name Mapping (Frontend shortname -> HuggingFace ID)
+MODEL_MAPPING = {
+    "Llama-3-8B": "meta-llama/Meta-Llama-3-8B-Instruct",
+    "Gemma-2-2B": "google/gemma-2b-it",
+}
+
+
+def resolve_model_name(raw_model_name: Optional[str]) -> str:
+    raw_model_name = raw_model_name or "google/gemma-2b-it"
+    return MODEL_MAPPING.get(raw_model_name, raw_model_name)
+
 
 class LLMManager:
-    _models: dict[str, PreTrainedModel] = {}
-    _tokenizers: dict[str, PreTrainedTokenizer] = {}
+    """Keeps loaded models resident, least recently used first out.
+
+    Loads are serialised per model so concurrent first requests share one
+    load. When ``memory_budget_bytes`` is set, the least recently used models
+    are evicted until a new model fits. That happens before its weights are
+    loaded, using the footprint recorded the last time the model was loaded
+    or else one estimated from its config, and once more afterwards against
+    the measured footprint. A model larger than the whole budget is still
+    loaded, alone.
+
+    Everything that touches torch/transformers goes through ``_load_weights``,
+    ``_estimate_footprint`` and ``_free_device_memory``.
+    """
+
+    def __init__(self, memory_budget_bytes: int = 0) -> None:
+        self.memory_budget_bytes = memory_budget_bytes
+        self._models: "OrderedDict[str, PreTrainedModel]" = OrderedDict()
+        self._tokenizers: Dict[str, PreTrainedTokenizer] = {}
+        self._footprints: Dict[str, int] = {}
+        # Measured footprints, kept across evictions to size reloads.
+        self._known_footprints: Dict[str, int] = {}
+        # Expected footprints of the models being loaded right now.
+        self._reserved: Dict[str, int] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._loading: set[str] = set()
+        self._eviction_listeners: List[Callable[[str], None]] = []
+
+    def add_eviction_listener(self, listener: Callable[[str], None]) -> None:
+        self._eviction_listeners.append(listener)
+
+    def _resident(self, model_name: str) -> Optional[Tuple[PreTrainedModel, PreTrainedTokenizer]]:
+        # Caller holds self._lock.
+        if model_name not in self._models:
+            return None
+        self._models.move_to_end(model_name)
+        self._last_used[model_name] = time.time()
+        return self._models[model_name], self._tokenizers[model_name]
+
+    def load_model(self, model_name: str):
+        with self._lock:
+            resident = self._resident(model_name)
+            if resident is not None:
+                return resident
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited.
+            with self._lock:
+                resident = self._resident(model_name)
+                if resident is not None:
+                    return resident
+                self._loading.add(model_name)
+
+            evicted: List[str] = []
+            if self.memory_budget_bytes > 0:
+                expected = self._expected_footprint(model_name)
+                with self._lock:
+                    evicted = self._evict_for(expected)
+                    self._reserved[model_name] = expected
+                # Free the evicted weights before the new ones are allocated.
+                self._after_eviction(evicted)
+
+            logger.info("Loading model: %s...", model_name)
+            started = time.perf_counter()
+            try:
+                model, tokenizer = self._load_weights(model_name)
+            except Exception:
+                logger.exception("Error loading model %s", model_name)
+                with self._lock:
+                    self._reserved.pop(model_name, None)
+                raise
+            finally:
+                with self._lock:
+                    self._loading.discard(model_name)
 
-    @classmethod
-    def load_model(cls, model_name: str):
-        if model_name in cls._models:
-            return cls._models[model_name], cls._tokenizers[model_name]
+            load_seconds = time.perf_counter() - started
+            MODEL_LOAD_SECONDS.labels(model=model_name).observe(load_seconds)
+            footprint = int(model.get_memory_footprint())
+            evicted = self._admit(model_name, model, tokenizer, footprint, load_seconds)
+            logger.info("Model %s loaded in %.1fs (%.2f GB).", model_name, load_seconds, footprint / 1e9)
 
-        print(f"Loading model: {model_name}...")
+        self._after_eviction(evicted)
+        return model, tokenizer
+
+    def _load_weights(self, model_name: str) -> Tuple[PreTrainedModel, PreTrainedTokenizer]:
+        # Deferred so the residency bookkeeping works without the torch/transformers stack.
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            device_map="auto",
+            torch_dtype=torch.float16,
+        )
+        return model, tokenizer
+
+    def _estimate_footprint(self, model_name: str) -> int:
+        """Float16 bytes of ``model_name``'s parameters, counted from its config."""
+        import torch
+        from accelerate import init_empty_weights
+        from transformers import AutoConfig, AutoModelForCausalLM
+
+        config = AutoConfig.from_pretrained(model_name)
+        # Parameters are counted on the meta device, without allocating them.
+        with init_empty_weights():
+            empty = AutoModelForCausalLM.from_config(config)
+        return sum(p.numel() for p in empty.parameters()) * torch.finfo(torch.float16).bits // 8
+
+    def _expected_footprint(self, model_name: str) -> int:
+        """Bytes ``model_name`` will take once loaded in float16; 0 if unknown."""
+        with self._lock:
+            known = self._known_footprints.get(model_name)
+        if known is not None:
+            return known
         try:
-            tokenizer = AutoTokenizer.from_pretrained(model_name)
-            model = AutoModelForCausalLM.from_pretrained(
-                model_name,
-                device_map="auto",
-                torch_dtype=torch.float16,
-            )
-            cls._models[model_name] = model
-            cls._tokenizers[model_name] = tokenizer
-            print(f"Model {model_name} loaded.")
-            return model, tokenizer
-        except Exception as e:
-            print(f"Error loading model {model_name}: {e}")
-            raise e
-
-    @classmethod
-    def get_model(cls, model_name: str):
-        if model_name not in cls._models:
-            return cls.load_model(model_name)
-        return cls._models[model_name], cls._tokenizers[model_name]
-
-llm_manager = LLMManager()
+            return self._estimate_footprint(model_name)
+        except Exception:
+            logger.warning("Could not estimate the size of %s; evicting after it is loaded", model_name, exc_info=True)
+            return 0
+
+    def _evict_for(self, footprint: int) -> List[str]:
+        # Caller holds self._lock. Evicts least recently used models until
+        # ``footprint`` more bytes (plus the other loads under way) fit the budget.
+        evicted: List[str] = []
+        if self.memory_budget_bytes <= 0:
+            return evicted
+        while self._models and (
+            sum(self._footprints.values()) + sum(self._reserved.values()) + footprint > self.memory_budget_bytes
+        ):
+            name, _ = self._models.popitem(last=False)
+            self._drop(name)
+            evicted.append(name)
+        return evicted
+
+    def _admit(
+        self, model_name: str, model: PreTrainedModel, tokenizer: PreTrainedTokenizer, footprint: int, load_seconds: float
+    ) -> List[str]:
+        with self._lock:
+            # Its own reservation is replaced by the measured footprint.
+            self._reserved.pop(model_name, None)
+            evicted = self._evict_for(footprint)
+            self._models[model_name] = model
+            self._tokenizers[model_name] = tokenizer
+            self._footprints[model_name] = footprint
+            self._known_footprints[model_name] = footprint
+            self._load_seconds[model_name] = load_seconds
+            self._last_used[model_name] = time.time()
+        return evicted
+
+    def _drop(self, model_name: str) -> None:
+        # Caller holds self._lock and already removed the model from self._models.
+        self._tokenizers.pop(model_name, None)
+        self._footprints.pop(model_name, None)
+        self._load_seconds.pop(model_name, None)
+        self._last_used.pop(model_name, None)
+
+    def _after_eviction(self, evicted: List[str]) -> None:
+        if not evicted:
+            return
+        for name in evicted:
+            logger.info("Evicted model %s.", name)
+            for listener in self._eviction_listeners:
+                listener(name)
+        self._free_device_memory()
+
+    def _free_device_memory(self) -> None:
+        import torch
+
+        # Requests still holding a reference keep the weights alive until they finish.
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def evict(self, model_name: str) -> bool:
+        with self._lock:
+            if self._models.pop(model_name, None) is None:
+                return False
+            self._drop(model_name)
+        self._after_eviction([model_name])
+        return True
+
+    def get_model(self, model_name: str):
+        return self.load_model(model_name)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "resident_bytes": sum(self._footprints.values()),
+                "loading": sorted(self._loading),
+                # Least recently used first, i.e. in eviction order.
+                "models": [
+                    {
+                        "model": name,
+                        "memory_bytes": self._footprints[name],
+                        "load_seconds": round(self._load_seconds[name], 3),
+                        "last_used": self._last_used[name],
+                        "device": str(model.device),
+                    }
+                    for name, model in self._models.items()
+                ],
+            }
+
+llm_manager = LLMManager(memory_budget_bytes=int(settings.model_memory_budget_gb * 1024**3))
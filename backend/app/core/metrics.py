@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+
+# Buckets in seconds. Model loads take tens of seconds, detection stages milliseconds.
+_LOAD_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_RATE_BUCKETS = (1, 5, 10, 20, 40, 80, 160, 320, 640, 1280)
+
+MODEL_LOAD_SECONDS = Histogram(
+    "model_load_seconds", "Time to load a model checkpoint.", ["model"], buckets=_LOAD_BUCKETS
+)
+# Measured from the start of model.generate, i.e. prefill time; waiting in the
+# micro-batcher and the inference pool shows up in the queue depth gauges.
+TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "generation_time_to_first_token_seconds",
+    "Time from the start of model.generate to the first sampled token.",
+    ["model", "mode"],
+    buckets=_LATENCY_BUCKETS,
+)
+GENERATION_TOKENS_PER_SECOND = Histogram(
+    "generation_tokens_per_second",
+    "New tokens per second of one model.generate call, summed over its batch rows.",
+    ["model", "mode"],
+    buckets=_RATE_BUCKETS,
+)
+GENERATED_TOKENS = Counter("generation_tokens", "New tokens generated.", ["model"])
+DETECTION_STAGE_SECONDS = Histogram(
+    "detection_stage_seconds",
+    "Time per detection stage (tokenize, g_values, scoring) of one detection batch.",
+    ["model", "stage"],
+    buckets=_STAGE_BUCKETS,
+)
+QUEUE_DEPTH = Gauge("queue_depth", "Work waiting or running, per queue.", ["queue", "state"])
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency per route.", ["method", "endpoint"], buckets=_LATENCY_BUCKETS
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Database time per request.", ["method", "endpoint"], buckets=_STAGE_BUCKETS
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Queries per request.",
+    ["method", "endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+
+
+@contextmanager
+def observe_stage(model: str, stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        DETECTION_STAGE_SECONDS.labels(model=model, stage=stage).observe(time.perf_counter() - started)
+
+
+def track_queue(queue: str, state: str, fn: Callable[[], float]) -> None:
+    """Report ``fn()`` as the current depth of ``queue`` at scrape time."""
+    QUEUE_DEPTH.labels(queue=queue, state=state).set_function(fn)
+
+
+class _CacheCollector:
+    """Exports the hit/miss counters the caches already keep in their ``stats()``."""
+
+    def __init__(self) -> None:
+        self._caches: List[Tuple[str, Callable[[], Dict[str, int]]]] = []
+
+    def add(self, name: str, stats: Callable[[], Dict[str, int]]) -> None:
+        self._caches.append((name, stats))
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits.", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses.", labels=["cache"])
+        size = GaugeMetricFamily("cache_entries", "Entries currently cached.", labels=["cache"])
+        for name, stats in self._caches:
+            s = stats()
+            hits.add_metric([name], s.get("hits", 0))
+            misses.add_metric([name], s.get("misses", 0))
+            size.add_metric([name], s.get("size", 0))
+        yield hits
+        yield misses
+        yield size
+
+
+_cache_collector = _CacheCollector()
+REGISTRY.register(_cache_collector)
+
+
+def track_cache(name: str, stats: Callable[[], Dict[str, int]]) -> None:
+    """Export ``stats()["hits"|"misses"|"size"]`` of a cache at scrape time."""
+    _cache_collector.add(name, stats)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import HTTP_REQUEST_DB_SECONDS, HTTP_REQUEST_QUERIES, HTTP_REQUEST_SECONDS
+
+_QUERY_START_KEY = "query_start"
+
+
+class QueryStats:
+    """Query count and database time accumulated by one request."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+class QueryMetrics:
+    """Per-endpoint query totals since startup, plus queries outside any request (jobs, CLI)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, float]] = {}
+        self.background_queries = 0
+        self.background_seconds = 0.0
+
+    def record_query(self, seconds: float) -> None:
+        stats = _current.get()
+        with self._lock:
+            # Requests may run queries on worker threads (asyncio.to_thread copies
+            # the context), so per-request totals are updated under the lock too.
+            if stats is not None:
+                stats.count += 1
+                stats.seconds += seconds
+            else:
+                self.background_queries += 1
+                self.background_seconds += seconds
+
+    def record_request(self, endpoint: str, stats: QueryStats) -> None:
+        with self._lock:
+            entry = self._endpoints.setdefault(
+                endpoint, {"requests": 0, "queries": 0, "db_seconds": 0.0, "max_queries": 0}
+            )
+            entry["requests"] += 1
+            entry["queries"] += stats.count
+            entry["db_seconds"] += stats.seconds
+            entry["max_queries"] = max(entry["max_queries"], stats.count)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints: List[Dict[str, Any]] = [
+                {
+                    "endpoint": endpoint,
+                    "requests": int(e["requests"]),
+                    "queries": int(e["queries"]),
+                    "max_queries": int(e["max_queries"]),
+                    "mean_queries": e["queries"] / e["requests"],
+                    "db_ms": e["db_seconds"] * 1000.0,
+                    "mean_db_ms": e["db_seconds"] * 1000.0 / e["requests"],
+                }
+                for endpoint, e in self._endpoints.items()
+            ]
+            background = {"queries": self.background_queries, "db_ms": self.background_seconds * 1000.0}
+        endpoints.sort(key=lambda e: e["db_ms"], reverse=True)
+        return {"endpoints": endpoints, "background": background}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+            self.background_queries = 0
+            self.background_seconds = 0.0
+
+
+query_metrics = QueryMetrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault(_QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info[_QUERY_START_KEY].pop()
+    query_metrics.record_query(time.perf_counter() - started)
+
+
+def _handle_error(exception_context) -> None:
+    # Failed statements never reach after_cursor_execute; keep the start stack balanced.
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_QUERY_START_KEY):
+        started = conn.info[_QUERY_START_KEY].pop()
+        query_metrics.record_query(time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time every statement run on ``engine`` (pass ``async_engine.sync_engine`` for async)."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    stats: Dict[str, Any] = {"status": pool.status()}
+    # QueuePool only; StaticPool/NullPool (tests, sqlite) have no sizing.
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats[name] = fn()
+    return stats
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware reporting each request's database work.
+
+    Adds ``X-DB-Query-Count`` and a ``Server-Timing: db;dur=<ms>`` entry to the
+    response, counting queries run before the headers go out (for streamed
+    responses, the rest still lands in the per-endpoint totals). Request
+    latency and DB time also go to the Prometheus histograms.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_stats(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode("latin-1")))
+                headers.append((b"server-timing", f"db;dur={stats.seconds * 1000.0:.1f}".encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            # The router stores the matched route in the scope; group by its
+            # path template so /generations/1 and /generations/2 share a row.
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            query_metrics.record_request(f"{method} {path}", stats)
+            HTTP_REQUEST_SECONDS.labels(method=method, endpoint=path).observe(time.perf_counter() - started)
+            HTTP_REQUEST_DB_SECONDS.labels(method=method, endpoint=path).observe(stats.seconds)
+            HTTP_REQUEST_QUERIES.labels(method=method, endpoint=path).observe(stats.count)
@@ -1,18 +1,46 @@
 from __future__ import annotations
 
+from typing import Any, Dict
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db.instrumentation import instrument_engine
+
+
+def engine_options() -> Dict[str, Any]:
+    """Pool arguments shared by the sync and async engines."""
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_s,
+        "pool_recycle": settings.db_pool_recycle_s,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
 
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-)
+# Blocking engine: CLI commands, alembic and work already running on a thread
+# (job queue bookkeeping).
+engine = create_engine(settings.database_url, **engine_options())
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
+# Request handlers use the async engine so waiting on the database does not
+# block the event loop. psycopg 3 serves both from the same
+# postgresql+psycopg:// URL.
+async_engine = create_async_engine(settings.database_url, **engine_options())
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 
 def get_session() -> Session:
     return SessionLocal()
 
+
+def get_async_session() -> AsyncSession:
+    return AsyncSessionLocal()
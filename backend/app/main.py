@@ -1,14 +1,46 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from app.api.router import api_router
 from app.core.config import settings
+from app.db.instrumentation import QueryStatsMiddleware
+from app.db.session import async_engine
+from app.services.ai import preload_models
+from app.services import job_handlers  # noqa: F401  (registers the job kinds)
+from app.services.inference import InferenceQueueFull, inference_pool
+from app.services.jobs import job_queue
+from app.services.watermark_keys import check_secret, key_registry
+
+logging.basicConfig(level=settings.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Preload in the background so /health answers while checkpoints load;
+    # GET /api/system/models shows progress.
+    preload = asyncio.ensure_future(preload_models(settings.preload_model_list, settings.warmup_on_preload))
+    check_secret(settings.watermark_key_scheme, settings.watermark_key_secret)
+    await asyncio.to_thread(key_registry.load)
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    preload.cancel()
+    inference_pool.shutdown()
+    await async_engine.dispose()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
+
+    app.add_middleware(QueryStatsMiddleware)
 
     app.add_middleware(
         CORSMiddleware,
@@ -20,10 +52,22 @@ def create_app() -> FastAPI:
 
     app.include_router(api_router, prefix="/api")
 
+    @app.exception_handler(InferenceQueueFull)
+    async def inference_queue_full(request: Request, exc: InferenceQueueFull):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Inference queue is full, please retry later"},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
     @app.get("/health")
     def health():
         return {"status": "ok"}
 
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
     return app
 
 
@@ -1,3 +1,7 @@
 from app.models.generation import Generation  # noqa: F401
 from app.models.detection import Detection  # noqa: F401
 
+from app.models.dashboard_rollup import DashboardRollup  # noqa: F401
+from app.models.detection_g_values import DetectionGValues  # noqa: F401
+from app.models.job import Job  # noqa: F401
+from app.models.watermark_key import WatermarkKey  # noqa: F401
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Boolean, Integer, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class DashboardRollup(Base):
+    """Pre-aggregated dashboard counters, updated in the same transaction as detections/attacks."""
+
+    __tablename__ = "dashboard_rollups"
+
+    metric: Mapped[str] = mapped_column(String(16), primary_key=True)
+    watermark_enabled: Mapped[bool] = mapped_column(Boolean, primary_key=True)
+    bucket: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
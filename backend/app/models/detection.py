@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, Integer, Text, func
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, Integer, String, Text, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -27,6 +27,8 @@ class Detection(Base):
 
     input_text: Mapped[str] = mapped_column(Text, nullable=False)
     is_watermarked: Mapped[bool] = mapped_column(Boolean, nullable=False, index=True)
+    # Detector used for the verdict: mean, weighted_mean or bayesian.
+    scoring: Mapped[str] = mapped_column(String(16), nullable=False, server_default=text("'mean'"))
 
     z_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     p_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from sqlalchemy import ForeignKey, Integer, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class DetectionGValues(Base):
+    """Bit-packed per-position g-values and mask of a detection, for re-scoring without the model."""
+
+    __tablename__ = "detection_g_values"
+
+    detection_id: Mapped[int] = mapped_column(
+        ForeignKey("detections.detection_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    num_positions: Mapped[int] = mapped_column(Integer, nullable=False)
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # np.packbits of the [num_positions, depth] g-values and of the [num_positions] mask.
+    g_values: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    mask: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, Integer, String, Text, func
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Text, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -27,6 +27,8 @@ class Generation(Base):
 
     input_text: Mapped[str] = mapped_column(Text, nullable=False)
     output_text: Mapped[str] = mapped_column(Text, nullable=False)
+    # int32 token ids of output_text (see app.services.tokens); only loaded on demand.
+    output_token_ids: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
 
     model: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
     quantization: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
@@ -41,9 +43,14 @@ class Generation(Base):
     tournament_size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     g_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     watermark_key: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
+    # Derivation of the depth keys from watermark_key (app.services.watermark_keys).
+    watermark_key_scheme: Mapped[str] = mapped_column(String(16), nullable=False, server_default=text("'legacy'"))
 
     attack_type: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, index=True)
     attack_intensity: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    attack_seed: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    # Sampling seed; re-running the same request with it reproduces the output.
+    seed: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
 
     original: Mapped["Generation | None"] = relationship(
         "Generation",
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, Boolean, DateTime, Float, Index, Integer, String, Text, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class Job(Base):
+    """Background work item; workers claim pending rows with FOR UPDATE SKIP LOCKED."""
+
+    __tablename__ = "jobs"
+
+    job_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    # pending -> running -> succeeded | failed | cancelled
+    status: Mapped[str] = mapped_column(String(16), nullable=False, server_default=text("'pending'"))
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    params: Mapped[Any] = mapped_column(JSON, nullable=False)
+    result: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    progress: Mapped[float] = mapped_column(Float, nullable=False, server_default=text("0"))
+    message: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("false"))
+
+
+# Claim order for workers, and newest-first listings.
+Index("ix_jobs_status_created_at_job_id", Job.status, Job.created_at, Job.job_id)
+Index("ix_jobs_created_at_job_id", Job.created_at, Job.job_id)
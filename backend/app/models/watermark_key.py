@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import JSON, DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class WatermarkKey(Base):
+    """Depth keys derived once per watermark key name.
+
+    Stored keys win over re-deriving, so rotating the derivation secret does
+    not invalidate generations made before the rotation.
+    """
+
+    __tablename__ = "watermark_keys"
+
+    scheme: Mapped[str] = mapped_column(String(16), primary_key=True)
+    name: Mapped[str] = mapped_column(String(256), primary_key=True)
+    depth: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    keys: Mapped[List[int]] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
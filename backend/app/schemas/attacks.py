@@ -1,13 +1,37 @@
 from __future__ import annotations
 
-from typing import Literal
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
-AttackType = Literal["deletion", "substitution", "summarization"]
+from app.schemas.generations import GenerationOut
+
+AttackType = Literal[
+    "deletion",
+    "substitution",
+    "insertion",
+    "swap",
+    "word_deletion",
+    "word_substitution",
+    "word_insertion",
+    "word_swap",
+    "summarization",
+    "paraphrase",
+]
 
 
 class AttackCreate(BaseModel):
     attack_type: AttackType
     attack_intensity: float = Field(ge=0.0, le=100.0)
+    # Random when omitted; the seed used is stored as attack_seed.
+    seed: Optional[int] = Field(default=None, ge=0, le=2**62)
+    # Model for summarization/paraphrase; defaults to the generation's model.
+    model: Optional[str] = None
+
+
+class AttackBatchCreate(AttackCreate):
+    generation_ids: List[int] = Field(min_length=1, max_length=1000)
+
 
+class AttackBatchOut(BaseModel):
+    items: List[GenerationOut]
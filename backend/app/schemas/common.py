@@ -8,10 +8,13 @@ T = TypeVar("T")
 
 
 class Page(BaseModel, Generic[T]):
-    total: int
+    # None when the caller asked to skip counting (total_mode=none).
+    total: Optional[int] = None
     page: int = Field(ge=1)
     page_size: int = Field(ge=1, le=200)
     items: List[T]
+    # Opaque keyset cursor for the next page; None on the last page.
+    next_cursor: Optional[str] = None
 
 
 class NotFoundDetail(BaseModel):
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from app.schemas.generations import KeyScheme
+
+# ``bayesian`` is a naive independent-Bernoulli likelihood-ratio score, not a
+# calibrated probability; see scoring.bayesian_posteriors.
+ScoringMode = Literal["mean", "weighted_mean", "bayesian"]
 
 
 class DetectionOut(BaseModel):
@@ -15,6 +21,7 @@ class DetectionOut(BaseModel):
 
     input_text: str
     is_watermarked: bool
+    scoring: str = "mean"
 
     z_score: Optional[float] = None
     p_value: Optional[float] = None
@@ -34,6 +41,88 @@ class DetectionListItem(BaseModel):
 
     input_text_preview: str
     is_watermarked: bool
+    scoring: str = "mean"
+    z_score: Optional[float] = None
+    confidence: Optional[float] = None
+
+
+
+class DetectionBatchCreate(BaseModel):
+    generation_ids: List[int] = Field(default_factory=list, max_length=10000)
+    texts: List[str] = Field(default_factory=list, max_length=10000)
+    scoring: ScoringMode = "mean"
+
+    # Only used for raw ``texts``; stored generations carry their own settings.
+    model: Optional[str] = None
+    watermark_key: Optional[str] = None
+    # Defaults to settings.watermark_key_scheme.
+    watermark_key_scheme: Optional[KeyScheme] = None
+
+    @model_validator(mode="after")
+    def _require_input(self) -> "DetectionBatchCreate":
+        if not self.generation_ids and not self.texts:
+            raise ValueError("generation_ids or texts must be provided")
+        return self
+
+
+class DetectionBatchItem(BaseModel):
+    # Raw texts are scored but not stored, so they have no ids.
+    detection_id: Optional[int] = None
+    generation_id: Optional[int] = None
+
+    input_text_preview: str
+    is_watermarked: bool
+    scoring: str = "mean"
+    z_score: Optional[float] = None
+    p_value: Optional[float] = None
+    confidence: Optional[float] = None
+    bleu_score: Optional[float] = None
+
+
+class DetectionBatchOut(BaseModel):
+    items: List[DetectionBatchItem]
+
+
+class DetectionRescoreCreate(BaseModel):
+    detection_ids: List[int] = Field(min_length=1, max_length=5000)
+    scoring: ScoringMode = "mean"
+    # Defaults to settings.detection_z_threshold.
+    z_threshold: Optional[float] = None
+
+
+class DetectionRescoreItem(BaseModel):
+    detection_id: int
+    is_watermarked: bool
+    scoring: str
     z_score: Optional[float] = None
+    p_value: Optional[float] = None
     confidence: Optional[float] = None
 
+
+class DetectionRescoreOut(BaseModel):
+    items: List[DetectionRescoreItem]
+    # Requested ids without stored g-values (unknown, or scored before they were kept).
+    missing: List[int] = Field(default_factory=list)
+
+
+class DetectionAttributionCreate(BaseModel):
+    text: str = Field(min_length=1)
+    watermark_keys: List[str] = Field(min_length=1, max_length=1000)
+    watermark_key_scheme: Optional[KeyScheme] = None
+    model: Optional[str] = None
+    scoring: ScoringMode = "mean"
+
+
+class DetectionAttributionItem(BaseModel):
+    rank: int
+    watermark_key: str
+    is_watermarked: bool
+    z_score: Optional[float] = None
+    p_value: Optional[float] = None
+    confidence: Optional[float] = None
+
+
+class DetectionAttributionOut(BaseModel):
+    scoring: str
+    # Most likely key first.
+    items: List[DetectionAttributionItem]
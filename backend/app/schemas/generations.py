@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
+# How a watermark key name is turned into depth keys (see app.services.watermark_keys).
+KeyScheme = Literal["hkdf", "legacy"]
+
 
 class GenerationCreate(BaseModel):
     input_text: str = Field(min_length=1)
@@ -21,6 +24,20 @@ class GenerationCreate(BaseModel):
     tournament_size: Optional[int] = Field(default=None, ge=1)
     g_value: Optional[float] = Field(default=None, ge=0.0)
     watermark_key: Optional[str] = None
+    # Per-request sampling seed: seeded requests run unbatched and without the
+    # prefix cache, so the same request and seed give the same tokens on the
+    # same model and hardware. Random (and returned) when omitted; an unseeded
+    # request may be batched, so replaying its seed can differ slightly.
+    seed: Optional[int] = Field(default=None, ge=0, le=2**62)
+
+    # Return the stored generation of an identical earlier request (within
+    # GENERATION_CACHE_TTL_S) instead of running the model again. Only applies
+    # to requests with a seed; unseeded requests always sample afresh.
+    cache: bool = False
+
+
+class GenerationBatchCreate(BaseModel):
+    items: List[GenerationCreate] = Field(min_length=1, max_length=1000)
 
 
 class GenerationOut(BaseModel):
@@ -45,9 +62,15 @@ class GenerationOut(BaseModel):
     tournament_size: Optional[int] = None
     g_value: Optional[float] = None
     watermark_key: Optional[str] = None
+    watermark_key_scheme: Optional[str] = None
 
     attack_type: Optional[str] = None
     attack_intensity: Optional[float] = None
+    attack_seed: Optional[int] = None
+    seed: Optional[int] = None
+
+    # True when an identical cached request was answered without running the model.
+    cache_hit: bool = False
 
 
 class GenerationListItem(BaseModel):
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class JobCreate(BaseModel):
+    # sweep | detection_batch | generation_batch
+    kind: str = Field(min_length=1, max_length=32)
+    # Validated against the kind's own schema (SweepCreate, DetectionBatchCreate, GenerationBatchCreate).
+    params: Dict[str, Any]
+
+
+class JobListItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    job_id: int
+    kind: str
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    progress: float
+    message: Optional[str] = None
+    cancel_requested: bool
+    error: Optional[str] = None
+
+
+class JobOut(JobListItem):
+    params: Dict[str, Any]
+    result: Optional[Any] = None
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.schemas.attacks import AttackType
+from app.schemas.detections import ScoringMode
+
+MAX_SWEEP_VARIANTS = 20000
+
+
+class SweepCreate(BaseModel):
+    generation_ids: List[int] = Field(min_length=1, max_length=1000)
+    attack_types: List[AttackType] = Field(min_length=1, max_length=10)
+    intensities: List[float] = Field(min_length=1, max_length=21)
+
+    # Variant k of the grid is attacked with seed + k; random when omitted.
+    seed: Optional[int] = Field(default=None, ge=0, le=2**62)
+    # Model for summarization/paraphrase; defaults to each generation's model.
+    model: Optional[str] = None
+    scoring: ScoringMode = "mean"
+
+    @model_validator(mode="after")
+    def _check_grid(self) -> "SweepCreate":
+        if any(not 0.0 <= i <= 100.0 for i in self.intensities):
+            raise ValueError("intensities must be between 0 and 100")
+        variants = len(set(self.generation_ids)) * len(set(self.attack_types)) * len(set(self.intensities))
+        if variants > MAX_SWEEP_VARIANTS:
+            raise ValueError(f"sweep would create {variants} variants (max {MAX_SWEEP_VARIANTS})")
+        return self
+
+
+class SweepPoint(BaseModel):
+    intensity: float
+    # Variants of watermarked / unwatermarked originals, and how many were flagged.
+    positives: int
+    true_positives: int
+    negatives: int
+    false_positives: int
+    true_positive_rate: Optional[float] = None
+    false_positive_rate: Optional[float] = None
+    mean_z_score: Optional[float] = None
+    mean_bleu_score: Optional[float] = None
+
+
+class SweepCurve(BaseModel):
+    attack_type: str
+    points: List[SweepPoint]
+
+
+class SweepResult(BaseModel):
+    seed: int
+    generations_created: int
+    detections_created: int
+    curves: List[SweepCurve]
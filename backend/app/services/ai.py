@@ -1,42 +1,44 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, Sequence
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import torch
 import numpy as np
-from transformers import LogitsProcessorList
-from synthid_text import logits_processing
-
-from app.core.llm import llm_manager
-
-# Default Constants
-DEFAULT_NGRAM_LEN = 5
-DEFAULT_SAMPLING_TABLE_SIZE = 65536 * 4  # Increased to 262144 to safely cover Llama-3 vocab (128k)
-DEFAULT_SAMPLING_TABLE_SEED = 0
-DEFAULT_CONTEXT_HISTORY_SIZE = 1024
-DEFAULT_DEPTH = 3 
-
-def _get_keys(key_seed: int, depth: int) -> Sequence[int]:
-    """Generate reproducible keys based on a seed."""
-    rng = np.random.RandomState(key_seed)
-    # Generate arbitrary 64-bit integers as keys
-    # ensure they are python ints
-    return [int(x) for x in rng.randint(0, 2**30, size=depth).tolist()] # Using 30 to stay safe? logits_processor takes Sequence[int] and converts to tensor.
-
-async def generate_text(input_text: str, params: Dict[str, Any]) -> str:
-    raw_model_name = params.get("model", "google/gemma-2b-it")
-    
-    # Model Name Mapping (Frontend shortname -> HuggingFace ID)
-    MODEL_MAPPING = {
-        "Llama-3-8B": "meta-llama/Meta-Llama-3-8B-Instruct",
-        "Gemma-2-2B": "google/gemma-2b-it",
-    }
-    model_name = MODEL_MAPPING.get(raw_model_name, raw_model_name)
-    
-    # Load Model
-    model, tokenizer = llm_manager.get_model(model_name)
-    device = model.device
-    
-    # Prepare Inputs
+import sacrebleu
+from transformers import LogitsProcessorList, StoppingCriteria, StoppingCriteriaList
+from transformers.generation.streamers import BaseStreamer
+
+from app.core.config import settings
+from app.core.llm import llm_manager, resolve_model_name
+from app.core.metrics import (
+    GENERATED_TOKENS,
+    GENERATION_TOKENS_PER_SECOND,
+    TIME_TO_FIRST_TOKEN_SECONDS,
+    observe_stage,
+    track_cache,
+    track_queue,
+)
+from app.services.attacks import new_seed
+from app.services.batching import MicroBatcher
+from app.services import scoring
+from app.services.inference import bulk_inference, inference_pool
+from app.services.prefix_cache import PrefixCache
+from app.services.sampling import SeededSampler
+from app.services.tokens import token_cache
+from app.services.watermark import (
+    DEFAULT_DEPTH,
+    DEFAULT_NGRAM_LEN,
+    DEFAULT_WATERMARK_KEY,
+    processor_cache,
+)
+from app.services.watermark_keys import key_registry
+
+logger = logging.getLogger(__name__)
+
+def _build_prompt_ids(model_name: str, tokenizer: Any, input_text: str) -> List[int]:
     # Use Chat Template for Llama-3-Instruct or compatible models
     # Added "gemma" and "it" to cover Gemma-2-2B-IT
     if any(keyword in model_name.lower() for keyword in ["instruct", "chat", "llama-3", "gemma", "it"]):
@@ -49,231 +51,573 @@ async def generate_text(input_text: str, params: Dict[str, Any]) -> str:
                 {"role": "system", "content": "You are a helpful assistant. Please always answer in Korean."},
                 {"role": "user", "content": input_text},
             ]
-        
-        input_ids = tokenizer.apply_chat_template(
-            messages, 
-            add_generation_prompt=True, 
-            return_tensors="pt"
-        ).to(device)
-    else:
-        # Fallback: append Korean instruction to raw text
-        prompt = f"{input_text}\n\n(한국어로 답변해주세요)"
-        input_ids = tokenizer.encode(prompt, return_tensors="pt").to(device)
-
-    # Attention Mask (Important for Llama 3)
-    attention_mask = torch.ones_like(input_ids).to(device)
-    
-    # Generation Config
-    max_tokens = params.get("max_tokens") or 100
-    temperature = params.get("temperature") or 0.7
-    top_k = params.get("top_k") or 40
-    top_p = params.get("top_p") or 0.9
 
+        return list(tokenizer.apply_chat_template(messages, add_generation_prompt=True))
+
+    # Fallback: append Korean instruction to raw text
+    prompt = f"{input_text}\n\n(한국어로 답변해주세요)"
+    return list(tokenizer.encode(prompt))
+
+
+prefix_cache = PrefixCache(_build_prompt_ids)
+# The cached KV tensors live on the model's device; drop them with the model.
+llm_manager.add_eviction_listener(prefix_cache.invalidate_model)
+track_cache("prefix_kv", prefix_cache.stats)
+
+
+def _terminators(tokenizer: Any) -> List[int]:
     # Define terminators for Llama 3
     terminators = [tokenizer.eos_token_id]
-    
+
     # Llama 3 uses <|eot_id|> to end turns
     eot_id = tokenizer.convert_tokens_to_ids("<|eot_id|>")
     if isinstance(eot_id, int):
         terminators.append(eot_id)
-    
+    return terminators
+
+
+def _max_tokens_bucket(max_tokens: int) -> int:
+    """The power of two at or above ``max_tokens``."""
+    return 1 << max(0, int(max_tokens) - 1).bit_length()
+
+
+def _generation_batch_key(params: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Requests can only share a forward pass when everything but the prompt matches.
+
+    A batch decodes until its longest row is done, so ``max_tokens`` is part of
+    the key too, bucketed to powers of two: a 10-token request never waits
+    behind a 4096-token one, and no row decodes more than twice its budget.
+    """
+    model_name = resolve_model_name(params.get("model"))
+    temperature = params.get("temperature") or 0.7
+    top_k = params.get("top_k") or 40
+    top_p = params.get("top_p") or 0.9
+
+    watermark_enabled = bool(params.get("watermark_enabled", False))
+    wm_key_str = (params.get("watermark_key") or DEFAULT_WATERMARK_KEY) if watermark_enabled else None
+    wm_scheme = (params.get("watermark_key_scheme") or settings.watermark_key_scheme) if watermark_enabled else None
+
+    max_tokens_bucket = _max_tokens_bucket(params.get("max_tokens") or 100)
+
+    return (
+        model_name,
+        watermark_enabled,
+        wm_key_str,
+        wm_scheme,
+        float(temperature),
+        int(top_k),
+        float(top_p),
+        max_tokens_bucket,
+    )
+
+
+def _prepare_generation(
+    batch_key: Tuple[Any, ...],
+    input_texts: List[str],
+    max_tokens: int,
+    seeds: List[int],
+    *,
+    reuse_prefix: bool = True,
+) -> Tuple[Any, Any, torch.Tensor, Dict[str, Any]]:
+    """Load the model and build padded inputs plus ``model.generate`` kwargs for a batch.
+
+    Row ``i`` samples from its own generator seeded with ``seeds[i]``. Without
+    ``reuse_prefix`` the prompt is always prefilled from scratch.
+    """
+    model_name, watermark_enabled, wm_key_str, wm_scheme, temperature, top_k, top_p, _ = batch_key
+
+    # Load Model
+    model, tokenizer = llm_manager.get_model(model_name)
+    device = model.device
+
+    # Prepare Inputs (left-padded so every row ends right before its first new token)
+    prompts = [_build_prompt_ids(model_name, tokenizer, input_text) for input_text in input_texts]
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    width = max(len(p) for p in prompts)
+
+    input_ids = torch.full((len(prompts), width), pad_token_id, dtype=torch.long)
+    # Attention Mask (Important for Llama 3 and for the padded rows)
+    attention_mask = torch.zeros((len(prompts), width), dtype=torch.long)
+    for row, prompt in enumerate(prompts):
+        input_ids[row, width - len(prompt):] = torch.tensor(prompt, dtype=torch.long)
+        attention_mask[row, width - len(prompt):] = 1
+    input_ids = input_ids.to(device)
+    attention_mask = attention_mask.to(device)
+
+    # Generation Config: sampling happens in SeededSampler below, so generate()
+    # itself decodes greedily and must not add its own warpers (the model's
+    # generation_config may set them).
     gen_kwargs = {
         "max_new_tokens": max_tokens,
-        "temperature": temperature,
-        "do_sample": True,
-        "pad_token_id": tokenizer.eos_token_id,
-        "eos_token_id": terminators,
+        "do_sample": False,
+        "temperature": None,
+        "top_k": None,
+        "top_p": None,
+        "pad_token_id": pad_token_id,
+        "eos_token_id": _terminators(tokenizer),
         "attention_mask": attention_mask,
     }
-    if top_k: gen_kwargs["top_k"] = top_k
-    if top_p: gen_kwargs["top_p"] = top_p
-    
+
+    # Reuse the prefilled chat-template prefix (single rows have no padding to shift it).
+    if reuse_prefix and settings.prefix_cache_enabled and len(prompts) == 1:
+        past_key_values = prefix_cache.past_key_values(model_name, model, tokenizer, prompts[0])
+        if past_key_values is not None:
+            gen_kwargs["past_key_values"] = past_key_values
+
     # Watermark Setup
-    watermark_enabled = params.get("watermark_enabled", False)
     logits_processor_list = LogitsProcessorList()
-    
+
     if watermark_enabled:
-        # SynthID Config
-        wm_key_str = params.get("watermark_key") or "12345"
-        # simple hash to int
-        wm_key_int = int(sum(ord(c) for c in wm_key_str)) 
-        
-        # Use fixed depth (layers)
-        keys = _get_keys(wm_key_int, depth=DEFAULT_DEPTH)
-        
-        # Custom wrapper to match HuggingFace LogitsProcessor API
-        class HFWrapper(logits_processing.SynthIDLogitsProcessor):
-            def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
-                # Cast to float32 for stability during watermark calculation
-                original_dtype = scores.dtype
-                scores_f32 = scores.to(torch.float32)
-                
-                # watermarked_call logic (SynthID)
-                updated_scores_top_k, top_k_indices, _ = self.watermarked_call(input_ids, scores_f32)
-                
-                # We need to scatter these back to the full vocabulary scores.
-                # Initialize with -inf so that only the top_k indices are selectable
-                new_scores = torch.full_like(scores_f32, -float('inf'))
-                new_scores.scatter_(1, top_k_indices, updated_scores_top_k)
-                
-                # Cast back to original dtype (e.g., float16)
-                return new_scores.to(original_dtype)
-
-        processor = HFWrapper(
-            ngram_len=DEFAULT_NGRAM_LEN,
-            keys=keys,
-            sampling_table_size=DEFAULT_SAMPLING_TABLE_SIZE,
-            sampling_table_seed=DEFAULT_SAMPLING_TABLE_SEED,
-            context_history_size=DEFAULT_CONTEXT_HISTORY_SIZE,
-            temperature=1.0, # Pass 1.0 to avoid double temperature scaling if SynthID applies it internally
-            top_k=int(top_k),
-            device=device,
-        )
+        # The SynthID state is tracked per row, so one processor serves the whole batch.
+        processor = processor_cache.get(model_name, wm_key_str, device, scheme=wm_scheme).fork(top_k=top_k)
         logits_processor_list.append(processor)
+    # Last, so it samples from the watermarked distribution.
+    logits_processor_list.append(SeededSampler(seeds, temperature=temperature, top_k=top_k, top_p=top_p))
+    gen_kwargs["logits_processor"] = logits_processor_list
+
+    return model, tokenizer, input_ids, gen_kwargs
+
+
+class _TimingStreamer(BaseStreamer):
+    """Record when ``model.generate`` emits its first new token."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self._prompt_skipped = False
+
+    def put(self, value: torch.Tensor) -> None:
+        # The first call carries the prompt.
+        if not self._prompt_skipped:
+            self._prompt_skipped = True
+        elif self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def end(self) -> None:
+        pass
+
+    def observe(self, model_name: str, mode: str, new_tokens: int) -> None:
+        elapsed = time.perf_counter() - self.started
+        if self.first_token_at is not None:
+            TIME_TO_FIRST_TOKEN_SECONDS.labels(model=model_name, mode=mode).observe(self.first_token_at - self.started)
+        GENERATED_TOKENS.labels(model=model_name).inc(new_tokens)
+        if elapsed > 0 and new_tokens:
+            GENERATION_TOKENS_PER_SECOND.labels(model=model_name, mode=mode).observe(new_tokens / elapsed)
+
+
+def _generation_result(model_name: str, tokenizer: Any, generated_ids: torch.Tensor, seed: int) -> Dict[str, Any]:
+    output_text = tokenizer.decode(generated_ids, skip_special_tokens=True)
+    # Detection scores the re-encoded text (decode -> encode is not an identity),
+    # so that is what gets cached and persisted, not the sampled ids.
+    token_ids = list(tokenizer(output_text)["input_ids"])
+    token_cache.put(model_name, output_text, token_ids)
+    return {"output_text": output_text, "token_ids": token_ids, "seed": seed}
+
+
+def _generate_batch(
+    batch_key: Tuple[Any, ...], requests: List[Tuple[str, int, int]], *, reuse_prefix: bool = True
+) -> List[Dict[str, Any]]:
+    """Run one padded ``model.generate`` call for every (input_text, max_tokens, seed) triple."""
+    max_tokens = max(row_max_tokens for _, row_max_tokens, _ in requests)
+    model, tokenizer, input_ids, gen_kwargs = _prepare_generation(
+        batch_key,
+        [input_text for input_text, _, _ in requests],
+        max_tokens,
+        [seed for _, _, seed in requests],
+        reuse_prefix=reuse_prefix,
+    )
 
     # Generate
+    timing = _TimingStreamer()
+    with torch.no_grad():
+        outputs = model.generate(input_ids, streamer=timing, **gen_kwargs)
+
+    # Decode (skip input prompt, and cut each row at its own max_tokens)
+    width = input_ids.shape[1]
+    timing.observe(batch_key[0], "batch", int((outputs[:, width:] != gen_kwargs["pad_token_id"]).sum()))
+    results = []
+    for row, (_, row_max_tokens, seed) in enumerate(requests):
+        generated_ids = outputs[row][width:width + row_max_tokens]
+        results.append(_generation_result(batch_key[0], tokenizer, generated_ids, seed))
+    return results
+
+
+async def _run_generation_batch(
+    batch_key: Tuple[Any, ...], requests: List[Tuple[str, int, int]]
+) -> List[Dict[str, Any]]:
+    return await inference_pool.run(_generate_batch, batch_key, requests)
+
+
+generation_batcher = MicroBatcher(
+    _run_generation_batch,
+    max_batch_size=settings.generation_max_batch_size,
+    window_s=settings.generation_batch_window_ms / 1000.0,
+)
+track_queue("generation_batch", "pending", generation_batcher.pending)
+
+
+def _seed(params: Dict[str, Any]) -> int:
+    seed = params.get("seed")
+    return int(seed) if seed is not None else new_seed()
+
+
+async def generate_text(input_text: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``{"output_text": ..., "token_ids": ..., "seed": ...}`` for one prompt.
+
+    Unseeded prompts are micro-batched and may reuse the prefilled prompt
+    prefix; a random seed is drawn and returned. Padding and the cached prefix
+    change the logits slightly, so replaying that seed is not guaranteed to
+    give the same tokens. With ``params["seed"]`` the prompt always runs alone
+    and is prefilled from scratch, so the same request and seed sample the
+    same tokens whatever else is in flight.
+    """
+    max_tokens = int(params.get("max_tokens") or 100)
+    batch_key = _generation_batch_key(params)
+    if params.get("seed") is not None:
+        (result,) = await inference_pool.run(
+            _generate_batch, batch_key, [(input_text, max_tokens, _seed(params))], reuse_prefix=False
+        )
+        return result
+    return await generation_batcher.submit(batch_key, (input_text, max_tokens, _seed(params)))
+
+
+async def generate_text_bulk(input_text: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """:func:`generate_text` for jobs, batch attacks and sweeps.
+
+    Goes through ``bulk_inference``, so submitting many prompts at once waits
+    for free slots instead of being rejected with ``InferenceQueueFull``.
+    """
+    return await bulk_inference.run(generate_text, input_text, params)
+
+
+def _preload(model_name: str, warm_up: bool) -> None:
+    llm_manager.get_model(model_name)
+    if warm_up:
+        # A short watermarked generation builds the cached processor and runs the
+        # first (slow) CUDA kernels before a real user has to wait for them.
+        batch_key = _generation_batch_key({"model": model_name, "watermark_enabled": True})
+        _generate_batch(batch_key, [("Hello", 4, 0)])
+
+
+async def preload_models(model_names: List[str], warm_up: bool = True) -> None:
+    """Load (and optionally warm up) models one after another on the inference pool."""
+    for raw_model_name in model_names:
+        model_name = resolve_model_name(raw_model_name)
+        try:
+            await inference_pool.run(_preload, model_name, warm_up)
+        except Exception:
+            logger.exception("Preloading %s failed", model_name)
+
+
+class _QueueStreamer(_TimingStreamer):
+    """Push decoded text deltas from the generate thread onto an asyncio queue.
+
+    Like ``transformers.TextStreamer``, the token cache is decoded as a whole and
+    only flushed up to a newline, so multi-token characters (Korean byte-fallback
+    pieces in particular) are never emitted half-decoded.
+    """
+
+    def __init__(self, tokenizer: Any, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue) -> None:
+        super().__init__()
+        self._tokenizer = tokenizer
+        self._loop = loop
+        self._queue = queue
+        self._token_cache: List[int] = []
+        self._print_len = 0
+
+    def put(self, value: torch.Tensor) -> None:
+        prompt = not self._prompt_skipped
+        super().put(value)
+        if prompt:
+            return
+
+        self._token_cache.extend(value.reshape(-1).tolist())
+        text = self._tokenizer.decode(self._token_cache, skip_special_tokens=True)
+
+        if text.endswith("\n"):
+            delta = text[self._print_len:]
+            self._token_cache = []
+            self._print_len = 0
+        elif text.endswith("\ufffd"):
+            return
+        else:
+            delta = text[self._print_len:]
+            self._print_len += len(delta)
+        self._push(delta)
+
+    def end(self) -> None:
+        if self._token_cache:
+            text = self._tokenizer.decode(self._token_cache, skip_special_tokens=True)
+            self._push(text[self._print_len:])
+        self._token_cache = []
+        self._print_len = 0
+
+    def _push(self, delta: str) -> None:
+        if delta:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, delta)
+
+
+class _CancelCriteria(StoppingCriteria):
+    """Stop decoding as soon as the streaming client has gone away."""
+
+    def __init__(self, cancelled: threading.Event) -> None:
+        self._cancelled = cancelled
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs: Any) -> torch.BoolTensor:
+        return torch.full((input_ids.shape[0],), self._cancelled.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+def _generate_stream(
+    batch_key: Tuple[Any, ...],
+    input_text: str,
+    max_tokens: int,
+    seed: int,
+    loop: asyncio.AbstractEventLoop,
+    queue: asyncio.Queue,
+    cancelled: threading.Event,
+    reuse_prefix: bool = True,
+) -> Dict[str, Any]:
+    model, tokenizer, input_ids, gen_kwargs = _prepare_generation(
+        batch_key, [input_text], max_tokens, [seed], reuse_prefix=reuse_prefix
+    )
+    streamer = _QueueStreamer(tokenizer, loop, queue)
+
     with torch.no_grad():
         outputs = model.generate(
             input_ids,
-            logits_processor=logits_processor_list,
+            streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([_CancelCriteria(cancelled)]),
             **gen_kwargs
         )
-    
-    # Decode (skip input prompt)
-    generated_ids = outputs[0][len(input_ids[0]):]
-    output_text = tokenizer.decode(generated_ids, skip_special_tokens=True)
-    
-    return output_text
-
-
-async def attack_text(text: str, attack_type: str, intensity: float) -> str:
-    # Basic Stub for attacks
-    if not attack_type:
-        return text
-
-    if attack_type == "deletion":
-        # Simulate deleting % of characters
-        length = len(text)
-        num_delete = int(length * intensity)
-        if num_delete > 0:
-            import random
-            indices = set(random.sample(range(length), num_delete))
-            return "".join([c for i, c in enumerate(text) if i not in indices])
-    
-    elif attack_type == "substitution":
-        # Simulate substitution
-        import random
-        import string
-        length = len(text)
-        num_sub = int(length * intensity)
-        chars = list(text)
-        for _ in range(num_sub):
-            idx = random.randint(0, length - 1)
-            chars[idx] = random.choice(string.ascii_letters)
-        return "".join(chars)
-        
-    return text
-
-
-async def detect_text(text: str, watermark_key: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
-    raw_model_name = params.get("model", "google/gemma-2b-it")
-    
-    # Model Name Mapping (Frontend shortname -> HuggingFace ID)
-    MODEL_MAPPING = {
-        "Llama-3-8B": "meta-llama/Meta-Llama-3-8B-Instruct",
-        "Gemma-2-2B": "google/gemma-2b-it",
-    }
-    model_name = MODEL_MAPPING.get(raw_model_name, raw_model_name)
 
-    model, tokenizer = llm_manager.get_model(model_name)
-    device = model.device
-    
-    wm_key_str = watermark_key or "12345"
-    wm_key_int = int(sum(ord(c) for c in wm_key_str)) 
-    keys = _get_keys(wm_key_int, depth=DEFAULT_DEPTH)
-    
-    # We instantiate the processor JUST to use its helper computation methods.
-    # The temp/top_k here don't affect compute_g_values, but are required for init.
-    processor = logits_processing.SynthIDLogitsProcessor(
-        ngram_len=DEFAULT_NGRAM_LEN,
-        keys=keys,
-        sampling_table_size=DEFAULT_SAMPLING_TABLE_SIZE,
-        sampling_table_seed=DEFAULT_SAMPLING_TABLE_SEED,
-        context_history_size=DEFAULT_CONTEXT_HISTORY_SIZE,
-        temperature=1.0, 
-        top_k=40,
-        device=device,
+    generated_ids = outputs[0][input_ids.shape[1]:]
+    streamer.observe(batch_key[0], "stream", int(generated_ids.numel()))
+    return _generation_result(batch_key[0], tokenizer, generated_ids, seed)
+
+
+async def generate_text_stream(input_text: str, params: Dict[str, Any]) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield ``("token", delta)`` events while generating, then ``("done", result)``
+    where ``result`` has the same shape as :func:`generate_text`'s return value.
+
+    Streaming requests bypass the micro-batcher (each needs its own streamer) but
+    still run on the inference pool; seeded ones skip the prefix cache like in
+    :func:`generate_text`. Closing the iterator early, e.g. because the
+    client disconnected, stops ``model.generate`` at the next decoding step.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+    max_tokens = int(params.get("max_tokens") or 100)
+
+    task = asyncio.ensure_future(
+        inference_pool.run(
+            _generate_stream,
+            _generation_batch_key(params),
+            input_text,
+            max_tokens,
+            _seed(params),
+            loop,
+            queue,
+            cancelled,
+            # Seeded streams take the same path as seeded generate_text calls.
+            params.get("seed") is None,
+        )
     )
-    
-    # Encode text
-    # Note: Detector usually runs on the FULL text (including prompt? or just generation?)
-    # Usually just generation. But context matters for ngram.
-    # If we only have the output text, we treat it as the sequence.
-    input_ids = tokenizer.encode(text, return_tensors="pt").to(device)
-    
-    if input_ids.shape[1] < DEFAULT_NGRAM_LEN:
-        return {
-            "is_watermarked": False,
-            "z_score": 0.0,
-            "confidence": 0.0
-        }
+    try:
+        while not task.done() or not queue.empty():
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield "token", getter.result()
+            else:
+                getter.cancel()
+
+        yield "done", task.result()
+    finally:
+        if not task.done():
+            cancelled.set()
+
+
+async def detect_text(
+    text: str, watermark_key: Optional[str], params: Dict[str, Any], token_ids: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    return (await detect_texts([text], watermark_key, params, [token_ids]))[0]
+
+
+async def detect_texts(
+    texts: List[str],
+    watermark_key: Optional[str],
+    params: Dict[str, Any],
+    token_ids: Optional[List[Optional[List[int]]]] = None,
+) -> List[Dict[str, Any]]:
+    """Score many texts that share a model and watermark key.
+
+    Texts are scored in chunks of ``settings.detection_batch_size`` so one huge
+    request cannot monopolise the inference pool or the device memory.
+    ``token_ids[i]``, when given (e.g. ``Generation.output_token_ids``), is used
+    instead of tokenizing ``texts[i]``. ``params["scoring"]`` selects the
+    detector (``mean``, ``weighted_mean`` or ``bayesian``; default ``mean``) and
+    ``params["watermark_key_scheme"]`` how the key was derived (default
+    ``settings.watermark_key_scheme``).
+    """
+    model_name = resolve_model_name(params.get("model"))
+    mode = params.get("scoring") or "mean"
+    if mode not in scoring.SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode: {mode}")
+    scheme = params.get("watermark_key_scheme")
+    chunk_size = max(1, settings.detection_batch_size)
+
+    results: List[Dict[str, Any]] = []
+    for start in range(0, len(texts), chunk_size):
+        chunk = texts[start:start + chunk_size]
+        known = token_ids[start:start + chunk_size] if token_ids is not None else None
+        results.extend(
+            await inference_pool.run(_detect_batch, model_name, watermark_key, chunk, known, mode, scheme)
+        )
+    return results
 
-    # Compute masks and g-values
-    # g_values shape: [batch_size, seq_len - (ngram_len - 1), depth]
-    g_values = processor.compute_g_values(input_ids)
-    
+
+def _empty_detection(mode: str) -> Dict[str, Any]:
+    return {
+        "is_watermarked": False,
+        "z_score": 0.0,
+        "confidence": 0.0,
+        "scoring": mode,
+    }
+
+
+def _valid_mask(processor: Any, tokenizer: Any, input_ids: torch.Tensor) -> np.ndarray:
     # Compute relevant masks
     context_repetition_mask = processor.compute_context_repetition_mask(input_ids)
-    # eos_mask usually to ignore padding/eos. Since we have raw text, maybe just rely on tokenization.
-    # But compute_eos_token_mask requires eos_token_id.
     eos_token_mask = processor.compute_eos_token_mask(input_ids, tokenizer.eos_token_id)
     # Truncate eos mask to match g_values shape which is shorter by ngram_len-1
     eos_token_mask = eos_token_mask[:, DEFAULT_NGRAM_LEN - 1 :]
-    
+
     # Combine masks: we want tokens that are NOT repetition and NOT eos
     # context_repetition_mask matches g_values shape
-    combined_mask = context_repetition_mask * eos_token_mask
-    
-    # Calculate Mean Score
-    # We masked out invalid g-values.
-    # g_values is 0 or 1.
-    
-    # Flatten everything valid
-    mask_bool = combined_mask.bool()
-    valid_g_values = g_values[mask_bool.unsqueeze(-1).expand_as(g_values)] 
-    # This flattening might be tricky if depth > 1. 
-    # We want mean across depth too? 
-    # Yes, SynthID mean score usually averages across depth too for the simplest scalar score.
-    
-    if valid_g_values.numel() == 0:
-        return {
-            "is_watermarked": False,
-            "z_score": 0.0,
-            "confidence": 0.0
+    return (context_repetition_mask * eos_token_mask).bool().cpu().numpy()
+
+
+def _detect_batch(
+    model_name: str,
+    watermark_key: Optional[str],
+    texts: List[str],
+    known_token_ids: Optional[List[Optional[List[int]]]] = None,
+    mode: str = "mean",
+    scheme: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    model, tokenizer = llm_manager.get_model(model_name)
+    device = model.device
+
+    # The cached processor is only used for its helper computation methods.
+    processor = processor_cache.get(model_name, watermark_key or DEFAULT_WATERMARK_KEY, device, scheme=scheme)
+
+    # Encode text
+    # Note: Detector usually runs on the FULL text (including prompt? or just generation?)
+    # Usually just generation. But context matters for ngram.
+    # If we only have the output text, we treat it as the sequence.
+    with observe_stage(model_name, "tokenize"):
+        encoded = token_cache.encode_many(model_name, tokenizer, texts, known_token_ids)
+
+    results = [_empty_detection(mode) for _ in texts]
+    rows = [i for i, ids in enumerate(encoded) if len(ids) >= DEFAULT_NGRAM_LEN]
+    if not rows:
+        return results
+
+    with observe_stage(model_name, "g_values"):
+        # Right-pad with EOS: the eos mask below already drops everything from the
+        # first EOS onwards, so padding never contributes g-values.
+        width = max(len(encoded[i]) for i in rows)
+        input_ids = torch.full((len(rows), width), tokenizer.eos_token_id, dtype=torch.long)
+        for row, i in enumerate(rows):
+            input_ids[row, :len(encoded[i])] = torch.tensor(encoded[i], dtype=torch.long)
+        input_ids = input_ids.to(device)
+
+        # Compute masks and g-values
+        # g_values shape: [batch_size, seq_len - (ngram_len - 1), depth]
+        g_values = processor.compute_g_values(input_ids)
+
+        combined_mask = _valid_mask(processor, tokenizer, input_ids)
+        g_values = g_values.cpu().numpy().astype(np.uint8)
+
+    # Score every row at once (g_values is 0 or 1)
+    with observe_stage(model_name, "scoring"):
+        scored = scoring.score(g_values, combined_mask, mode=mode)
+
+    for row, i in enumerate(rows):
+        if scored[row] is None:
+            continue
+        # The row's own positions (without padding) are returned so they can be
+        # stored and re-scored later without the model.
+        num_positions = len(encoded[i]) - (DEFAULT_NGRAM_LEN - 1)
+        results[i] = {
+            **scored[row],
+            "true_positive_rate": None,
+            "false_positive_rate": None,
+            "roc_auc": None,
+            "bleu_score": None,
+            "g_values": g_values[row, :num_positions],
+            "g_mask": combined_mask[row, :num_positions],
         }
-        
-    mean_score = valid_g_values.float().mean().item()
-    count = valid_g_values.numel()
-    
-    # Z-Score Calculation (assuming unwatermarked mean is 0.5)
-    # Standard Error = 0.5 / sqrt(N)
-    # Z = (Mean - 0.5) / SE
-    std_error = 0.5 / np.sqrt(count)
-    z_score = (mean_score - 0.5) / std_error
-    
-    # Simple p-value (one-sided)
-    import scipy.stats
-    p_value = scipy.stats.norm.sf(z_score)
-    
-    is_watermarked = z_score > 3.0 # Threshold
-    
-    return {
-        "is_watermarked": bool(is_watermarked),
-        "z_score": float(z_score),
-        "p_value": float(p_value),
-        "confidence": float(1.0 - p_value), # rough proxy
-        "true_positive_rate": None,
-        "false_positive_rate": None,
-        "roc_auc": None,
-        "bleu_score": None,
-    }
+    return results
+
+
+async def attribute_text(
+    text: str,
+    watermark_keys: List[str],
+    params: Dict[str, Any],
+    token_ids: Optional[List[int]] = None,
+) -> List[Dict[str, Any]]:
+    """Score ``text`` against every key in ``watermark_keys``, most likely key first.
+
+    The text is tokenized once and the g-values of all keys come out of a
+    single ``compute_g_values`` call, so N keys cost about one detection.
+    """
+    model_name = resolve_model_name(params.get("model"))
+    mode = params.get("scoring") or "mean"
+    if mode not in scoring.SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode: {mode}")
+    scheme = params.get("watermark_key_scheme")
+    return await inference_pool.run(_attribute, model_name, text, watermark_keys, token_ids, mode, scheme)
+
+
+def _attribute(
+    model_name: str,
+    text: str,
+    watermark_keys: List[str],
+    token_ids: Optional[List[int]],
+    mode: str,
+    scheme: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    model, tokenizer = llm_manager.get_model(model_name)
+    device = model.device
+    processor = processor_cache.get(model_name, DEFAULT_WATERMARK_KEY, device)
+
+    (encoded,) = token_cache.encode_many(model_name, tokenizer, [text], [token_ids])
+    if len(encoded) < DEFAULT_NGRAM_LEN:
+        return [{"watermark_key": key, **_empty_detection(mode)} for key in watermark_keys]
+    input_ids = torch.tensor([encoded], dtype=torch.long, device=device)
+
+    # Stack the depth keys of every watermark key: [1, L, N * depth] g-values in one pass.
+    keys = [k for watermark_key in watermark_keys for k in key_registry.get(watermark_key, DEFAULT_DEPTH, scheme)]
+    g_values = processor.with_keys(keys).compute_g_values(input_ids)
+    # The masks only depend on the text, not on the keys.
+    mask = _valid_mask(processor, tokenizer, input_ids)
+
+    num_positions = g_values.shape[1]
+    g_values = g_values.cpu().numpy().astype(np.uint8)
+    g_values = g_values.reshape(num_positions, len(watermark_keys), DEFAULT_DEPTH).transpose(1, 0, 2)
+    mask = np.broadcast_to(mask, (len(watermark_keys), num_positions))
+
+    results = [
+        {"watermark_key": key, **(result or _empty_detection(mode))}
+        for key, result in zip(watermark_keys, scoring.score(g_values, mask, mode=mode))
+    ]
+    rank_by = "confidence" if mode == "bayesian" else "z_score"
+    results.sort(key=lambda r: r[rank_by], reverse=True)
+    return results
+
+
+def bleu_score(hypothesis: str, reference: str) -> float:
+    # BLEU expects a list of reference strings
+    return sacrebleu.sentence_bleu(hypothesis, [reference]).score
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import secrets
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.generation import Generation
+
+# (text, fraction in [0, 1], rng) -> attacked text
+TextAttack = Callable[[str, float, np.random.Generator], str]
+# (texts, fraction in [0, 1], model) -> attacked texts
+ModelAttack = Callable[[List[str], float, Sequence[int], Optional[str]], Awaitable[List[str]]]
+
+TEXT_ATTACKS: Dict[str, TextAttack] = {}
+MODEL_ATTACKS: Dict[str, ModelAttack] = {}
+
+
+def register_attack(name: str) -> Callable[[TextAttack], TextAttack]:
+    def decorator(fn: TextAttack) -> TextAttack:
+        TEXT_ATTACKS[name] = fn
+        return fn
+    return decorator
+
+
+def register_model_attack(name: str) -> Callable[[ModelAttack], ModelAttack]:
+    def decorator(fn: ModelAttack) -> ModelAttack:
+        MODEL_ATTACKS[name] = fn
+        return fn
+    return decorator
+
+
+def attack_names() -> List[str]:
+    return sorted([*TEXT_ATTACKS, *MODEL_ATTACKS])
+
+
+# Texts attacked per worker-thread hop by apply_attacks.
+TEXT_ATTACK_CHUNK_SIZE = 256
+
+
+def new_seed() -> int:
+    # Fits in a signed BIGINT column.
+    return secrets.randbits(62)
+
+
+# --- Vectorised edit primitives over a 1-D array of units (characters or words) ---
+
+def _delete(units: np.ndarray, fraction: float, rng: np.random.Generator) -> np.ndarray:
+    count = int(len(units) * fraction)
+    if count <= 0:
+        return units
+    keep = np.ones(len(units), dtype=bool)
+    keep[rng.choice(len(units), size=count, replace=False)] = False
+    return units[keep]
+
+
+def _substitute(units: np.ndarray, fraction: float, rng: np.random.Generator, pool: np.ndarray) -> np.ndarray:
+    count = int(len(units) * fraction)
+    if count <= 0 or len(pool) == 0:
+        return units
+    units = units.copy()
+    units[rng.choice(len(units), size=count, replace=False)] = rng.choice(pool, size=count)
+    return units
+
+
+def _insert(units: np.ndarray, fraction: float, rng: np.random.Generator, pool: np.ndarray) -> np.ndarray:
+    count = int(len(units) * fraction)
+    if count <= 0 or len(pool) == 0:
+        return units
+    positions = rng.integers(0, len(units) + 1, size=count)
+    return np.insert(units, positions, rng.choice(pool, size=count))
+
+
+def _swap(units: np.ndarray, fraction: float, rng: np.random.Generator) -> np.ndarray:
+    # Swaps adjacent pairs; chosen positions may overlap, like repeated typos would.
+    count = min(int(len(units) * fraction), len(units) - 1)
+    if count <= 0:
+        return units
+    units = units.copy()
+    left = rng.choice(len(units) - 1, size=count, replace=False)
+    units[left], units[left + 1] = units[left + 1], units[left]
+    return units
+
+
+def _chars(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+def _from_chars(chars: np.ndarray) -> str:
+    return chars.astype(np.uint32).tobytes().decode("utf-32-le")
+
+
+_WHITESPACE = re.compile(r"(\s+)")
+
+
+def _words(text: str) -> Tuple[np.ndarray, List[str], str]:
+    """Split ``text`` into its words, the whitespace before each word and the trailing whitespace.
+
+    Word attacks only edit the words, so newlines and runs of spaces survive.
+    """
+    parts = _WHITESPACE.split(text)
+    words, gaps = parts[0::2], [""] + parts[1::2]
+    trailing = ""
+    if len(words) > 1 and words[-1] == "":
+        words.pop()
+        trailing = gaps.pop()
+    if words and words[0] == "":
+        # Leading whitespace (or an empty text): the gap before the first word.
+        words.pop(0)
+        first_gap = gaps.pop(0) + (gaps.pop(0) if gaps else "")
+        if words:
+            gaps.insert(0, first_gap)
+        else:
+            trailing = first_gap + trailing
+    return np.array(words, dtype=object), gaps, trailing
+
+
+def _gaps_for(order: np.ndarray, gaps: List[str]) -> List[str]:
+    """Whitespace before each word of an edited word order.
+
+    ``order`` indexes the original words; indices past them mark inserted
+    words, which get a single space. A word keeps the whitespace that preceded
+    it, or, when the words before it were deleted, the widest gap among theirs
+    (so deleting the first word of a paragraph keeps the paragraph break).
+    """
+    result: List[str] = []
+    previous = -1
+    for i in order.tolist():
+        if not 0 < i < len(gaps):
+            result.append(" ")
+        elif 0 <= previous < i - 1:
+            result.append(max(gaps[previous + 1:i + 1], key=lambda gap: (gap.count("\n"), len(gap))))
+        else:
+            result.append(gaps[i])
+        previous = i
+    if result:
+        result[0] = gaps[0]
+    return result
+
+
+def _from_words(words: np.ndarray, gaps: List[str], trailing: str) -> str:
+    return "".join(gap + word for gap, word in zip(gaps, words.tolist())) + trailing
+
+
+# Substituted and inserted units are drawn from the text itself, so Korean text
+# gets Korean noise rather than ASCII letters.
+
+@register_attack("deletion")
+def char_deletion(text: str, fraction: float, rng: np.random.Generator) -> str:
+    return _from_chars(_delete(_chars(text), fraction, rng))
+
+
+@register_attack("substitution")
+def char_substitution(text: str, fraction: float, rng: np.random.Generator) -> str:
+    chars = _chars(text)
+    return _from_chars(_substitute(chars, fraction, rng, np.unique(chars)))
+
+
+@register_attack("insertion")
+def char_insertion(text: str, fraction: float, rng: np.random.Generator) -> str:
+    chars = _chars(text)
+    return _from_chars(_insert(chars, fraction, rng, np.unique(chars)))
+
+
+@register_attack("swap")
+def char_swap(text: str, fraction: float, rng: np.random.Generator) -> str:
+    return _from_chars(_swap(_chars(text), fraction, rng))
+
+
+@register_attack("word_deletion")
+def word_deletion(text: str, fraction: float, rng: np.random.Generator) -> str:
+    words, gaps, trailing = _words(text)
+    kept = _delete(np.arange(len(words)), fraction, rng)
+    return _from_words(words[kept], _gaps_for(kept, gaps), trailing)
+
+
+@register_attack("word_substitution")
+def word_substitution(text: str, fraction: float, rng: np.random.Generator) -> str:
+    words, gaps, trailing = _words(text)
+    return _from_words(_substitute(words, fraction, rng, words), gaps, trailing)
+
+
+@register_attack("word_insertion")
+def word_insertion(text: str, fraction: float, rng: np.random.Generator) -> str:
+    words, gaps, trailing = _words(text)
+    n = len(words)
+    order = _insert(np.arange(n), fraction, rng, np.arange(n, 2 * n))
+    return _from_words(np.concatenate((words, words))[order], _gaps_for(order, gaps), trailing)
+
+
+@register_attack("word_swap")
+def word_swap(text: str, fraction: float, rng: np.random.Generator) -> str:
+    words, gaps, trailing = _words(text)
+    return _from_words(_swap(words, fraction, rng), gaps, trailing)
+
+
+# --- Model-based rewrites (sampled, unwatermarked generation on a local model) ---
+
+async def _rewrite(
+    prompts: List[str], seeds: Sequence[int], model: Optional[str], temperature: float
+) -> List[str]:
+    # Deferred so the text attacks work without the torch/transformers stack.
+    from app.services.ai import generate_text_bulk
+
+    params = {
+        "model": model,
+        "watermark_enabled": False,
+        "temperature": temperature,
+        "max_tokens": settings.attack_max_tokens,
+    }
+    # The attack seed of each text seeds its rewrite, so the stored attack_seed
+    # reproduces it. Seeded rewrites run one per pass; they are still submitted
+    # together, throttled to the bulk limit.
+    outputs = await asyncio.gather(
+        *(generate_text_bulk(prompt, {**params, "seed": seed}) for prompt, seed in zip(prompts, seeds))
+    )
+    return [output["output_text"] for output in outputs]
+
+
+@register_model_attack("summarization")
+async def summarization(texts: List[str], fraction: float, seeds: Sequence[int], model: Optional[str]) -> List[str]:
+    # Higher intensity -> shorter summary.
+    keep = max(10, int(round((1.0 - fraction) * 100)))
+    prompts = [f"다음 글을 원래 분량의 약 {keep}% 길이로 요약해줘:\n\n{text}" for text in texts]
+    return await _rewrite(prompts, seeds, model, temperature=0.7)
+
+
+@register_model_attack("paraphrase")
+async def paraphrase(texts: List[str], fraction: float, seeds: Sequence[int], model: Optional[str]) -> List[str]:
+    # Higher intensity -> hotter sampling, i.e. a freer rewrite.
+    prompts = [f"다음 글을 같은 의미를 유지하면서 다른 표현으로 바꿔 써줘:\n\n{text}" for text in texts]
+    return await _rewrite(prompts, seeds, model, temperature=0.3 + 0.9 * fraction)
+
+
+async def apply_attacks(
+    texts: List[str],
+    attack_type: str,
+    intensity: float,
+    seeds: Sequence[int],
+    model: Optional[str] = None,
+) -> List[str]:
+    """Apply one attack config to many texts.
+
+    ``intensity`` is a percentage (0-100). Text attacks use one
+    ``numpy.random.Generator`` per text seeded with ``seeds[i]``, so a text
+    attacked with the same seed always gives the same result, alone or in a
+    batch. Model attacks sample from ``model`` with ``seeds[i]`` as the
+    generation seed of text ``i``.
+    """
+    fraction = min(max(float(intensity) / 100.0, 0.0), 1.0)
+    if attack_type in MODEL_ATTACKS:
+        return await MODEL_ATTACKS[attack_type](texts, fraction, seeds, model)
+    if attack_type not in TEXT_ATTACKS:
+        raise ValueError(f"Unknown attack type: {attack_type}")
+    attack = TEXT_ATTACKS[attack_type]
+
+    def run(start: int) -> List[str]:
+        chunk = zip(texts[start:start + TEXT_ATTACK_CHUNK_SIZE], seeds[start:start + TEXT_ATTACK_CHUNK_SIZE])
+        return [attack(text, fraction, np.random.default_rng(seed)) for text, seed in chunk]
+
+    # CPU-bound: run in a worker thread a chunk at a time, off the event loop.
+    attacked: List[str] = []
+    for start in range(0, len(texts), TEXT_ATTACK_CHUNK_SIZE):
+        attacked.extend(await asyncio.to_thread(run, start))
+    return attacked
+
+
+async def apply_attack(
+    text: str, attack_type: str, intensity: float, seed: int, model: Optional[str] = None
+) -> str:
+    return (await apply_attacks([text], attack_type, intensity, [seed], model))[0]
+
+
+async def apply_attacks_by_model(
+    texts: List[str],
+    models: Sequence[Optional[str]],
+    attack_type: str,
+    intensity: float,
+    seeds: Sequence[int],
+) -> List[str]:
+    """:func:`apply_attacks` for texts that belong to different models.
+
+    Texts are grouped per model so model attacks share one generation pass.
+    """
+    groups: Dict[Optional[str], List[int]] = defaultdict(list)
+    for i, model in enumerate(models):
+        groups[model].append(i)
+
+    attacked: List[str] = list(texts)
+    for model, indices in groups.items():
+        outputs = await apply_attacks(
+            [texts[i] for i in indices], attack_type, intensity, [seeds[i] for i in indices], model
+        )
+        for i, output in zip(indices, outputs):
+            attacked[i] = output
+    return attacked
+
+
+def attack_row(original: Generation, attack_type: str, intensity: float, attacked: str, seed: int) -> Dict[str, Any]:
+    """``Generation`` column values for an attacked copy of ``original``."""
+    return {
+        "original_id": original.generation_id,
+        "input_text": original.input_text,
+        "output_text": attacked,
+        "model": original.model,
+        "quantization": original.quantization,
+        "temperature": original.temperature,
+        "top_k": original.top_k,
+        "top_p": original.top_p,
+        "max_tokens": original.max_tokens,
+        "watermark_enabled": original.watermark_enabled,
+        "context_width": original.context_width,
+        "tournament_size": original.tournament_size,
+        "g_value": original.g_value,
+        "watermark_key": original.watermark_key,
+        "watermark_key_scheme": original.watermark_key_scheme,
+        "attack_type": attack_type,
+        "attack_intensity": intensity,
+        "attack_seed": seed,
+    }
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+BatchRunner = Callable[[Hashable, List[Any]], Awaitable[Sequence[Any]]]
+
+
+class MicroBatcher:
+    """Coalesce concurrent requests that share a batch key into a single call.
+
+    The first request for a key opens a collection window of ``window_s``
+    seconds. Every request with the same key that arrives before the window
+    closes (or until ``max_batch_size`` is reached) joins the batch; the
+    runner is then awaited once with all items and each caller receives the
+    result at its own position.
+    """
+
+    def __init__(self, runner: BatchRunner, *, max_batch_size: int, window_s: float) -> None:
+        self._runner = runner
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window_s = max(0.0, float(window_s))
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        # Running batches; the loop only keeps weak references to tasks.
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+
+        bucket = self._pending.setdefault(key, [])
+        bucket.append((item, future))
+
+        if len(bucket) >= self.max_batch_size:
+            self._flush(key)
+        elif len(bucket) == 1:
+            self._timers[key] = loop.call_later(self.window_s, self._flush, key)
+
+        return await future
+
+    def pending(self) -> int:
+        return sum(len(bucket) for bucket in self._pending.values())
+
+    def _flush(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        # Runner errors reach the callers; anything else would go unseen.
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Micro-batch failed", exc_info=task.exception())
+
+    async def _run(self, key: Hashable, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        # Callers that gave up (e.g. client disconnected) are dropped before running.
+        batch = [(item, fut) for item, fut in batch if not fut.done()]
+        if not batch:
+            return
+
+        try:
+            results = await self._runner(key, [item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch runner returned {len(results)} results for {len(batch)} items")
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+
+class BuildCache(Generic[T]):
+    """Bounded LRU of values that are expensive to build.
+
+    A miss builds outside the cache lock, so hits for other keys never wait
+    on it; concurrent misses for the same key wait for that one build (and
+    build themselves if it failed). Values whose key is invalidated while
+    being built are returned to their caller but not cached.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max(1, int(max_size))
+        self._items: "OrderedDict[Hashable, T]" = OrderedDict()
+        # Keys being built right now, and those of them invalidated meanwhile.
+        self._building: Dict[Hashable, threading.Event] = {}
+        self._stale: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, key: Hashable, build: Callable[[], T]) -> T:
+        while True:
+            with self._lock:
+                value = self._items.get(key)
+                if value is not None:
+                    self.hits += 1
+                    self._items.move_to_end(key)
+                    return value
+                building = self._building.get(key)
+                if building is None:
+                    self.misses += 1
+                    self._building[key] = building = threading.Event()
+                    break
+            building.wait()
+
+        value: Optional[T] = None
+        try:
+            value = build()
+            return value
+        finally:
+            with self._lock:
+                del self._building[key]
+                stale = key in self._stale
+                self._stale.discard(key)
+                if value is not None and not stale:
+                    self._items[key] = value
+                    while len(self._items) > self.max_size:
+                        self._items.popitem(last=False)
+                        self.evictions += 1
+            building.set()
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drop every cached key matching ``predicate``; builds under way for one are not cached."""
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]:
+                del self._items[key]
+            self._stale.update(k for k in self._building if predicate(k))
+
+    def clear(self) -> None:
+        self.invalidate(lambda key: True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import Integer, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.detection import Detection
+from app.models.generation import Generation
+from app.services.roc import auc, downsample, roc_from_counts
+
+METRIC_VERDICT = "verdict"
+METRIC_CONFIDENCE = "confidence"
+METRIC_Z_SCORE = "z_score"
+
+# Confidence histogram: width_bucket(confidence, 0, 1, 5) -> 1..5 (1.0 is folded into the last bin)
+CONFIDENCE_BINS = ["0-20", "20-40", "40-60", "60-80", "80-100"]
+
+
+class AggregateRow(NamedTuple):
+    """One dashboard counter cell.
+
+    ``watermark_enabled`` is the ground truth of the source generation. The
+    bucket depends on the metric: the detector verdict (0/1), the confidence
+    bin (1..5) or the z-score bin ``floor(z / dashboard_z_resolution)``.
+    """
+
+    metric: str
+    watermark_enabled: bool
+    bucket: int
+    count: int
+
+
+def confidence_bin(confidence: Any) -> Any:
+    return func.least(func.width_bucket(confidence, 0.0, 1.0, len(CONFIDENCE_BINS)), len(CONFIDENCE_BINS))
+
+
+def z_score_bin(z_score: Any) -> Any:
+    return func.floor(z_score / settings.dashboard_z_resolution).cast(Integer)
+
+
+def aggregate_detections(db: Session) -> List[AggregateRow]:
+    """Compute every dashboard counter in the database with one grouped query.
+
+    The result size is bounded by the number of bins, not by the number of
+    detections.
+    """
+    binned = (
+        select(
+            Generation.watermark_enabled.label("watermark_enabled"),
+            Detection.is_watermarked.label("is_watermarked"),
+            confidence_bin(Detection.confidence).label("confidence_bin"),
+            z_score_bin(Detection.z_score).label("z_bin"),
+        )
+        .join(Generation, Detection.generation_id == Generation.generation_id)
+        .subquery()
+    )
+    c = binned.c
+    stmt = select(
+        c.watermark_enabled,
+        c.is_watermarked,
+        c.confidence_bin,
+        c.z_bin,
+        func.grouping(c.is_watermarked, c.confidence_bin, c.z_bin).label("grouping_id"),
+        func.count().label("n"),
+    ).group_by(
+        func.grouping_sets(
+            tuple_(c.watermark_enabled, c.is_watermarked),
+            tuple_(c.watermark_enabled, c.confidence_bin),
+            tuple_(c.watermark_enabled, c.z_bin),
+        )
+    )
+
+    rows: List[AggregateRow] = []
+    for wm, detected, conf_bin, z_bin, grouping, n in db.execute(stmt):
+        # grouping() has a bit set for every column that is NOT part of the row's grouping set.
+        if grouping == 0b011:
+            rows.append(AggregateRow(METRIC_VERDICT, bool(wm), int(detected), n))
+        elif grouping == 0b101 and conf_bin is not None:
+            rows.append(AggregateRow(METRIC_CONFIDENCE, bool(wm), int(conf_bin), n))
+        elif grouping == 0b110 and z_bin is not None:
+            rows.append(AggregateRow(METRIC_Z_SCORE, bool(wm), int(z_bin), n))
+    return rows
+
+
+def exact_z_score_counts(db: Session) -> Dict[float, List[int]]:
+    """Detections per distinct z-score as ``{z_score: [negatives, positives]}``.
+
+    Grouped in the database, so the result size is the number of distinct
+    scores; scans every detection, unlike the rollups.
+    """
+    stmt = (
+        select(Detection.z_score, Generation.watermark_enabled, func.count())
+        .join(Generation, Detection.generation_id == Generation.generation_id)
+        .where(Detection.z_score.isnot(None))
+        .group_by(Detection.z_score, Generation.watermark_enabled)
+    )
+    counts: Dict[float, List[int]] = defaultdict(lambda: [0, 0])
+    for z_score, wm, n in db.execute(stmt):
+        counts[float(z_score)][int(bool(wm))] += n
+    return dict(counts)
+
+
+def build_stats(
+    rows: Iterable[AggregateRow], attack_attempts: int, exact_z_counts: Optional[Dict[float, List[int]]] = None
+) -> Dict[str, Any]:
+    """Turn aggregate counters into the ``/api/dashboard/stats`` payload.
+
+    The ROC curve and AUC come from ``exact_z_counts`` when given (see
+    :func:`exact_z_score_counts`). Otherwise they come from the z-score
+    histogram rows and are quantized to ``settings.dashboard_z_resolution``
+    (0.01 by default): exact at the bin edges, with scores inside one bin
+    treated as tied.
+    """
+    verdicts: Dict[int, int] = defaultdict(int)
+    distribution = {label: {"range": label, "clean": 0, "watermarked": 0} for label in CONFIDENCE_BINS}
+    z_counts: Dict[int, List[int]] = defaultdict(lambda: [0, 0])  # bin -> [negatives, positives]
+
+    for row in rows:
+        if row.metric == METRIC_VERDICT:
+            verdicts[row.bucket] += row.count
+        elif row.metric == METRIC_CONFIDENCE and 1 <= row.bucket <= len(CONFIDENCE_BINS):
+            cell = distribution[CONFIDENCE_BINS[row.bucket - 1]]
+            cell["watermarked" if row.watermark_enabled else "clean"] += row.count
+        elif row.metric == METRIC_Z_SCORE:
+            z_counts[row.bucket][int(row.watermark_enabled)] += row.count
+
+    # Detection Rate: share of detections flagged as watermarked
+    total_verifications = sum(verdicts.values())
+    detection_rate = round(verdicts[1] / total_verifications * 100, 1) if total_verifications else 0.0
+
+    # From the histogram the ROC is quantized: thresholds are the bin edges
+    # (DASHBOARD_Z_RESOLUTION apart) and scores sharing a bin count as ties (half).
+    roc_points: List[Dict[str, float]] = []
+    avg_auc = 0.0
+    if exact_z_counts is not None:
+        thresholds = sorted(exact_z_counts)
+        neg_counts = [exact_z_counts[t][0] for t in thresholds]
+        pos_counts = [exact_z_counts[t][1] for t in thresholds]
+    else:
+        bins = sorted(z_counts)
+        thresholds = [b * settings.dashboard_z_resolution for b in bins]
+        neg_counts = [z_counts[b][0] for b in bins]
+        pos_counts = [z_counts[b][1] for b in bins]
+    if sum(pos_counts) and sum(neg_counts):
+        fpr, tpr = roc_from_counts(thresholds, pos_counts, neg_counts)
+        avg_auc = round(auc(fpr, tpr), 3)
+        roc_points = downsample(fpr, tpr, settings.dashboard_roc_points)
+
+    return {
+        "total_verifications": total_verifications,
+        "avg_auc": avg_auc,
+        "detection_rate": detection_rate,
+        "attack_attempts": attack_attempts,
+        "roc_points": roc_points,
+        "distribution": list(distribution.values()),
+    }
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer
+
+from app.models.detection import Detection
+from app.models.detection_g_values import DetectionGValues
+from app.models.generation import Generation
+from app.schemas.common import make_preview
+from app.schemas.detections import DetectionBatchCreate, DetectionBatchItem, DetectionBatchOut
+from app.services import rollups, scoring
+from app.services.ai import bleu_score, detect_texts
+from app.services.jobs import ProgressCallback
+from app.services.tokens import unpack_token_ids
+
+
+# (hypothesis, reference) pairs scored per worker-thread hop by bleu_scores.
+BLEU_CHUNK_SIZE = 256
+
+
+def _bleu_chunk(pairs: Sequence[Tuple[str, Optional[str]]]) -> List[Optional[float]]:
+    return [bleu_score(hypothesis, reference) if reference is not None else None for hypothesis, reference in pairs]
+
+
+async def bleu_scores(pairs: Sequence[Tuple[str, Optional[str]]]) -> List[Optional[float]]:
+    """BLEU of each ``(hypothesis, reference)`` pair; ``None`` where there is no reference.
+
+    sacrebleu is CPU-bound, so the pairs are scored in a worker thread
+    ``BLEU_CHUNK_SIZE`` at a time and the event loop keeps serving meanwhile.
+    """
+    scores: List[Optional[float]] = []
+    for start in range(0, len(pairs), BLEU_CHUNK_SIZE):
+        scores.extend(await asyncio.to_thread(_bleu_chunk, pairs[start:start + BLEU_CHUNK_SIZE]))
+    return scores
+
+
+async def detect_generations(
+    gens: Sequence[Generation], scoring_mode: str, *, use_token_ids: bool = True
+) -> List[Dict[str, Any]]:
+    """Detection results for ``gens`` in order, one batched pass per (model, watermark key, key scheme).
+
+    With ``use_token_ids`` the persisted ``output_token_ids`` are used; undefer
+    them when loading ``gens`` to avoid a query per row.
+    """
+    groups: Dict[Tuple[str, Optional[str], str], List[int]] = defaultdict(list)
+    for i, gen in enumerate(gens):
+        groups[(gen.model, gen.watermark_key, gen.watermark_key_scheme)].append(i)
+
+    results: List[Dict[str, Any]] = [{} for _ in gens]
+    for (model, watermark_key, scheme), indices in groups.items():
+        scored = await detect_texts(
+            [gens[i].output_text for i in indices],
+            watermark_key,
+            {"model": model, "scoring": scoring_mode, "watermark_key_scheme": scheme},
+            token_ids=[unpack_token_ids(gens[i].output_token_ids) for i in indices] if use_token_ids else None,
+        )
+        for i, result in zip(indices, scored):
+            results[i] = result
+    return results
+
+
+def insert_detections(
+    db: Session,
+    items: Sequence[Tuple[Generation, Dict[str, Any], Optional[float]]],
+    scoring_mode: str,
+) -> List[Detection]:
+    """Bulk-insert one Detection per ``(generation, detection result, bleu)``.
+
+    The g-values carried by the results and the dashboard rollups go in the
+    same transaction; the caller commits. Rows come back in ``items`` order.
+    """
+    if not items:
+        return []
+    rows = [
+        {
+            "generation_id": gen.generation_id,
+            "input_text": gen.output_text,
+            "is_watermarked": bool(result.get("is_watermarked")),
+            "scoring": scoring_mode,
+            "z_score": result.get("z_score"),
+            "p_value": result.get("p_value"),
+            "confidence": result.get("confidence"),
+            "true_positive_rate": result.get("true_positive_rate"),
+            "false_positive_rate": result.get("false_positive_rate"),
+            "roc_auc": result.get("roc_auc"),
+            "bleu_score": bleu,
+        }
+        for gen, result, bleu in items
+    ]
+    inserted = db.scalars(insert(Detection).returning(Detection, sort_by_parameter_order=True), rows).all()
+
+    g_rows = [scoring.g_values_row(row.detection_id, result) for row, (_, result, _) in zip(inserted, items)]
+    g_rows = [g for g in g_rows if g is not None]
+    if g_rows:
+        db.execute(insert(DetectionGValues), g_rows)
+
+    rollups.record_detections(db, [(row, gen.watermark_enabled) for row, (gen, _, _) in zip(inserted, items)])
+    return list(inserted)
+
+
+async def detect_and_store(
+    db: AsyncSession, payload: DetectionBatchCreate, progress: Optional[ProgressCallback] = None
+) -> DetectionBatchOut:
+    """Detect ``payload.generation_ids`` (stored) and ``payload.texts`` (scored only).
+
+    Raises ``LookupError`` for unknown generation ids.
+    """
+    ids = list(dict.fromkeys(payload.generation_ids))
+    gens = {
+        g.generation_id: g
+        for g in (
+            await db.execute(
+                select(Generation).options(undefer(Generation.output_token_ids)).where(Generation.generation_id.in_(ids))
+            )
+        ).scalars()
+    } if ids else {}
+    missing = [i for i in ids if i not in gens]
+    if missing:
+        raise LookupError(f"Generation not found: {missing}")
+
+    # One batched detection pass per (model, watermark key, key scheme) group.
+    ordered = [gens[i] for i in ids]
+    results = dict(zip(ids, await detect_generations(ordered, payload.scoring)))
+    if progress is not None:
+        await progress(0.5 if payload.texts else 0.9, "scored generations")
+
+    # Calculate BLEU for attacked/modified texts against their originals
+    original_ids = {g.original_id for g in gens.values() if g.original_id}
+    originals = {
+        g.generation_id: g.output_text
+        for g in (await db.execute(select(Generation).where(Generation.generation_id.in_(original_ids)))).scalars()
+    } if original_ids else {}
+
+    bleus = await bleu_scores(
+        [(gens[i].output_text, originals.get(gens[i].original_id) if gens[i].original_id else None) for i in ids]
+    )
+    batch = [(gens[gen_id], results[gen_id], bleu) for gen_id, bleu in zip(ids, bleus)]
+
+    items: List[DetectionBatchItem] = []
+    if batch:
+        inserted = await db.run_sync(insert_detections, batch, payload.scoring)
+        await db.commit()
+        items.extend(
+            DetectionBatchItem(
+                detection_id=r.detection_id,
+                generation_id=r.generation_id,
+                input_text_preview=make_preview(r.input_text, 100),
+                is_watermarked=r.is_watermarked,
+                scoring=r.scoring,
+                z_score=r.z_score,
+                p_value=r.p_value,
+                confidence=r.confidence,
+                bleu_score=r.bleu_score,
+            )
+            for r in inserted
+        )
+
+    # Raw texts have no generation to attach a Detection row to, so they are only scored.
+    if payload.texts:
+        scored = await detect_texts(
+            payload.texts,
+            payload.watermark_key,
+            {"model": payload.model, "scoring": payload.scoring, "watermark_key_scheme": payload.watermark_key_scheme},
+        )
+        items.extend(
+            DetectionBatchItem(
+                input_text_preview=make_preview(text, 100),
+                is_watermarked=bool(result.get("is_watermarked")),
+                scoring=payload.scoring,
+                z_score=result.get("z_score"),
+                p_value=result.get("p_value"),
+                confidence=result.get("confidence"),
+            )
+            for text, result in zip(payload.texts, scored)
+        )
+
+    return DetectionBatchOut(items=items)
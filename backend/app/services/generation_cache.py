@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import track_cache
+from app.schemas.generations import GenerationCreate
+
+
+def request_key(payload: GenerationCreate, *, scheme: Optional[str] = None, secret: Optional[str] = None) -> str:
+    """sha256 of the canonical JSON of every generation parameter (the opt-in flag excluded).
+
+    The key scheme and a fingerprint of the key secret (both default to the
+    settings) are part of it, so a changed derivation never serves output
+    watermarked with the old keys.
+    """
+    scheme = settings.watermark_key_scheme if scheme is None else scheme
+    secret = settings.watermark_key_secret if secret is None else secret
+    params = payload.model_dump(mode="json", exclude={"cache"})
+    params["watermark_key_scheme"] = scheme
+    params["watermark_key_secret"] = hashlib.sha256(secret.encode("utf-8")).hexdigest()
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GenerationResultCache:
+    """Maps a request key to the id of the ``Generation`` it produced.
+
+    Entries expire after ``ttl_s`` and the least recently used are dropped
+    beyond ``max_entries``. Concurrent requests for a key that is still being
+    generated wait for that one model call instead of starting their own; the
+    call runs as its own task, so a disconnecting first caller does not cancel
+    it for the others.
+    """
+
+    def __init__(
+        self, max_entries: int, ttl_s: float, *, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self._clock = clock
+        self._items: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()  # key -> (generation_id, expires_at)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def lookup(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self._clock():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, generation_id: int) -> None:
+        with self._lock:
+            self._items[key] = (generation_id, self._clock() + self.ttl_s)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    async def get_or_create(self, key: str, create: Callable[[], Awaitable[int]]) -> Tuple[int, bool]:
+        """Return ``(generation_id, cache_hit)``; ``create()`` runs only on a miss with nothing in flight.
+
+        Failures are not cached: every waiter sees the exception and the next
+        request tries again.
+        """
+        generation_id = self.lookup(key)
+        if generation_id is not None:
+            with self._lock:
+                self.hits += 1
+            return generation_id, True
+
+        task = self._inflight.get(key)
+        if task is not None:
+            with self._lock:
+                self.coalesced += 1
+            return await asyncio.shield(task), True
+
+        with self._lock:
+            self.misses += 1
+        task = asyncio.ensure_future(create())
+        self._inflight[key] = task
+
+        def _done(t: asyncio.Task) -> None:
+            self._inflight.pop(key, None)
+            if not t.cancelled() and t.exception() is None:
+                self.put(key, t.result())
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task), False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "max_size": self.max_entries,
+                "in_flight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+generation_cache = GenerationResultCache(settings.generation_cache_size, settings.generation_cache_ttl_s)
+track_cache("generation_results", generation_cache.stats)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import get_async_session
+from app.models.generation import Generation
+from app.schemas.generations import GenerationBatchCreate, GenerationCreate
+from app.services.ai import generate_text, generate_text_bulk
+from app.services.jobs import ProgressCallback
+from app.services.tokens import pack_token_ids
+from app.services.watermark import DEFAULT_DEPTH, DEFAULT_WATERMARK_KEY
+from app.services.watermark_keys import key_registry
+
+
+def generation_row(payload: GenerationCreate, output: Dict[str, Any]) -> Generation:
+    return Generation(
+        original_id=None,
+        input_text=payload.input_text,
+        output_text=output["output_text"],
+        output_token_ids=pack_token_ids(output["token_ids"]),
+        model=payload.model,
+        quantization=payload.quantization,
+        temperature=payload.temperature,
+        top_k=payload.top_k,
+        top_p=payload.top_p,
+        max_tokens=payload.max_tokens,
+        watermark_enabled=payload.watermark_enabled,
+        context_width=payload.context_width,
+        tournament_size=payload.tournament_size,
+        g_value=payload.g_value,
+        watermark_key=payload.watermark_key,
+        watermark_key_scheme=settings.watermark_key_scheme,
+        attack_type=None,
+        attack_intensity=None,
+        seed=output.get("seed"),
+    )
+
+
+async def store_generations(db: AsyncSession, rows: List[Generation]) -> None:
+    """Add and commit ``rows`` together with the ``hkdf`` watermark keys they were made with."""
+    names = {
+        row.watermark_key or DEFAULT_WATERMARK_KEY
+        for row in rows
+        if row.watermark_enabled and row.watermark_key_scheme == "hkdf"
+    }
+    await db.run_sync(key_registry.persist, names, DEFAULT_DEPTH)
+    db.add_all(rows)
+    await db.commit()
+
+
+async def generate_one(payload: GenerationCreate) -> int:
+    """Generate and store one row in its own session; returns the new generation id."""
+    output = await generate_text(payload.input_text, payload.model_dump())
+    async with get_async_session() as db:
+        row = generation_row(payload, output)
+        await store_generations(db, [row])
+        return row.generation_id
+
+
+async def generate_and_store(
+    db: AsyncSession, payload: GenerationBatchCreate, progress: Optional[ProgressCallback] = None
+) -> List[int]:
+    """Generate every item and store the rows in one commit; returns their ids in item order.
+
+    All prompts are submitted at once, through the bulk inference limit, so
+    the generation micro-batcher can group compatible ones into shared forward
+    passes without crowding interactive requests out of the inference pool.
+    """
+    tasks = [asyncio.ensure_future(generate_text_bulk(item.input_text, item.model_dump())) for item in payload.items]
+    try:
+        done = 0
+        for finished in asyncio.as_completed(tasks):
+            await finished
+            done += 1
+            if progress is not None:
+                await progress(done / len(tasks) * 0.95, f"generated {done}/{len(tasks)}")
+    finally:
+        # Stop the remaining generations when the job is cancelled or one fails.
+        for task in tasks:
+            task.cancel()
+
+    rows = [generation_row(item, task.result()) for item, task in zip(payload.items, tasks)]
+    await store_generations(db, rows)
+    return [row.generation_id for row in rows]
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import track_queue
+
+T = TypeVar("T")
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference pool cannot accept more work right now."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    """Run blocking model work on dedicated threads instead of the event loop.
+
+    A thread pool is used (rather than processes) so every worker shares the
+    models already resident in ``LLMManager``; torch releases the GIL while it
+    runs kernels. At most ``max_workers + max_queue`` jobs may be in flight;
+    anything beyond that is rejected with :class:`InferenceQueueFull` so the API
+    can answer 503 instead of piling up requests.
+    """
+
+    def __init__(self, *, max_workers: int, max_queue: int, retry_after: int) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise InferenceQueueFull(self.retry_after)
+            self._in_flight += 1
+
+        try:
+            future = self._executor.submit(functools.partial(self._call, fn, *args, **kwargs))
+        except RuntimeError:
+            # Executor already shut down; the job never ran.
+            self._release(completed=False)
+            raise
+        # A job cancelled while still queued (its caller gave up, or shutdown)
+        # never reaches _call, so its slot is released here instead.
+        future.add_done_callback(self._release_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._release(completed=True)
+
+    def _release_if_cancelled(self, future: "Future[Any]") -> None:
+        if future.cancelled():
+            self._release(completed=False)
+
+    def _release(self, *, completed: bool) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if completed:
+                self._completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queued": self._in_flight - self._running,
+                "capacity": self.capacity,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BulkLimiter:
+    """Admit inference work from bulk callers a few calls at a time.
+
+    Jobs, batch attacks and sweeps may start thousands of calls at once. Run
+    through :meth:`run`, at most ``limit`` of them are in flight and the rest
+    wait their turn, leaving the rest of the pool's capacity to interactive
+    requests. A call the pool rejects anyway (it is busy with interactive
+    work) is retried after ``retry_s`` instead of failing the whole job.
+    """
+
+    def __init__(self, limit: int, *, retry_s: float = 0.5) -> None:
+        self.limit = max(1, int(limit))
+        self.retry_s = retry_s
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._running = 0
+
+    def _slots(self) -> asyncio.Semaphore:
+        # A semaphore belongs to one event loop; tests run several.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._semaphore = loop, asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def run(self, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        slots = self._slots()
+        self._waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self._waiting -= 1
+        self._running += 1
+        try:
+            while True:
+                try:
+                    return await fn(*args, **kwargs)
+                except InferenceQueueFull:
+                    await asyncio.sleep(self.retry_s)
+        finally:
+            self._running -= 1
+            slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"limit": self.limit, "running": self._running, "waiting": self._waiting}
+
+
+inference_pool = InferencePool(
+    max_workers=settings.inference_workers,
+    max_queue=settings.inference_queue_size,
+    retry_after=settings.inference_retry_after_s,
+)
+track_queue("inference", "running", lambda: inference_pool.stats()["running"])
+track_queue("inference", "queued", lambda: inference_pool.stats()["queued"])
+
+bulk_inference = BulkLimiter(settings.inference_bulk_concurrency)
+track_queue("inference_bulk", "running", lambda: bulk_inference.stats()["running"])
+track_queue("inference_bulk", "waiting", lambda: bulk_inference.stats()["waiting"])
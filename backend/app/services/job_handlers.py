@@ -0,0 +1,31 @@
+"""Job kinds runnable through :mod:`app.services.jobs` (imported for its registrations)."""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from app.db.session import get_async_session
+from app.schemas.detections import DetectionBatchCreate
+from app.schemas.generations import GenerationBatchCreate
+from app.schemas.sweeps import SweepCreate
+from app.services.detections import detect_and_store
+from app.services.generations import generate_and_store
+from app.services.jobs import JobContext, register_job
+from app.services.sweeps import run_sweep
+
+
+@register_job("sweep", SweepCreate)
+async def sweep_job(params: SweepCreate, ctx: JobContext) -> Dict[str, Any]:
+    return (await run_sweep(params, ctx.progress)).model_dump(mode="json")
+
+
+@register_job("detection_batch", DetectionBatchCreate)
+async def detection_batch_job(params: DetectionBatchCreate, ctx: JobContext) -> Dict[str, Any]:
+    async with get_async_session() as db:
+        return (await detect_and_store(db, params, ctx.progress)).model_dump(mode="json")
+
+
+@register_job("generation_batch", GenerationBatchCreate)
+async def generation_batch_job(params: GenerationBatchCreate, ctx: JobContext) -> Dict[str, Any]:
+    async with get_async_session() as db:
+        return {"generation_ids": await generate_and_store(db, params, ctx.progress)}
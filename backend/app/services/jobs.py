@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Type
+
+from pydantic import BaseModel
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import get_session
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+# (fraction done in [0, 1], optional message)
+ProgressCallback = Callable[[float, Optional[str]], Awaitable[None]]
+
+
+class JobCancelled(Exception):
+    """Raised from :meth:`JobContext.progress` once a cancel was requested."""
+
+
+class UnknownJobKind(ValueError):
+    pass
+
+
+class JobType(NamedTuple):
+    params_model: Type[BaseModel]
+    handler: Callable[[Any, "JobContext"], Awaitable[Dict[str, Any]]]
+
+
+JOB_TYPES: Dict[str, JobType] = {}
+
+
+def register_job(kind: str, params_model: Type[BaseModel]):
+    """Register ``async handler(params, ctx) -> dict`` for jobs of ``kind``.
+
+    ``params`` is an instance of ``params_model``; the returned dict is stored
+    as the job result and must be JSON serialisable.
+    """
+
+    def decorator(handler):
+        JOB_TYPES[kind] = JobType(params_model, handler)
+        return handler
+
+    return decorator
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobContext:
+    """Handed to job handlers to report progress and notice cancellation.
+
+    Cancellation is cooperative: it takes effect at the next ``progress`` call.
+    """
+
+    def __init__(self, queue: "JobQueue", job_id: int) -> None:
+        self.queue = queue
+        self.job_id = job_id
+        self._last_report = 0.0
+
+    async def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        # Throttled so chatty handlers do not turn into a write per item.
+        now = time.monotonic()
+        if fraction < 1.0 and now - self._last_report < self.queue.progress_interval_s:
+            return
+        self._last_report = now
+        if await asyncio.to_thread(self.queue.report, self.job_id, fraction, message):
+            raise JobCancelled()
+
+
+class JobQueue:
+    """Job queue stored in the ``jobs`` table, drained by in-process async workers.
+
+    Workers claim the oldest pending job with ``FOR UPDATE SKIP LOCKED``, so
+    several workers (or processes) never pick the same job. Jobs left
+    ``running`` by a previous process are marked failed on start, since the
+    app runs as a single instance and nobody else can still be working on them.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = get_session,
+        *,
+        workers: int = 1,
+        poll_interval_s: float = 1.0,
+        progress_interval_s: float = 0.5,
+    ) -> None:
+        self.session_factory = session_factory
+        self.workers = max(0, int(workers))
+        self.poll_interval_s = poll_interval_s
+        self.progress_interval_s = progress_interval_s
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # --- Database operations (blocking) ---
+
+    def submit(self, db: Session, kind: str, params: Any) -> Job:
+        job_type = JOB_TYPES.get(kind)
+        if job_type is None:
+            raise UnknownJobKind(f"Unknown job kind: {kind}")
+        if not isinstance(params, job_type.params_model):
+            params = job_type.params_model.model_validate(params)
+        job = Job(kind=kind, status=JOB_PENDING, params=params.model_dump(mode="json"), progress=0.0)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self.notify()
+        return job
+
+    def cancel(self, db: Session, job_id: int) -> Optional[Job]:
+        """Cancel a pending job right away, or flag a running one for its next progress report."""
+        job = db.get(Job, job_id, with_for_update=True)
+        if job is None:
+            return None
+        if job.status == JOB_PENDING:
+            job.status = JOB_CANCELLED
+            job.finished_at = _now()
+        elif job.status == JOB_RUNNING:
+            job.cancel_requested = True
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def claim(self) -> Optional[Job]:
+        db = self.session_factory()
+        try:
+            job = db.execute(
+                select(Job)
+                .where(Job.status == JOB_PENDING)
+                .order_by(Job.created_at, Job.job_id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).scalar_one_or_none()
+            if job is None:
+                db.rollback()
+                return None
+            job.status = JOB_RUNNING
+            job.started_at = _now()
+            db.commit()
+            db.refresh(job)
+            return job
+        finally:
+            db.close()
+
+    def report(self, job_id: int, progress: float, message: Optional[str]) -> bool:
+        """Store progress; returns whether a cancel was requested."""
+        db = self.session_factory()
+        try:
+            cancel_requested = db.execute(
+                update(Job)
+                .where(Job.job_id == job_id)
+                .values(progress=min(max(progress, 0.0), 1.0), message=message[:255] if message else None)
+                .returning(Job.cancel_requested)
+            ).scalar_one()
+            db.commit()
+            return bool(cancel_requested)
+        finally:
+            db.close()
+
+    def finish(self, job_id: int, status: str, *, result: Any = None, error: Optional[str] = None) -> None:
+        db = self.session_factory()
+        try:
+            values: Dict[str, Any] = {"status": status, "finished_at": _now(), "result": result, "error": error}
+            if status == JOB_SUCCEEDED:
+                values["progress"] = 1.0
+            db.execute(update(Job).where(Job.job_id == job_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def fail_interrupted(self) -> int:
+        db = self.session_factory()
+        try:
+            count = db.execute(
+                update(Job)
+                .where(Job.status == JOB_RUNNING)
+                .values(status=JOB_FAILED, finished_at=_now(), error="Interrupted by a server restart")
+            ).rowcount
+            db.commit()
+            return count
+        finally:
+            db.close()
+
+    # --- Workers ---
+
+    def notify(self) -> None:
+        """Wake an idle worker instead of waiting for the next poll."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run_job(self, job: Job) -> None:
+        job_type = JOB_TYPES.get(job.kind)
+        if job_type is None:
+            await asyncio.to_thread(self.finish, job.job_id, JOB_FAILED, error=f"Unknown job kind: {job.kind}")
+            return
+        try:
+            params = job_type.params_model.model_validate(job.params)
+            result = await job_type.handler(params, JobContext(self, job.job_id))
+        except JobCancelled:
+            await asyncio.to_thread(self.finish, job.job_id, JOB_CANCELLED)
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed", job.job_id, job.kind)
+            await asyncio.to_thread(self.finish, job.job_id, JOB_FAILED, error=str(exc) or type(exc).__name__)
+        else:
+            await asyncio.to_thread(self.finish, job.job_id, JOB_SUCCEEDED, result=result)
+
+    async def _worker(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                job = await asyncio.to_thread(self.claim)
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+            if job is not None:
+                await self.run_job(job)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        if self.workers == 0 or self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        interrupted = await asyncio.to_thread(self.fail_interrupted)
+        if interrupted:
+            logger.warning("Marked %d interrupted job(s) as failed.", interrupted)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+
+job_queue = JobQueue(
+    workers=settings.job_workers,
+    poll_interval_s=settings.job_poll_interval_s,
+)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (model_name, tokenizer, input_text) -> prompt token ids
+PromptBuilder = Callable[[str, Any, str], List[int]]
+
+# Inputs that share nothing, so the common token prefix of their prompts is the template alone.
+_PROBES = ("가", "What is 1 + 1?", "x\n\ny")
+
+
+class _Prefix(NamedTuple):
+    token_ids: Tuple[int, ...]
+    past_key_values: Any
+
+
+def common_prefix(sequences: Sequence[Sequence[int]]) -> List[int]:
+    prefix = list(sequences[0])
+    for seq in sequences[1:]:
+        n = 0
+        while n < min(len(prefix), len(seq)) and prefix[n] == seq[n]:
+            n += 1
+        del prefix[n:]
+    return prefix
+
+
+class PrefixCache:
+    """Prefilled KV cache of each model's fixed prompt-template prefix.
+
+    The chat template (Llama-3's system message, the Korean instruction in
+    front of Gemma prompts) is the same for every request, so its keys and
+    values are computed once per model and handed to ``model.generate`` as
+    ``past_key_values``; only the user's own tokens are prefilled per request.
+    Single-row generations only: left padding shifts the prefix in batches.
+    """
+
+    def __init__(self, build_prompt_ids: PromptBuilder, *, min_tokens: int = 4) -> None:
+        self._build_prompt_ids = build_prompt_ids
+        self.min_tokens = min_tokens
+        # None marks models whose template has no prefix worth caching.
+        self._items: Dict[str, Optional[_Prefix]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _run_model(self, model: Any, token_ids: List[int]) -> Any:
+        """The ``DynamicCache`` holding the keys and values of ``token_ids``."""
+        # Deferred so the cache bookkeeping works without the torch/transformers stack.
+        import torch
+        from transformers import DynamicCache
+
+        with torch.no_grad():
+            outputs = model(
+                torch.tensor([token_ids], dtype=torch.long, device=model.device),
+                past_key_values=DynamicCache(),
+                use_cache=True,
+            )
+        return outputs.past_key_values
+
+    def _prefill(self, model_name: str, model: Any, tokenizer: Any) -> Optional[_Prefix]:
+        token_ids = common_prefix([self._build_prompt_ids(model_name, tokenizer, probe) for probe in _PROBES])
+        if len(token_ids) < self.min_tokens:
+            return None
+        try:
+            past_key_values = self._run_model(model, token_ids)
+        except Exception:
+            logger.exception("Prefilling the prompt prefix of %s failed; prefix caching is off for it", model_name)
+            return None
+        logger.info("Cached a %d-token prompt prefix for %s.", len(token_ids), model_name)
+        return _Prefix(tuple(token_ids), past_key_values)
+
+    def past_key_values(self, model_name: str, model: Any, tokenizer: Any, prompt_ids: Sequence[int]) -> Optional[Any]:
+        """A private copy of the cached prefix KV for ``prompt_ids``, or ``None`` if it does not apply."""
+        with self._lock:
+            known = model_name in self._items
+            prefix = self._items.get(model_name)
+        if not known:
+            # Prefilled outside the lock; two concurrent first requests just both compute it.
+            prefix = self._prefill(model_name, model, tokenizer)
+            with self._lock:
+                prefix = self._items.setdefault(model_name, prefix)
+
+        n = len(prefix.token_ids) if prefix is not None else 0
+        # generate() needs at least one uncached token to produce the first logits.
+        if prefix is None or len(prompt_ids) <= n or tuple(prompt_ids[:n]) != prefix.token_ids:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        # generate() appends to the cache it is given, so every request gets its own copy.
+        return copy.deepcopy(prefix.past_key_values)
+
+    def invalidate_model(self, model_name: str) -> None:
+        with self._lock:
+            self._items.pop(model_name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": sum(1 for p in self._items.values() if p is not None),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def roc_from_counts(
+    thresholds: Sequence[float], pos_counts: Sequence[int], neg_counts: Sequence[int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact ROC curve from per-score class counts.
+
+    ``thresholds`` must be distinct; ``pos_counts[i]``/``neg_counts[i]`` are the
+    number of positive/negative samples whose score equals ``thresholds[i]``.
+    Every threshold is treated as ``score >= t``, so the returned arrays start at
+    (0, 0) and end at (1, 1). Both classes must be non-empty.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    order = np.argsort(-thresholds, kind="mergesort")
+    tps = np.concatenate(([0], np.cumsum(np.asarray(pos_counts, dtype=np.int64)[order])))
+    fps = np.concatenate(([0], np.cumsum(np.asarray(neg_counts, dtype=np.int64)[order])))
+    return fps / fps[-1], tps / tps[-1]
+
+
+def auc(fpr: np.ndarray, tpr: np.ndarray) -> float:
+    """Trapezoidal area under the curve; ties contribute half, as in Mann-Whitney U."""
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2.0))
+
+
+def downsample(fpr: np.ndarray, tpr: np.ndarray, max_points: int) -> List[Dict[str, float]]:
+    """Pick at most ``max_points`` evenly spaced curve points, always keeping both ends."""
+    n = len(fpr)
+    if n > max_points >= 2:
+        idx = np.unique(np.round(np.linspace(0, n - 1, max_points)).astype(np.int64))
+    else:
+        idx = np.arange(n)
+    return [{"fpr": round(float(fpr[i]), 3), "tpr": round(float(tpr[i]), 3)} for i in idx]
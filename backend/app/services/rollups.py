@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.dashboard_rollup import DashboardRollup
+from app.models.detection import Detection
+from app.models.generation import Generation
+from app.services.dashboard import (
+    CONFIDENCE_BINS,
+    METRIC_CONFIDENCE,
+    METRIC_VERDICT,
+    METRIC_Z_SCORE,
+    AggregateRow,
+    aggregate_detections,
+)
+
+METRIC_ATTACKS = "attacks"
+
+
+def _confidence_bin(confidence: float) -> int:
+    # Same as least(width_bucket(confidence, 0, 1, 5), 5) in aggregate_detections.
+    if confidence < 0.0:
+        return 0
+    return min(int(math.floor(confidence * len(CONFIDENCE_BINS))) + 1, len(CONFIDENCE_BINS))
+
+
+def _z_score_bin(z_score: float) -> int:
+    return int(math.floor(z_score / settings.dashboard_z_resolution))
+
+
+def detection_rows(detections: Iterable[Tuple[Detection, bool]]) -> List[AggregateRow]:
+    """Rollup increments for new detections, given as (detection, ground truth) pairs."""
+    counts: Counter = Counter()
+    for det, watermark_enabled in detections:
+        counts[(METRIC_VERDICT, watermark_enabled, int(det.is_watermarked))] += 1
+        if det.confidence is not None:
+            counts[(METRIC_CONFIDENCE, watermark_enabled, _confidence_bin(det.confidence))] += 1
+        if det.z_score is not None:
+            counts[(METRIC_Z_SCORE, watermark_enabled, _z_score_bin(det.z_score))] += 1
+    return [AggregateRow(*key, n) for key, n in counts.items()]
+
+
+def attack_rows(ground_truths: Iterable[bool]) -> List[AggregateRow]:
+    """Rollup increments for new attacked generations, one entry per attack."""
+    counts = Counter(bool(wm) for wm in ground_truths)
+    return [AggregateRow(METRIC_ATTACKS, wm, 0, n) for wm, n in counts.items()]
+
+
+def record(db: Session, rows: Iterable[AggregateRow]) -> None:
+    """Add ``rows`` to the rollup counters. Runs in the caller's transaction, so
+    the increments commit (or roll back) together with the rows they describe.
+
+    Rows are upserted in key order, so concurrent transactions lock the
+    counters they share in the same order and cannot deadlock on them."""
+    values = [row._asdict() for row in sorted(rows, key=lambda r: (r.metric, r.watermark_enabled, r.bucket))]
+    if not values:
+        return
+    stmt = insert(DashboardRollup).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DashboardRollup.metric, DashboardRollup.watermark_enabled, DashboardRollup.bucket],
+        set_={"count": DashboardRollup.count + stmt.excluded["count"]},
+    )
+    db.execute(stmt)
+
+
+def record_detections(db: Session, detections: Iterable[Tuple[Detection, bool]]) -> None:
+    record(db, detection_rows(detections))
+
+
+def record_attacks(db: Session, ground_truths: Iterable[bool]) -> None:
+    record(db, attack_rows(ground_truths))
+
+
+def load(db: Session) -> Tuple[List[AggregateRow], int]:
+    """Return (aggregate rows, attack attempts) straight from the rollup table."""
+    rows: List[AggregateRow] = []
+    attack_attempts = 0
+    for r in db.execute(select(DashboardRollup)).scalars():
+        if r.metric == METRIC_ATTACKS:
+            attack_attempts += r.count
+        else:
+            rows.append(AggregateRow(r.metric, r.watermark_enabled, r.bucket, r.count))
+    return rows, attack_attempts
+
+
+def is_empty(db: Session) -> bool:
+    return db.execute(select(DashboardRollup.metric).limit(1)).first() is None
+
+
+def rebuild(db: Session, *, commit: bool = True) -> int:
+    """Recompute every rollup from detections/generations. Returns the row count."""
+    # Concurrent record() calls wait for the rebuild, so their rows are counted exactly once.
+    db.execute(text("LOCK TABLE dashboard_rollups IN EXCLUSIVE MODE"))
+    rows = aggregate_detections(db)
+    attacks = db.execute(
+        select(Generation.watermark_enabled, func.count())
+        .where(Generation.attack_type.isnot(None))
+        .group_by(Generation.watermark_enabled)
+    ).all()
+    rows.extend(AggregateRow(METRIC_ATTACKS, bool(wm), 0, n) for wm, n in attacks)
+
+    db.execute(delete(DashboardRollup))
+    if rows:
+        db.execute(insert(DashboardRollup), [row._asdict() for row in rows])
+    if commit:
+        db.commit()
+    return len(rows)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence
+
+import torch
+from transformers import (
+    LogitsProcessor,
+    LogitsProcessorList,
+    TemperatureLogitsWarper,
+    TopKLogitsWarper,
+    TopPLogitsWarper,
+)
+
+
+class SeededSampler(LogitsProcessor):
+    """Sample every row with its own ``torch.Generator``, as the last logits processor.
+
+    ``model.generate`` has one global RNG per call, so a row's tokens would
+    depend on the other rows in its batch. Instead ``generate`` runs greedy
+    (``do_sample=False``) and this processor applies temperature/top-k/top-p,
+    draws one token per row from that row's generator and leaves it as the only
+    finite score, which greedy decoding then picks. Every row draws once per
+    step, finished ones included (``generate`` pads them afterwards), and only
+    from its own generator, so given the same scores a row draws the same
+    tokens whatever the other rows are. The scores themselves still shift
+    slightly with left padding and a reused prefix KV, which is why
+    ``generate_text`` runs seeded requests alone and without the prefix cache.
+    """
+
+    def __init__(
+        self,
+        seeds: Sequence[int],
+        *,
+        temperature: float,
+        top_k: Optional[int],
+        top_p: Optional[float],
+    ) -> None:
+        self.seeds = [int(s) for s in seeds]
+        warpers: List[LogitsProcessor] = [TemperatureLogitsWarper(temperature)]
+        if top_k:
+            warpers.append(TopKLogitsWarper(top_k))
+        if top_p and top_p < 1.0:
+            warpers.append(TopPLogitsWarper(top_p))
+        self.warpers = LogitsProcessorList(warpers)
+        self._generators: Optional[List[torch.Generator]] = None
+        self._output: Optional[torch.Tensor] = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        if self._generators is None:
+            # Created on the scores' device so multinomial never leaves it.
+            self._generators = [torch.Generator(device=scores.device).manual_seed(s) for s in self.seeds]
+        probs = torch.softmax(self.warpers(input_ids, scores).float(), dim=-1)
+        tokens = torch.cat(
+            [torch.multinomial(probs[row], 1, generator=gen) for row, gen in enumerate(self._generators)]
+        )
+
+        if self._output is None or self._output.shape != scores.shape or self._output.dtype != scores.dtype:
+            self._output = torch.empty_like(scores)
+        self._output.fill_(-float("inf"))
+        self._output.scatter_(1, tokens.unsqueeze(1), 0.0)
+        return self._output
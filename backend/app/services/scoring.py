@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, get_args
+
+import numpy as np
+import scipy.special
+import scipy.stats
+
+from app.core.config import settings
+from app.schemas.detections import ScoringMode
+
+SCORING_MODES: Tuple[str, ...] = get_args(ScoringMode)
+
+
+def pack_g_values(g_values: np.ndarray, mask: np.ndarray) -> Tuple[bytes, bytes]:
+    """Bit-pack a ``[num_positions, depth]`` 0/1 g-value matrix and its ``[num_positions]`` mask."""
+    return np.packbits(g_values.astype(np.uint8).reshape(-1)).tobytes(), np.packbits(mask.astype(np.uint8)).tobytes()
+
+
+def g_values_row(detection_id: int, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """``detection_g_values`` insert parameters for a detection result, popping its raw arrays.
+
+    Returns ``None`` when the result carries no g-values (text too short to score).
+    """
+    g_values, mask = result.pop("g_values", None), result.pop("g_mask", None)
+    if g_values is None:
+        return None
+    packed_g, packed_mask = pack_g_values(g_values, mask)
+    return {
+        "detection_id": detection_id,
+        "num_positions": int(g_values.shape[0]),
+        "depth": int(g_values.shape[1]),
+        "g_values": packed_g,
+        "mask": packed_mask,
+    }
+
+
+def unpack_g_values(
+    g_values_blob: bytes, mask_blob: bytes, num_positions: int, depth: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    g_values = np.unpackbits(np.frombuffer(g_values_blob, dtype=np.uint8), count=num_positions * depth)
+    mask = np.unpackbits(np.frombuffer(mask_blob, dtype=np.uint8), count=num_positions)
+    return g_values.reshape(num_positions, depth), mask.astype(bool)
+
+
+# Rows stacked and scored at a time by score_rows; bounds the float temporaries.
+SCORE_CHUNK_ROWS = 256
+
+
+def stack(rows: Sequence[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pad per-row ``(g_values [L_i, D], mask [L_i])`` pairs into ``[B, L, D]`` uint8 / ``[B, L]`` bool arrays."""
+    depth = rows[0][0].shape[1] if rows else 0
+    width = max((len(mask) for _, mask in rows), default=0)
+    g_values = np.zeros((len(rows), width, depth), dtype=np.uint8)
+    mask = np.zeros((len(rows), width), dtype=bool)
+    for i, (g, m) in enumerate(rows):
+        g_values[i, : len(m)] = g
+        mask[i, : len(m)] = m
+    return g_values, mask
+
+
+def layer_weights(depth: int) -> np.ndarray:
+    """SynthID weighted-mean layer weights: linear from 10 down to 1, normalised to sum to ``depth``.
+
+    Earlier tournament layers carry more signal, so they get more weight.
+    """
+    weights = np.linspace(10.0, 1.0, num=depth)
+    return weights * depth / weights.sum()
+
+
+def _depth_sums(g_values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """``[batch, depth]`` sums of the valid g-values, without a float ``[batch, positions, depth]`` copy."""
+    return np.where(mask[..., None], g_values, 0).sum(axis=1, dtype=np.float64)
+
+
+def mean_z_scores(
+    g_values: np.ndarray, mask: np.ndarray, weights: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Z-scores of the (weighted) mean g-value per row, averaging across depth too.
+
+    ``g_values`` is ``[batch, positions, depth]`` of 0/1 and ``mask`` is
+    ``[batch, positions]``. ``weights`` (``[depth]``, summing to ``depth``)
+    defaults to uniform. Returns ``(z_scores, counts)`` where ``counts`` is the
+    number of valid positions; rows without any get a z-score of 0.
+    """
+    mask = mask.astype(bool)
+    depth = g_values.shape[-1]
+    if weights is None:
+        weights = np.ones(depth)
+    sums = _depth_sums(g_values, mask) @ weights
+    counts = mask.sum(axis=1).astype(np.float64)
+
+    # Under the null every g-value is Bernoulli(0.5), so one position contributes
+    # mean 0.5 and variance 0.25 * sum(w^2) / depth^2 to the mean score.
+    # Z = (Mean - 0.5) / SE
+    position_std = 0.5 * np.sqrt((weights ** 2).sum()) / depth
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_scores = sums / (counts * depth)
+        z_scores = (mean_scores - 0.5) / (position_std / np.sqrt(counts))
+    return np.where(counts > 0, z_scores, 0.0), counts
+
+
+def bayesian_posteriors(
+    g_values: np.ndarray,
+    mask: np.ndarray,
+    *,
+    prior: Optional[float] = None,
+    g_mean: Optional[float] = None,
+) -> np.ndarray:
+    """Likelihood-ratio score in ``[0, 1]`` per row, on the posterior scale.
+
+    This is a naive model, not a calibrated P(watermarked): it treats every valid
+    g-value as independent, Bernoulli(0.5) for unwatermarked text and
+    Bernoulli(``g_mean``) for watermarked text, with one fixed ``g_mean`` for all
+    layers, models and entropies. Real g-values are neither independent nor
+    equally biased, so the score saturates towards 0 or 1 much faster than the
+    evidence warrants; compare it against a threshold, not as a probability.
+    """
+    prior = settings.detection_bayesian_prior if prior is None else prior
+    g_mean = settings.detection_bayesian_g_mean if g_mean is None else g_mean
+    mask = mask.astype(bool)
+    ones = _depth_sums(g_values, mask).sum(axis=1)
+    zeros = mask.sum(axis=1) * g_values.shape[-1] - ones
+    log_ratio = ones * np.log(g_mean / 0.5) + zeros * np.log((1.0 - g_mean) / 0.5)
+    return scipy.special.expit(log_ratio + np.log(prior / (1.0 - prior)))
+
+
+def score(
+    g_values: np.ndarray,
+    mask: np.ndarray,
+    z_threshold: Optional[float] = None,
+    mode: ScoringMode = "mean",
+) -> List[Optional[Dict[str, Any]]]:
+    """Detection results for a padded batch; ``None`` for rows without valid g-values.
+
+    ``mean`` and ``weighted_mean`` threshold the z-score. ``bayesian`` reports the
+    weighted-mean z-score too, but its verdict and confidence are the
+    likelihood-ratio score of :func:`bayesian_posteriors`.
+    """
+    if mode not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode: {mode}")
+    threshold = settings.detection_z_threshold if z_threshold is None else z_threshold
+    weights = None if mode == "mean" else layer_weights(g_values.shape[-1])
+    z_scores, counts = mean_z_scores(g_values, mask, weights)
+    # Simple p-value (one-sided)
+    p_values = scipy.stats.norm.sf(z_scores)
+    if mode == "bayesian":
+        confidences = bayesian_posteriors(g_values, mask)
+        verdicts = confidences > settings.detection_bayesian_threshold
+    else:
+        verdicts = z_scores > threshold
+        confidences = 1.0 - p_values # rough proxy
+
+    results: List[Optional[Dict[str, Any]]] = []
+    for z_score, p_value, verdict, confidence, count in zip(
+        z_scores.tolist(), p_values.tolist(), verdicts.tolist(), confidences.tolist(), counts.tolist()
+    ):
+        if count == 0:
+            results.append(None)
+            continue
+        results.append(
+            {
+                "is_watermarked": verdict,
+                "z_score": z_score,
+                "p_value": p_value,
+                "confidence": confidence,
+                "scoring": mode,
+            }
+        )
+    return results
+
+
+def score_rows(
+    rows: Sequence[Tuple[np.ndarray, np.ndarray]],
+    z_threshold: Optional[float] = None,
+    mode: ScoringMode = "mean",
+    chunk_size: int = SCORE_CHUNK_ROWS,
+) -> List[Optional[Dict[str, Any]]]:
+    """:func:`score` for unpadded ``(g_values, mask)`` rows, ``chunk_size`` rows at a time.
+
+    Each chunk is padded only to its own longest row, so memory stays bounded
+    by the chunk rather than by the whole request.
+    """
+    results: List[Optional[Dict[str, Any]]] = []
+    for start in range(0, len(rows), chunk_size):
+        g_values, mask = stack(rows[start:start + chunk_size])
+        results.extend(score(g_values, mask, z_threshold, mode=mode))
+    return results
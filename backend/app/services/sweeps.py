@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.db.session import get_async_session
+from app.models.generation import Generation
+from app.schemas.sweeps import SweepCreate, SweepCurve, SweepPoint, SweepResult
+from app.services import attacks, rollups
+from app.services.detections import bleu_scores, detect_generations, insert_detections
+from app.services.jobs import ProgressCallback
+
+
+async def _load_originals(ids: List[int]) -> List[Generation]:
+    async with get_async_session() as db:
+        stmt = select(Generation).where(Generation.generation_id.in_(ids))
+        rows = {g.generation_id: g for g in (await db.execute(stmt)).scalars()}
+    missing = [i for i in ids if i not in rows]
+    if missing:
+        raise LookupError(f"Generation not found: {missing}")
+    return [rows[i] for i in ids]
+
+
+def _persist(
+    db: Session,
+    variant_rows: List[Dict[str, Any]],
+    results: List[Dict[str, Any]],
+    bleu_scores: List[Optional[float]],
+    scoring_mode: str,
+) -> int:
+    """Insert every variant and its detection in one transaction; returns the detection count."""
+    inserted = db.scalars(insert(Generation).returning(Generation, sort_by_parameter_order=True), variant_rows).all()
+    rollups.record_attacks(db, [g.watermark_enabled for g in inserted])
+    detections = insert_detections(db, list(zip(inserted, results, bleu_scores)), scoring_mode)
+    db.commit()
+    return len(detections)
+
+
+def _curves(
+    grid: List[Tuple[str, float]],
+    originals: List[Generation],
+    results: List[Dict[str, Any]],
+    bleu_scores: List[Optional[float]],
+) -> List[SweepCurve]:
+    points: Dict[str, List[SweepPoint]] = OrderedDict()
+    for k, (attack_type, intensity) in enumerate(grid):
+        offset = k * len(originals)
+        counts = {True: [0, 0], False: [0, 0]}  # watermark_enabled -> [variants, flagged]
+        z_scores: List[float] = []
+        bleus: List[float] = []
+        for j, original in enumerate(originals):
+            result, bleu = results[offset + j], bleu_scores[offset + j]
+            counts[original.watermark_enabled][0] += 1
+            counts[original.watermark_enabled][1] += int(bool(result.get("is_watermarked")))
+            if result.get("z_score") is not None:
+                z_scores.append(result["z_score"])
+            if bleu is not None:
+                bleus.append(bleu)
+        (positives, true_positives), (negatives, false_positives) = counts[True], counts[False]
+        points.setdefault(attack_type, []).append(
+            SweepPoint(
+                intensity=intensity,
+                positives=positives,
+                true_positives=true_positives,
+                negatives=negatives,
+                false_positives=false_positives,
+                true_positive_rate=true_positives / positives if positives else None,
+                false_positive_rate=false_positives / negatives if negatives else None,
+                mean_z_score=sum(z_scores) / len(z_scores) if z_scores else None,
+                mean_bleu_score=sum(bleus) / len(bleus) if bleus else None,
+            )
+        )
+    return [SweepCurve(attack_type=attack_type, points=p) for attack_type, p in points.items()]
+
+
+async def run_sweep(params: SweepCreate, progress: Optional[ProgressCallback] = None) -> SweepResult:
+    """Attack every generation at every (attack type, intensity) grid point and detect the variants.
+
+    Variants are generated and scored in memory (one detection pass per
+    model/key for the whole grid), then every ``Generation`` and
+    ``Detection`` row is bulk-inserted in a single commit.
+    """
+    ids = list(dict.fromkeys(params.generation_ids))
+    grid = [(t, i) for t in dict.fromkeys(params.attack_types) for i in sorted(set(params.intensities))]
+    originals = await _load_originals(ids)
+
+    base_seed = params.seed if params.seed is not None else attacks.new_seed()
+    texts = [g.output_text for g in originals]
+    models = [params.model or g.model for g in originals]
+    seeds = [
+        [(base_seed + k * len(originals) + j) % 2**62 for j in range(len(originals))] for k in range(len(grid))
+    ]
+    # Run together so model attacks at different intensities share generation
+    # batches; their rewrites go through the bulk inference limit.
+    tasks = [
+        asyncio.ensure_future(attacks.apply_attacks_by_model(texts, models, attack_type, intensity, seeds[k]))
+        for k, (attack_type, intensity) in enumerate(grid)
+    ]
+    try:
+        done = 0
+        for finished in asyncio.as_completed(tasks):
+            await finished
+            done += 1
+            # Also where a cancel request takes effect.
+            if progress is not None:
+                await progress(done / len(grid) * 0.4, f"attacked {done}/{len(grid)} grid points")
+    finally:
+        # Stop the remaining attacks when the job is cancelled or one fails.
+        for task in tasks:
+            task.cancel()
+    variants = [task.result() for task in tasks]
+
+    variant_rows = [
+        attacks.attack_row(original, attack_type, intensity, text, seed)
+        for (attack_type, intensity), grid_texts, grid_seeds in zip(grid, variants, seeds)
+        for original, text, seed in zip(originals, grid_texts, grid_seeds)
+    ]
+    # Transient rows: detection only needs model, watermark_key and output_text.
+    results = await detect_generations(
+        [Generation(**row) for row in variant_rows], params.scoring, use_token_ids=False
+    )
+    if progress is not None:
+        await progress(0.8, f"detected {len(variant_rows)} variants")
+    bleus = await bleu_scores(
+        [(row["output_text"], originals[n % len(originals)].output_text) for n, row in enumerate(variant_rows)]
+    )
+
+    async with get_async_session() as db:
+        detections_created = await db.run_sync(_persist, variant_rows, results, bleus, params.scoring)
+    return SweepResult(
+        seed=base_seed,
+        generations_created=len(variant_rows),
+        detections_created=detections_created,
+        curves=await asyncio.to_thread(_curves, grid, originals, results, bleus),
+    )
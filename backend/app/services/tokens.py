@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import track_cache
+
+TOKEN_DTYPE = np.int32
+
+
+def pack_token_ids(token_ids: Sequence[int]) -> bytes:
+    """Compact storage format for ``Generation.output_token_ids``."""
+    return np.asarray(token_ids, dtype=TOKEN_DTYPE).tobytes()
+
+
+def unpack_token_ids(blob: Optional[bytes]) -> Optional[List[int]]:
+    if blob is None:
+        return None
+    return np.frombuffer(blob, dtype=TOKEN_DTYPE).tolist()
+
+
+class TokenCache:
+    """LRU of token id arrays keyed by (tokenizer, sha256 of the text).
+
+    Re-detecting the same generation (key sweeps, threshold changes, repeated
+    clicks in the UI) then skips tokenization entirely. Only the digest of the
+    text is kept, not the text itself.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self._items: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(tokenizer_name: str, text: str) -> Tuple[str, bytes]:
+        return tokenizer_name, hashlib.sha256(text.encode("utf-8")).digest()
+
+    def put(self, tokenizer_name: str, text: str, token_ids: Sequence[int]) -> None:
+        key = self._key(tokenizer_name, text)
+        with self._lock:
+            self._items[key] = np.asarray(token_ids, dtype=TOKEN_DTYPE)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def encode_many(
+        self,
+        tokenizer_name: str,
+        tokenizer: Any,
+        texts: List[str],
+        known: Optional[List[Optional[Sequence[int]]]] = None,
+    ) -> List[List[int]]:
+        """Token ids for every text; ``known[i]`` (e.g. persisted ids) wins over the cache.
+
+        All cache misses are tokenized together in a single tokenizer call.
+        """
+        results: List[Optional[List[int]]] = [None] * len(texts)
+        misses: List[int] = []
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self._key(tokenizer_name, text)
+                if known is not None and known[i] is not None:
+                    ids = np.asarray(known[i], dtype=TOKEN_DTYPE)
+                    self._items[key] = ids
+                    self._items.move_to_end(key)
+                    results[i] = ids.tolist()
+                    self.hits += 1
+                    continue
+                cached = self._items.get(key)
+                if cached is not None:
+                    self._items.move_to_end(key)
+                    results[i] = cached.tolist()
+                    self.hits += 1
+                else:
+                    misses.append(i)
+                    self.misses += 1
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+        if misses:
+            encoded = tokenizer([texts[i] for i in misses])["input_ids"]
+            for i, ids in zip(misses, encoded):
+                results[i] = list(ids)
+                self.put(tokenizer_name, texts[i], ids)
+
+        return results  # type: ignore[return-value]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "max_size": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+token_cache = TokenCache(settings.token_cache_size)
+track_cache("tokens", token_cache.stats)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import copy
+from typing import Any, Optional, Sequence
+
+import torch
+from synthid_text import logits_processing
+
+from app.core.config import settings
+from app.core.llm import llm_manager
+from app.core.metrics import track_cache
+from app.services.build_cache import BuildCache
+from app.services.watermark_keys import key_registry
+
+# Default Constants
+DEFAULT_NGRAM_LEN = 5
+DEFAULT_SAMPLING_TABLE_SIZE = 65536 * 4  # Increased to 262144 to safely cover Llama-3 vocab (128k)
+DEFAULT_SAMPLING_TABLE_SEED = 0
+DEFAULT_CONTEXT_HISTORY_SIZE = 1024
+DEFAULT_DEPTH = 3
+DEFAULT_WATERMARK_KEY = "12345"
+
+
+class WatermarkLogitsProcessor(logits_processing.SynthIDLogitsProcessor):
+    """SynthID processor that matches the HuggingFace LogitsProcessor API.
+
+    The full-vocabulary float32 copy of the scores and the ``[batch, vocab]``
+    output are allocated on the first decoding step and reused afterwards, so a
+    step only allocates top-k sized tensors. The returned tensor is therefore
+    overwritten by the next call; ``model.generate`` consumes it before then.
+    """
+
+    _scores_f32: Optional[torch.Tensor] = None
+    _output: Optional[torch.Tensor] = None
+
+    @staticmethod
+    def _reuse(buffer: Optional[torch.Tensor], like: torch.Tensor, dtype: torch.dtype) -> torch.Tensor:
+        if buffer is None or buffer.shape != like.shape or buffer.dtype != dtype or buffer.device != like.device:
+            return torch.empty(like.shape, dtype=dtype, device=like.device)
+        return buffer
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        # Cast to float32 for stability during watermark calculation (recent
+        # transformers versions already hand over float32 logits).
+        if scores.dtype == torch.float32:
+            scores_f32 = scores
+        else:
+            self._scores_f32 = scores_f32 = self._reuse(self._scores_f32, scores, torch.float32)
+            scores_f32.copy_(scores)
+
+        # watermarked_call logic (SynthID)
+        updated_scores_top_k, top_k_indices, _ = self.watermarked_call(input_ids, scores_f32)
+
+        # Scatter the top-k back into a -inf vocabulary so only they are
+        # selectable; the cast to the original dtype happens on the k values only.
+        self._output = output = self._reuse(self._output, scores, scores.dtype)
+        output.fill_(-float("inf"))
+        output.scatter_(1, top_k_indices, updated_scores_top_k.to(scores.dtype))
+        return output
+
+    def fork(self, *, top_k: int) -> "WatermarkLogitsProcessor":
+        """Return a processor for one generation call.
+
+        The keys and the sampling table are shared with the cached instance;
+        only the per-generation SynthID state and the step buffers start fresh.
+        """
+        processor = copy.copy(self)
+        processor.state = None
+        processor._scores_f32 = processor._output = None
+        processor.top_k = int(top_k)
+        return processor
+
+    def with_keys(self, keys: Sequence[int]) -> "WatermarkLogitsProcessor":
+        """Return a detection-only copy hashing with ``keys`` instead of its own.
+
+        Passing the keys of several watermark keys back to back makes one
+        ``compute_g_values`` call produce all of their g-values as extra depth
+        layers; the sampling table is shared.
+        """
+        processor = copy.copy(self)
+        processor.state = None
+        processor._scores_f32 = processor._output = None
+        processor.keys = torch.tensor(list(keys), device=self.keys.device)
+        return processor
+
+
+class ProcessorCache(BuildCache[WatermarkLogitsProcessor]):
+    """Bounded LRU of ready-to-use watermark processors.
+
+    Building a processor derives the depth keys and materialises the
+    ``DEFAULT_SAMPLING_TABLE_SIZE`` sampling table on the target device, which
+    dominates the cost of short detections. Cached instances are only used
+    through their stateless helpers (``compute_g_values`` and the masks);
+    generation goes through :meth:`WatermarkLogitsProcessor.fork`.
+    """
+
+    def get(
+        self,
+        model_name: str,
+        watermark_key: str,
+        device: Any,
+        *,
+        scheme: Optional[str] = None,
+        depth: int = DEFAULT_DEPTH,
+        ngram_len: int = DEFAULT_NGRAM_LEN,
+    ) -> WatermarkLogitsProcessor:
+        scheme = scheme or settings.watermark_key_scheme
+        cache_key = (model_name, watermark_key, scheme, depth, ngram_len, str(device))
+        return self.get_or_build(
+            cache_key,
+            lambda: WatermarkLogitsProcessor(
+                ngram_len=ngram_len,
+                keys=key_registry.get(watermark_key, depth, scheme),
+                sampling_table_size=DEFAULT_SAMPLING_TABLE_SIZE,
+                sampling_table_seed=DEFAULT_SAMPLING_TABLE_SEED,
+                context_history_size=DEFAULT_CONTEXT_HISTORY_SIZE,
+                # The temp/top_k here don't affect compute_g_values, but are required for init.
+                temperature=1.0, # Pass 1.0 to avoid double temperature scaling if SynthID applies it internally
+                top_k=40,
+                device=device,
+            ),
+        )
+
+    def invalidate_model(self, model_name: str) -> None:
+        self.invalidate(lambda cache_key: cache_key[0] == model_name)
+
+
+processor_cache = ProcessorCache(settings.processor_cache_size)
+track_cache("watermark_processors", processor_cache.stats)
+# Cached processors hold device tensors; drop them together with their model.
+llm_manager.add_eviction_listener(processor_cache.invalidate_model)
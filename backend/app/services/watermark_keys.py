@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple, get_args
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import track_cache
+from app.db.session import get_session
+from app.models.watermark_key import WatermarkKey
+from app.schemas.generations import KeyScheme
+
+logger = logging.getLogger(__name__)
+
+KEY_SCHEMES: Tuple[str, ...] = get_args(KeyScheme)
+
+# The shipped placeholder for settings.watermark_key_secret.
+DEFAULT_SECRET = "change-me"
+
+_HKDF_SALT = b"watermarking-lab/synthid-depth-keys/v1"
+
+
+def legacy_keys(name: str, depth: int) -> Tuple[int, ...]:
+    """The original derivation: seed ``RandomState`` with the sum of the character codes.
+
+    Anagrams ("ab", "ba") collide and the seed space is tiny; only kept so
+    generations made with it still verify.
+    """
+    rng = np.random.RandomState(int(sum(ord(c) for c in name)))
+    return tuple(int(x) for x in rng.randint(0, 2**30, size=depth).tolist())
+
+
+def _hkdf_sha256(ikm: bytes, info: bytes, length: int) -> bytes:
+    # RFC 5869 extract-then-expand.
+    prk = hmac.new(_HKDF_SALT, ikm, hashlib.sha256).digest()
+    okm, block = b"", b""
+    for counter in range(1, -(-length // 32) + 1):
+        block = hmac.new(prk, block + info + bytes([counter]), hashlib.sha256).digest()
+        okm += block
+    return okm[:length]
+
+
+def hkdf_keys(name: str, depth: int, secret: str) -> Tuple[int, ...]:
+    """``depth`` 62-bit keys from HKDF-SHA256 keyed with ``secret``, with the key name as info."""
+    okm = _hkdf_sha256(secret.encode("utf-8"), name.encode("utf-8"), 8 * depth)
+    # 62 bits keep the keys positive in the int64 tensors SynthID hashes with.
+    return tuple(int.from_bytes(okm[8 * i:8 * i + 8], "big") >> 2 for i in range(depth))
+
+
+def check_secret(scheme: str, secret: str) -> bool:
+    """Warn when new ``hkdf`` keys would be derived from the placeholder secret; ``False`` then.
+
+    Anyone who knows the placeholder can derive every key name's depth keys,
+    i.e. forge or strip the watermark of any tenant.
+    """
+    if scheme == "hkdf" and secret == DEFAULT_SECRET:
+        logger.warning(
+            "WATERMARK_KEY_SECRET is the default %r; watermark keys are derivable by anyone. "
+            "Set a random secret before generating real data.",
+            DEFAULT_SECRET,
+        )
+        return False
+    return True
+
+
+class KeyRegistry:
+    """Depth keys per (scheme, key name, depth).
+
+    Lookups never touch the database: keys are derived in memory and kept in
+    a bounded LRU, so detection and attribution over many names cost no I/O.
+    The ``hkdf`` keys of watermarked generations are stored in
+    ``watermark_keys`` by :meth:`persist`, in the generation's own transaction.
+    :meth:`load` pins the stored keys the current secret no longer derives, so
+    text generated before a secret rotation still verifies. ``legacy`` keys
+    are never stored.
+    """
+
+    def __init__(
+        self, secret: str, session_factory: Callable[[], Session] = get_session, *, max_size: int = 4096
+    ) -> None:
+        self.secret = secret
+        self.session_factory = session_factory
+        self.max_size = max(1, int(max_size))
+        self._keys: "OrderedDict[Tuple[str, str, int], Tuple[int, ...]]" = OrderedDict()
+        # Stored keys derived with an earlier secret; never evicted.
+        self._pinned: Dict[Tuple[str, int], Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, depth: int, scheme: Optional[str] = None) -> Tuple[int, ...]:
+        scheme = scheme or settings.watermark_key_scheme
+        if scheme not in KEY_SCHEMES:
+            raise ValueError(f"Unknown watermark key scheme: {scheme}")
+        map_key = (scheme, name, depth)
+        with self._lock:
+            keys = self._pinned.get((name, depth)) if scheme == "hkdf" else None
+            if keys is None:
+                keys = self._keys.get(map_key)
+                if keys is not None:
+                    self._keys.move_to_end(map_key)
+            if keys is not None:
+                self.hits += 1
+                return keys
+            self.misses += 1
+
+        keys = legacy_keys(name, depth) if scheme == "legacy" else hkdf_keys(name, depth, self.secret)
+        with self._lock:
+            self._keys[map_key] = keys
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+        return keys
+
+    def persist(self, db: Session, names: Iterable[str], depth: int) -> None:
+        """Store the ``hkdf`` keys of ``names`` that are not stored yet; the caller commits."""
+        names = set(names)
+        if not names:
+            return
+        stored = set(
+            db.execute(
+                select(WatermarkKey.name).where(
+                    WatermarkKey.scheme == "hkdf", WatermarkKey.depth == depth, WatermarkKey.name.in_(names)
+                )
+            ).scalars()
+        )
+        for name in sorted(names - stored):
+            try:
+                # A savepoint each, so a name stored concurrently does not fail the caller's transaction.
+                with db.begin_nested():
+                    db.add(WatermarkKey(scheme="hkdf", name=name, depth=depth, keys=list(self.get(name, depth, "hkdf"))))
+            except IntegrityError:
+                pass
+
+    def load(self) -> int:
+        """Pin the stored keys the current secret would derive differently; returns how many."""
+        db = self.session_factory()
+        try:
+            rows = db.execute(select(WatermarkKey).where(WatermarkKey.scheme == "hkdf")).scalars().all()
+        finally:
+            db.close()
+        pinned = {
+            (row.name, row.depth): keys
+            for row in rows
+            if (keys := tuple(int(k) for k in row.keys)) != hkdf_keys(row.name, row.depth, self.secret)
+        }
+        with self._lock:
+            self._pinned.update(pinned)
+        return len(pinned)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._keys),
+                "max_size": self.max_size,
+                "pinned": len(self._pinned),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+key_registry = KeyRegistry(settings.watermark_key_secret, max_size=settings.watermark_key_cache_size)
+track_cache("watermark_keys", key_registry.stats)
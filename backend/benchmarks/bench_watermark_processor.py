@@ -0,0 +1,120 @@
+"""Per-token overhead of the SynthID logits processor.
+
+Times one decoding step's worth of logits processing on random scores, with
+and without watermarking, and compares the buffered processor against the
+previous implementation that allocated full-vocabulary tensors every step.
+No model is loaded, so the numbers isolate the processor itself.
+
+    python -m benchmarks.bench_watermark_processor --vocab 128256 --batch 4 --dtype float16
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+import torch
+from transformers import TopKLogitsWarper
+
+from app.services.watermark import (
+    DEFAULT_CONTEXT_HISTORY_SIZE,
+    DEFAULT_DEPTH,
+    DEFAULT_NGRAM_LEN,
+    DEFAULT_SAMPLING_TABLE_SEED,
+    DEFAULT_SAMPLING_TABLE_SIZE,
+    DEFAULT_WATERMARK_KEY,
+    WatermarkLogitsProcessor,
+)
+from app.services.watermark_keys import legacy_keys
+
+Step = Callable[[torch.LongTensor, torch.Tensor], torch.Tensor]
+
+
+def allocating_call(processor: WatermarkLogitsProcessor, input_ids: torch.LongTensor, scores: torch.Tensor) -> torch.Tensor:
+    """The processor's previous ``__call__``: cast, full-vocab ``full_like``, scatter, cast back."""
+    scores_f32 = scores.to(torch.float32)
+    updated_scores_top_k, top_k_indices, _ = processor.watermarked_call(input_ids, scores_f32)
+    new_scores = torch.full_like(scores_f32, -float("inf"))
+    new_scores.scatter_(1, top_k_indices, updated_scores_top_k)
+    return new_scores.to(scores.dtype)
+
+
+def _sync(device: torch.device) -> None:
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+def time_steps(step: Step, args: argparse.Namespace, device: torch.device, dtype: torch.dtype) -> float:
+    """Mean seconds per decoding step over ``args.steps`` steps (after ``args.warmup``)."""
+    generator = torch.Generator(device="cpu").manual_seed(0)
+    input_ids = torch.randint(0, args.vocab, (args.batch, args.prompt_len), generator=generator).to(device)
+    scores = torch.randn(args.batch, args.vocab, generator=generator).to(device=device, dtype=dtype)
+    next_tokens = torch.randint(0, args.vocab, (args.warmup + args.steps, args.batch, 1), generator=generator)
+    next_tokens = next_tokens.to(device)
+
+    started = 0.0
+    for i in range(args.warmup + args.steps):
+        if i == args.warmup:
+            _sync(device)
+            started = time.perf_counter()
+        step(input_ids, scores)
+        input_ids = torch.cat([input_ids, next_tokens[i]], dim=1)
+    _sync(device)
+    return (time.perf_counter() - started) / args.steps
+
+
+def new_processor(device: torch.device, top_k: int) -> WatermarkLogitsProcessor:
+    return WatermarkLogitsProcessor(
+        ngram_len=DEFAULT_NGRAM_LEN,
+        # The scheme does not matter for timing; legacy keys need no database.
+        keys=legacy_keys(DEFAULT_WATERMARK_KEY, DEFAULT_DEPTH),
+        sampling_table_size=DEFAULT_SAMPLING_TABLE_SIZE,
+        sampling_table_seed=DEFAULT_SAMPLING_TABLE_SEED,
+        context_history_size=DEFAULT_CONTEXT_HISTORY_SIZE,
+        temperature=1.0,
+        top_k=top_k,
+        device=device,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vocab", type=int, default=128256, help="vocabulary size (Llama-3: 128256)")
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--top-k", type=int, default=40)
+    parser.add_argument("--prompt-len", type=int, default=32)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--dtype", choices=["float16", "bfloat16", "float32"], default="float16")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    dtype = getattr(torch, args.dtype)
+    base = new_processor(device, args.top_k)
+    top_k = TopKLogitsWarper(args.top_k)
+
+    # Each watermarked run gets a fresh fork so the SynthID state starts empty.
+    allocating = base.fork(top_k=args.top_k)
+    buffered = base.fork(top_k=args.top_k)
+    runs = {
+        "no watermark (top-k warper)": lambda ids, scores: top_k(ids, scores),
+        "watermark, per-step allocation": lambda ids, scores: allocating_call(allocating, ids, scores),
+        "watermark, reused buffers": buffered,
+    }
+
+    print(f"vocab={args.vocab} batch={args.batch} top_k={args.top_k} dtype={args.dtype} device={device}")
+    baseline = None
+    for name, step in runs.items():
+        if device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(device)
+        seconds = time_steps(step, args, device, dtype)
+        baseline = seconds if baseline is None else baseline
+        line = f"{name:<32} {seconds * 1e3:8.3f} ms/token  overhead {(seconds - baseline) * 1e3:+8.3f} ms"
+        if device.type == "cuda":
+            line += f"  peak {torch.cuda.max_memory_allocated(device) / 2**20:8.1f} MiB"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
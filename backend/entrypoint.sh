@@ -8,6 +8,17 @@ export PYTHONPATH=$PYTHONPATH:.
 echo "Running migrations..."
 alembic upgrade head
 
+# Fill the dashboard rollups once (they are kept up to date on insert after
+# that). A rebuild scans every detection while holding a table lock, so a full
+# one only runs on request: REBUILD_ROLLUPS=1, e.g. after changing
+# DASHBOARD_Z_RESOLUTION.
+if [ "${REBUILD_ROLLUPS:-0}" = "1" ]; then
+    echo "Rebuilding dashboard rollups..."
+    python -m app.cli rebuild-rollups
+else
+    python -m app.cli rebuild-rollups --if-empty
+fi
+
 # Start the application
 echo "Starting application..."
 python run.py
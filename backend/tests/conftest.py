@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.db.base import Base
+
+
+@pytest.fixture
+def sqlite_engine():
+    """In-memory SQLite on one shared connection, so worker threads see the same data."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(sqlite_engine):
+    """Sync session factory over ``sqlite_engine`` with every model's table created."""
+    Base.metadata.create_all(sqlite_engine)
+    return sessionmaker(bind=sqlite_engine, expire_on_commit=False)
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.services import attacks
+
+TEXT = "워터마크 실험을 위한 예시 문장입니다. The quick brown fox jumps over the lazy dog."
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.mark.parametrize("attack_type", sorted(attacks.TEXT_ATTACKS))
+def test_text_attacks_are_reproducible_per_seed(attack_type):
+    first = run(attacks.apply_attack(TEXT, attack_type, 30, seed=7))
+    again = run(attacks.apply_attack(TEXT, attack_type, 30, seed=7))
+    other = run(attacks.apply_attack(TEXT, attack_type, 30, seed=8))
+    assert first == again
+    assert first != TEXT
+    assert other != first
+
+
+def test_batch_matches_single_calls():
+    texts = [TEXT, TEXT[::-1], "짧은 글"]
+    batch = run(attacks.apply_attacks(texts, "substitution", 50, seeds=[1, 2, 3]))
+    singles = [run(attacks.apply_attack(t, "substitution", 50, seed=s)) for t, s in zip(texts, [1, 2, 3])]
+    assert batch == singles
+
+
+def test_chunked_batch_matches_single_calls(monkeypatch):
+    monkeypatch.setattr(attacks, "TEXT_ATTACK_CHUNK_SIZE", 2)
+    texts = [TEXT, TEXT[::-1], "짧은 글", TEXT.upper(), "마지막 글"]
+    seeds = [10, 11, 12, 13, 14]
+    batch = run(attacks.apply_attacks(texts, "word_swap", 50, seeds=seeds))
+    assert batch == [run(attacks.apply_attack(t, "word_swap", 50, seed=s)) for t, s in zip(texts, seeds)]
+
+
+def test_intensity_is_a_percentage():
+    assert len(run(attacks.apply_attack(TEXT, "deletion", 30, seed=0))) == len(TEXT) - int(len(TEXT) * 0.3)
+    assert len(run(attacks.apply_attack(TEXT, "insertion", 10, seed=0))) == len(TEXT) + int(len(TEXT) * 0.1)
+    words = TEXT.split()
+    assert len(run(attacks.apply_attack(TEXT, "word_deletion", 50, seed=0)).split()) == len(words) - len(words) // 2
+    assert run(attacks.apply_attack(TEXT, "swap", 0, seed=0)) == TEXT
+
+
+@pytest.mark.parametrize("attack_type", ["word_deletion", "word_substitution", "word_insertion", "word_swap"])
+def test_word_attacks_keep_whitespace(attack_type):
+    text = "  첫 문단입니다.\n\n둘째  문단은\t여기에 있습니다.\n"
+    assert run(attacks.apply_attack(text, attack_type, 0, seed=0)) == text
+
+    attacked = run(attacks.apply_attack(text, attack_type, 30, seed=1))
+    assert attacked.startswith("  ") and attacked.endswith("\n")
+    assert "\n\n" in attacked
+
+
+def test_substitution_keeps_length_and_alphabet():
+    attacked = run(attacks.apply_attack(TEXT, "substitution", 100, seed=3))
+    assert len(attacked) == len(TEXT)
+    assert set(attacked) <= set(TEXT)
+
+
+def test_unknown_attack():
+    with pytest.raises(ValueError):
+        run(attacks.apply_attack(TEXT, "rot13", 10, seed=0))
+
+
+def test_model_attacks_seed_each_rewrite_with_its_attack_seed(monkeypatch):
+    pytest.importorskip("torch")
+    from app.services import ai
+
+    calls = []
+
+    async def fake_generate_text_bulk(prompt, params):
+        calls.append(params)
+        return {"output_text": f"rewritten {params['seed']}"}
+
+    monkeypatch.setattr(ai, "generate_text_bulk", fake_generate_text_bulk)
+    outputs = run(attacks.apply_attacks(["a", "b"], "paraphrase", 50, seeds=[5, 6], model="m"))
+
+    assert outputs == ["rewritten 5", "rewritten 6"]
+    assert [params["seed"] for params in calls] == [5, 6]
+    assert all(params["watermark_enabled"] is False and params["model"] == "m" for params in calls)
@@ -0,0 +1,61 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from app.services import ai  # noqa: E402
+from app.services.watermark import DEFAULT_DEPTH, DEFAULT_NGRAM_LEN  # noqa: E402
+from app.services.watermark_keys import key_registry  # noqa: E402
+
+KEYS = ["tenant-a", "tenant-b", "tenant-c"]
+TOKENS = list(range(100, 164))
+
+
+class FakeModel:
+    device = torch.device("cpu")
+
+
+class FakeTokenizer:
+    eos_token_id = 0
+
+
+class FakeProcessor:
+    """Returns fixed g-values: 1 for the depth keys of ``owner``, alternating 0/1 for any other."""
+
+    def __init__(self, owner, keys=()):
+        self.owner = owner
+        self.keys = list(keys)
+
+    def with_keys(self, keys):
+        return FakeProcessor(self.owner, keys)
+
+    def compute_g_values(self, input_ids):
+        positions = input_ids.shape[1] - (DEFAULT_NGRAM_LEN - 1)
+        owner_keys = set(key_registry.get(self.owner, DEFAULT_DEPTH, "hkdf"))
+        columns = [
+            torch.ones(positions) if key in owner_keys else ((torch.arange(positions) + layer) % 2).float()
+            for layer, key in enumerate(self.keys)
+        ]
+        return torch.stack(columns, dim=-1).unsqueeze(0)
+
+    def compute_context_repetition_mask(self, input_ids):
+        return torch.ones(1, input_ids.shape[1] - (DEFAULT_NGRAM_LEN - 1))
+
+    def compute_eos_token_mask(self, input_ids, eos_token_id):
+        return torch.ones(1, input_ids.shape[1])
+
+
+@pytest.mark.parametrize("mode", ["mean", "weighted_mean", "bayesian"])
+def test_attribution_ranks_the_key_whose_g_values_are_biased_first(monkeypatch, mode):
+    monkeypatch.setattr(ai.llm_manager, "get_model", lambda name: (FakeModel(), FakeTokenizer()))
+    monkeypatch.setattr(ai.processor_cache, "get", lambda *args, **kwargs: FakeProcessor("tenant-b"))
+
+    results = ai._attribute("fake-model", "text", KEYS, TOKENS, mode, "hkdf")
+
+    assert [r["watermark_key"] for r in results][0] == "tenant-b"
+    by_key = {r["watermark_key"]: r for r in results}
+    assert by_key["tenant-b"]["is_watermarked"] is True
+    assert not by_key["tenant-a"]["is_watermarked"] and not by_key["tenant-c"]["is_watermarked"]
+    # Every position of the owning key has g = 1 at every depth.
+    positions = len(TOKENS) - (DEFAULT_NGRAM_LEN - 1)
+    if mode == "mean":
+        assert by_key["tenant-b"]["z_score"] == pytest.approx((positions * DEFAULT_DEPTH) ** 0.5)
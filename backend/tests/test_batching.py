@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.services.batching import MicroBatcher
+
+
+def test_requests_with_same_key_share_one_run():
+    calls = []
+
+    async def runner(key, items):
+        calls.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+    async def main():
+        batcher = MicroBatcher(runner, max_batch_size=8, window_s=0.01)
+        return await asyncio.gather(
+            batcher.submit("a", 1),
+            batcher.submit("a", 2),
+            batcher.submit("b", 3),
+        )
+
+    results = asyncio.run(main())
+
+    assert results == ["a:1", "a:2", "b:3"]
+    assert sorted(calls) == [("a", [1, 2]), ("b", [3])]
+
+
+def test_full_batch_flushes_without_waiting_for_window():
+    calls = []
+
+    async def runner(key, items):
+        calls.append(list(items))
+        return items
+
+    async def main():
+        batcher = MicroBatcher(runner, max_batch_size=2, window_s=60.0)
+        return await asyncio.wait_for(asyncio.gather(batcher.submit("k", 1), batcher.submit("k", 2)), timeout=1.0)
+
+    assert asyncio.run(main()) == [1, 2]
+    assert calls == [[1, 2]]
+
+
+def test_runner_error_is_raised_for_every_caller():
+    async def runner(key, items):
+        raise RuntimeError("boom")
+
+    async def main():
+        batcher = MicroBatcher(runner, max_batch_size=4, window_s=0.0)
+        return await asyncio.gather(batcher.submit("k", 1), batcher.submit("k", 2), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_running_batches_are_tracked_until_done():
+    async def runner(key, items):
+        return items[:-1]  # one result short
+
+    async def main():
+        batcher = MicroBatcher(runner, max_batch_size=2, window_s=0.01)
+        first = asyncio.ensure_future(batcher.submit("a", 1))
+        second = asyncio.ensure_future(batcher.submit("a", 2))
+        await asyncio.sleep(0)
+        assert len(batcher._tasks) == 1
+        with pytest.raises(RuntimeError):
+            await first
+        with pytest.raises(RuntimeError):
+            await second
+        await asyncio.sleep(0)
+        assert not batcher._tasks
+
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.build_cache import BuildCache
+
+
+class FakeBuilder:
+    """Counts builds and blocks each one until ``release`` is set."""
+
+    def __init__(self, fail_first: bool = False) -> None:
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail_first = fail_first
+
+    def __call__(self):
+        self.calls += 1
+        call = self.calls
+        self.started.set()
+        assert self.release.wait(5)
+        if self.fail_first and call == 1:
+            raise RuntimeError("build failed")
+        return f"built-{call}"
+
+
+def test_concurrent_misses_on_one_key_build_once():
+    cache = BuildCache(4)
+    build = FakeBuilder()
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(cache.get_or_build, "k", build) for _ in range(4)]
+        assert build.started.wait(5)
+        build.release.set()
+        results = [f.result(5) for f in futures]
+
+    assert results == ["built-1"] * 4
+    assert build.calls == 1
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 3
+
+
+def test_other_keys_do_not_wait_for_a_build():
+    cache = BuildCache(4)
+    cache.get_or_build("ready", lambda: "value")
+    build = FakeBuilder()
+    with ThreadPoolExecutor(1) as pool:
+        slow = pool.submit(cache.get_or_build, "slow", build)
+        assert build.started.wait(5)
+        assert cache.get_or_build("ready", lambda: "unused") == "value"
+        build.release.set()
+        assert slow.result(5) == "built-1"
+
+
+def test_a_failed_build_lets_a_waiter_rebuild():
+    cache = BuildCache(4)
+    build = FakeBuilder(fail_first=True)
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(cache.get_or_build, "k", build)
+        assert build.started.wait(5)
+        waiter = pool.submit(cache.get_or_build, "k", build)
+        build.release.set()
+        with pytest.raises(RuntimeError):
+            first.result(5)
+        assert waiter.result(5) == "built-2"
+
+    assert cache.get_or_build("k", lambda: "unused") == "built-2"
+
+
+def test_invalidation_during_a_build_does_not_insert():
+    cache = BuildCache(4)
+    build = FakeBuilder()
+    with ThreadPoolExecutor(1) as pool:
+        result = pool.submit(cache.get_or_build, ("model-a", "key"), build)
+        assert build.started.wait(5)
+        cache.invalidate(lambda key: key[0] == "model-a")
+        build.release.set()
+        assert result.result(5) == "built-1"
+
+    assert cache.stats()["size"] == 0
+    assert cache.get_or_build(("model-a", "key"), lambda: "fresh") == "fresh"
+
+
+def test_least_recently_used_is_evicted():
+    cache = BuildCache(2)
+    cache.get_or_build("a", lambda: 1)
+    cache.get_or_build("b", lambda: 2)
+    cache.get_or_build("a", lambda: 0)
+    cache.get_or_build("c", lambda: 3)
+
+    assert cache.get_or_build("a", lambda: 0) == 1
+    assert cache.get_or_build("b", lambda: 20) == 20
+    assert cache.stats()["evictions"] == 2
@@ -0,0 +1,46 @@
+from app.services.dashboard import (
+    METRIC_CONFIDENCE,
+    METRIC_VERDICT,
+    METRIC_Z_SCORE,
+    AggregateRow,
+    build_stats,
+)
+
+
+def test_build_stats_from_aggregate_rows():
+    rows = [
+        AggregateRow(METRIC_VERDICT, True, 1, 3),
+        AggregateRow(METRIC_VERDICT, False, 0, 1),
+        AggregateRow(METRIC_CONFIDENCE, True, 5, 3),
+        AggregateRow(METRIC_CONFIDENCE, False, 1, 1),
+        AggregateRow(METRIC_Z_SCORE, True, 500, 3),
+        AggregateRow(METRIC_Z_SCORE, False, -50, 1),
+    ]
+
+    stats = build_stats(rows, attack_attempts=2)
+
+    assert stats["total_verifications"] == 4
+    assert stats["detection_rate"] == 75.0
+    assert stats["attack_attempts"] == 2
+    assert stats["avg_auc"] == 1.0
+    assert stats["roc_points"][0] == {"fpr": 0.0, "tpr": 0.0}
+    assert stats["roc_points"][-1] == {"fpr": 1.0, "tpr": 1.0}
+    assert stats["distribution"][0] == {"range": "0-20", "clean": 1, "watermarked": 0}
+    assert stats["distribution"][4] == {"range": "80-100", "clean": 0, "watermarked": 3}
+
+
+def test_build_stats_without_negatives_has_no_curve():
+    stats = build_stats([AggregateRow(METRIC_Z_SCORE, True, 10, 5)], attack_attempts=0)
+
+    assert stats["roc_points"] == []
+    assert stats["avg_auc"] == 0.0
+    assert stats["total_verifications"] == 0
+
+
+def test_exact_counts_override_the_histogram():
+    # Both classes fall into the same 0.01 bin, but their exact scores separate them.
+    rows = [AggregateRow(METRIC_Z_SCORE, True, 100, 2), AggregateRow(METRIC_Z_SCORE, False, 100, 2)]
+
+    assert build_stats(rows, attack_attempts=0)["avg_auc"] == 0.5
+    exact = build_stats(rows, attack_attempts=0, exact_z_counts={1.004: [0, 2], 1.001: [2, 0]})
+    assert exact["avg_auc"] == 1.0
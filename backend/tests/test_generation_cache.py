@@ -0,0 +1,72 @@
+import asyncio
+
+from app.schemas.generations import GenerationCreate
+from app.services.generation_cache import GenerationResultCache, request_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_request_key_is_canonical_and_ignores_the_opt_in_flag():
+    a = GenerationCreate(input_text="hi", model="m", watermark_key="k", cache=True)
+    b = GenerationCreate(watermark_key="k", model="m", input_text="hi")
+    assert request_key(a) == request_key(b)
+    assert request_key(a) != request_key(GenerationCreate(input_text="hi", model="m", watermark_key="k2"))
+    assert request_key(a) != request_key(GenerationCreate(input_text="hi", model="m", watermark_key="k", seed=1))
+
+
+def test_request_key_changes_with_the_key_derivation():
+    payload = GenerationCreate(input_text="hi", model="m", watermark_key="k", seed=1)
+    key = request_key(payload, scheme="hkdf", secret="s")
+    assert key == request_key(payload, scheme="hkdf", secret="s")
+    assert key != request_key(payload, scheme="legacy", secret="s")
+    assert key != request_key(payload, scheme="hkdf", secret="rotated")
+
+
+def test_duplicates_share_one_call_then_hit_until_expiry():
+    clock = FakeClock()
+    cache = GenerationResultCache(max_entries=8, ttl_s=10.0, clock=clock)
+    calls = []
+
+    async def create():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def main():
+        first = await asyncio.gather(*(cache.get_or_create("k", create) for _ in range(3)))
+        second = await cache.get_or_create("k", create)
+        clock.now = 11.0
+        third = await cache.get_or_create("k", create)
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+    assert first == [(1, False), (1, True), (1, True)]
+    assert second == (1, True)
+    assert third == (2, False)
+    assert cache.stats()["coalesced"] == 2
+
+
+def test_failures_are_not_cached_and_size_is_bounded():
+    cache = GenerationResultCache(max_entries=2, ttl_s=10.0)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def main():
+        try:
+            await cache.get_or_create("k", fail)
+        except RuntimeError:
+            pass
+        for i in range(3):
+            await cache.get_or_create(f"k{i}", lambda i=i: asyncio.sleep(0, result=i))
+
+    asyncio.run(main())
+    assert cache.lookup("k") is None
+    assert cache.lookup("k0") is None
+    assert (cache.lookup("k1"), cache.lookup("k2")) == (1, 2)
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.batching import MicroBatcher
+from app.services.inference import BulkLimiter, InferencePool, InferenceQueueFull
+
+
+def test_pool_runs_blocking_work_off_the_loop():
+    pool = InferencePool(max_workers=1, max_queue=0, retry_after=1)
+
+    async def main():
+        return await pool.run(lambda: threading.current_thread().name)
+
+    assert asyncio.run(main()).startswith("inference")
+    assert pool.stats()["completed"] == 1
+    pool.shutdown()
+
+
+def test_pool_rejects_when_full():
+    pool = InferencePool(max_workers=1, max_queue=1, retry_after=7)
+    release = threading.Event()
+
+    async def main():
+        first = asyncio.ensure_future(pool.run(release.wait))
+        second = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        assert pool.stats()["queued"] == 1
+
+        with pytest.raises(InferenceQueueFull) as exc_info:
+            await pool.run(release.wait)
+        assert exc_info.value.retry_after == 7
+
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(main())
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    pool.shutdown()
+
+
+def test_pool_releases_slot_of_cancelled_queued_job():
+    pool = InferencePool(max_workers=1, max_queue=1, retry_after=1)
+    release = threading.Event()
+    ran = []
+
+    async def main():
+        first = asyncio.ensure_future(pool.run(release.wait))
+        try:
+            queued = asyncio.ensure_future(pool.run(ran.append, "queued"))
+            await asyncio.sleep(0.05)
+            queued.cancel()
+            await asyncio.sleep(0.05)
+            assert pool.stats()["queued"] == 0
+
+            # The slot is free again, so this is accepted rather than rejected.
+            again = asyncio.ensure_future(pool.run(ran.append, "again"))
+        finally:
+            release.set()
+        await asyncio.gather(first, again)
+
+    asyncio.run(main())
+    assert ran == ["again"]
+    assert pool.stats()["rejected"] == 0
+    pool.shutdown()
+
+
+def test_bulk_limiter_keeps_a_flood_within_pool_capacity():
+    pool = InferencePool(max_workers=1, max_queue=32, retry_after=1)
+    limiter = BulkLimiter(16)
+
+    async def runner(key, items):
+        return await pool.run(lambda: (time.sleep(0.001), items)[1])
+
+    async def main():
+        batcher = MicroBatcher(runner, max_batch_size=8, window_s=0.001)
+        # Distinct keys, so every call needs its own pool slot.
+        return await asyncio.gather(*(limiter.run(batcher.submit, i % 50, i) for i in range(400)))
+
+    assert asyncio.run(main()) == list(range(400))
+    assert pool.stats()["rejected"] == 0
+    assert limiter.stats() == {"limit": 16, "running": 0, "waiting": 0}
+    pool.shutdown()
+
+
+def test_bulk_limiter_retries_when_the_pool_is_full():
+    pool = InferencePool(max_workers=1, max_queue=0, retry_after=1)
+    limiter = BulkLimiter(4, retry_s=0.01)
+    release = threading.Event()
+
+    async def main():
+        busy = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.01)
+        bulk = asyncio.ensure_future(limiter.run(pool.run, lambda: "done"))
+        await asyncio.sleep(0.05)
+        release.set()
+        await busy
+        return await bulk
+
+    assert asyncio.run(main()) == "done"
+    assert pool.stats()["rejected"] >= 1
+    pool.shutdown()
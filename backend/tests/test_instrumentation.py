@@ -0,0 +1,48 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.db.instrumentation import QueryStatsMiddleware, instrument_engine, pool_stats, query_metrics
+
+
+def make_client(engine):
+    instrument_engine(engine)
+    instrument_engine(engine)  # idempotent
+
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int, queries: int = 1):
+        with engine.connect() as conn:
+            for _ in range(queries):
+                conn.execute(text("SELECT 1"))
+        return {"item_id": item_id}
+
+    return TestClient(app)
+
+
+def test_request_query_count_and_timing_headers(sqlite_engine):
+    client = make_client(sqlite_engine)
+    response = client.get("/items/1", params={"queries": 3})
+    assert response.headers["x-db-query-count"] == "3"
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+
+def test_metrics_are_grouped_by_route_template(sqlite_engine):
+    query_metrics.reset()
+    engine = sqlite_engine
+    client = make_client(engine)
+    client.get("/items/1", params={"queries": 2})
+    client.get("/items/2", params={"queries": 4})
+
+    (entry,) = query_metrics.stats()["endpoints"]
+    assert entry["endpoint"] == "GET /items/{item_id}"
+    assert (entry["requests"], entry["queries"], entry["max_queries"]) == (2, 6, 4)
+    assert entry["mean_queries"] == 3
+
+    # Queries outside a request are counted separately.
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert query_metrics.stats()["background"]["queries"] == 1
+    assert "status" in pool_stats(engine)
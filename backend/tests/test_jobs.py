@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from app.models.job import Job
+from app.services import jobs
+
+
+class EchoParams(BaseModel):
+    value: int
+    steps: int = 1
+
+
+@jobs.register_job("test_echo", EchoParams)
+async def echo_job(params, ctx):
+    for step in range(params.steps):
+        await ctx.progress((step + 1) / params.steps, f"step {step + 1}")
+    if params.value < 0:
+        raise ValueError("negative")
+    return {"value": params.value}
+
+
+@pytest.fixture
+def queue(session_factory):
+    return jobs.JobQueue(session_factory, workers=0, progress_interval_s=0.0)
+
+
+def test_jobs_run_in_submission_order_and_store_results(queue, session_factory):
+    with session_factory() as db:
+        first = queue.submit(db, "test_echo", {"value": 1})
+        second = queue.submit(db, "test_echo", EchoParams(value=-1))
+
+    claimed = queue.claim()
+    assert claimed.job_id == first.job_id and claimed.status == jobs.JOB_RUNNING
+    asyncio.run(queue.run_job(claimed))
+    asyncio.run(queue.run_job(queue.claim()))
+    assert queue.claim() is None
+
+    with session_factory() as db:
+        done, failed = db.get(Job, first.job_id), db.get(Job, second.job_id)
+        assert (done.status, done.result, done.progress) == (jobs.JOB_SUCCEEDED, {"value": 1}, 1.0)
+        assert (failed.status, failed.error) == (jobs.JOB_FAILED, "negative")
+
+
+def test_cancel_pending_and_running_jobs(queue, session_factory):
+    with session_factory() as db:
+        pending = queue.submit(db, "test_echo", {"value": 1})
+        running = queue.submit(db, "test_echo", {"value": 2, "steps": 3})
+        assert queue.cancel(db, pending.job_id).status == jobs.JOB_CANCELLED
+
+    claimed = queue.claim()
+    assert claimed.job_id == running.job_id
+    with session_factory() as db:
+        assert queue.cancel(db, running.job_id).cancel_requested is True
+
+    # The handler stops at its first progress report.
+    asyncio.run(queue.run_job(claimed))
+    with session_factory() as db:
+        assert db.get(Job, running.job_id).status == jobs.JOB_CANCELLED
+
+
+def test_unknown_kind_and_invalid_params_are_rejected(queue, session_factory):
+    with session_factory() as db:
+        with pytest.raises(jobs.UnknownJobKind):
+            queue.submit(db, "nope", {})
+        with pytest.raises(ValueError):
+            queue.submit(db, "test_echo", {"value": "x"})
+
+
+def test_restart_fails_interrupted_jobs(queue, session_factory):
+    with session_factory() as db:
+        job = queue.submit(db, "test_echo", {"value": 1})
+    queue.claim()
+    assert queue.fail_interrupted() == 1
+    with session_factory() as db:
+        assert db.get(Job, job.job_id).status == jobs.JOB_FAILED
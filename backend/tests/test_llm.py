@@ -0,0 +1,103 @@
+import pytest
+
+from app.core.llm import LLMManager
+
+
+class FakeModel:
+    device = "cpu"
+
+    def __init__(self, footprint):
+        self.footprint = footprint
+
+    def get_memory_footprint(self):
+        return self.footprint
+
+
+class FakeLLMManager(LLMManager):
+    """Loads ``FakeModel``s of the given sizes instead of real weights."""
+
+    def __init__(self, budget, sizes, estimates=None, failing=()):
+        super().__init__(memory_budget_bytes=budget)
+        self.sizes = sizes
+        # Config-based estimates; a model missing here cannot be estimated.
+        self.estimates = estimates if estimates is not None else dict(sizes)
+        self.failing = set(failing)
+        self.loads = []
+        self.estimated = []
+        self.evicted = []
+        self.add_eviction_listener(self.evicted.append)
+
+    def _load_weights(self, model_name):
+        # What had been evicted by the time the weights were loaded.
+        self.loads.append((model_name, list(self.evicted)))
+        if model_name in self.failing:
+            raise RuntimeError("out of memory")
+        return FakeModel(self.sizes[model_name]), object()
+
+    def _estimate_footprint(self, model_name):
+        self.estimated.append(model_name)
+        return self.estimates[model_name]
+
+    def _free_device_memory(self):
+        pass
+
+
+def resident(manager):
+    return [m["model"] for m in manager.status()["models"]]
+
+
+def test_a_failed_load_releases_its_reservation():
+    manager = FakeLLMManager(100, {"a": 50, "b": 40, "c": 50}, failing={"b"})
+    manager.load_model("a")
+
+    with pytest.raises(RuntimeError):
+        manager.load_model("b")
+    assert manager._reserved == {}
+    assert manager.status()["loading"] == []
+
+    # A leaked reservation for "b" would push "a" out to make room for "c".
+    manager.load_model("c")
+    assert resident(manager) == ["a", "c"]
+    assert manager.evicted == []
+
+
+def test_expected_footprint_prefers_the_measured_size():
+    manager = FakeLLMManager(100, {"a": 70, "b": 20}, estimates={"a": 30})
+    assert manager._expected_footprint("a") == 30
+    # Unknown sizes are 0, so room is only made once the model is loaded.
+    assert manager._expected_footprint("b") == 0
+
+    manager.load_model("a")
+    manager.estimated.clear()
+    assert manager._expected_footprint("a") == 70
+    manager.evict("a")
+    assert manager._expected_footprint("a") == 70
+    assert manager.estimated == []
+
+
+def test_eviction_before_a_load_uses_the_expected_footprint():
+    manager = FakeLLMManager(100, {"a": 60, "b": 60})
+    manager.load_model("a")
+
+    manager.load_model("b")
+    assert resident(manager) == ["b"]
+    assert manager.evicted == ["a"]
+    # "a" went before "b" was loaded, not after.
+    assert manager.loads == [("a", []), ("b", ["a"])]
+
+
+def test_evicting_notifies_listeners():
+    manager = FakeLLMManager(100, {"a": 30, "b": 30, "c": 30, "d": 60}, estimates={})
+    for name in ["a", "b", "c"]:
+        manager.load_model(name)
+    manager.load_model("a")  # "b" is now the least recently used
+
+    # "d" could not be estimated, so room is made against its measured size.
+    manager.load_model("d")
+    assert manager.evicted == ["b", "c"]
+    assert resident(manager) == ["a", "d"]
+
+    assert manager.evict("a") is True
+    assert manager.evict("a") is False
+    assert manager.evicted == ["b", "c", "a"]
+    assert manager.status()["resident_bytes"] == 60
@@ -0,0 +1,26 @@
+from prometheus_client import REGISTRY
+
+from app.core import metrics
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels)
+
+
+def test_detection_stages_are_timed_per_model():
+    before = sample("detection_stage_seconds_count", model="m", stage="scoring") or 0
+    with metrics.observe_stage("m", "scoring"):
+        pass
+    assert sample("detection_stage_seconds_count", model="m", stage="scoring") == before + 1
+
+
+def test_cache_and_queue_gauges_are_read_at_scrape_time():
+    state = {"hits": 3, "misses": 1, "size": 2}
+    metrics.track_cache("test_cache", lambda: dict(state))
+    metrics.track_queue("test_queue", "pending", lambda: state["size"])
+
+    assert sample("cache_hits_total", cache="test_cache") == 3
+    state.update(hits=5, size=7)
+    assert sample("cache_hits_total", cache="test_cache") == 5
+    assert sample("cache_entries", cache="test_cache") == 7
+    assert sample("queue_depth", queue="test_queue", state="pending") == 7
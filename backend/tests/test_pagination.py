@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.api.pagination import decode_cursor, encode_cursor, paginate
+from app.db.base import Base
+from app.models.generation import Generation
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 1, 12, 9, 30, 15, 123456, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+
+def test_keyset_pages_match_offset_pages():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Generation.__table__])
+    base = datetime(2026, 1, 1)
+    with Session(engine) as db:
+        # Pairs of rows share a timestamp so the id tiebreaker matters.
+        db.add_all(
+            Generation(input_text="q", output_text="a", model="m", created_at=base + timedelta(minutes=i // 2))
+            for i in range(7)
+        )
+        db.commit()
+
+        stmt = select(Generation)
+        cols = (Generation.created_at, Generation.generation_id)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = paginate(db, stmt, *cols, page=1, page_size=3, cursor=cursor)
+            seen.extend(r.generation_id for r in rows)
+            if cursor is None:
+                break
+
+        offset_ids = []
+        for page in (1, 2, 3):
+            rows, _ = paginate(db, stmt, *cols, page=page, page_size=3, cursor=None)
+            offset_ids.extend(r.generation_id for r in rows)
+
+    assert seen == offset_ids == [7, 6, 5, 4, 3, 2, 1]
@@ -0,0 +1,100 @@
+import pytest
+
+from app.services.prefix_cache import PrefixCache, common_prefix
+
+TEMPLATE = [101, 102, 103, 104, 105]
+
+
+def build_prompt_ids(model_name, tokenizer, input_text):
+    return TEMPLATE + [ord(c) for c in input_text] + [200]
+
+
+class StubPrefixCache(PrefixCache):
+    """Prefills into a plain nested list instead of running a model."""
+
+    def __init__(self, *args, fail=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prefills = 0
+        self.fail = fail
+
+    def _run_model(self, model, token_ids):
+        self.prefills += 1
+        if self.fail:
+            raise RuntimeError("out of memory")
+        return [[("k", t), ("v", t)] for t in token_ids]
+
+
+def test_common_prefix():
+    assert common_prefix([[1, 2, 3], [1, 2, 4], [1, 2]]) == [1, 2]
+    assert common_prefix([[1, 2], [3]]) == []
+    assert common_prefix([[5, 6]]) == [5, 6]
+
+
+def test_prefix_matches_only_prompts_that_extend_the_template():
+    cache = StubPrefixCache(build_prompt_ids)
+    prompt = build_prompt_ids("m", None, "hello")
+
+    assert cache.past_key_values("m", None, None, prompt) is not None
+    # generate() needs at least one token past the cached prefix.
+    assert cache.past_key_values("m", None, None, TEMPLATE) is None
+    assert cache.past_key_values("m", None, None, [999] + prompt) is None
+    assert cache.prefills == 1
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
+
+
+def test_the_cached_kv_is_unchanged_after_use():
+    cache = StubPrefixCache(build_prompt_ids)
+    prompt = build_prompt_ids("m", None, "hi")
+
+    first = cache.past_key_values("m", None, None, prompt)
+    expected = [list(layer) for layer in first]
+    # generate() appends to the cache it is handed.
+    first.append([("k", 1), ("v", 1)])
+    first[0].append(("k", 2))
+
+    assert cache.past_key_values("m", None, None, prompt) == expected
+
+
+def test_evicting_a_model_drops_its_prefix():
+    cache = StubPrefixCache(build_prompt_ids)
+    prompt = build_prompt_ids("a", None, "hi")
+    cache.past_key_values("a", None, None, prompt)
+    cache.past_key_values("b", None, None, prompt)
+
+    cache.invalidate_model("a")
+    assert cache.stats()["size"] == 1
+    cache.past_key_values("a", None, None, prompt)
+    assert cache.prefills == 3
+
+
+def test_short_templates_and_failed_prefills_are_remembered_as_uncached():
+    short = StubPrefixCache(lambda m, t, text: [1, ord(text[0])], min_tokens=4)
+    assert short.past_key_values("m", None, None, [1, 2, 3]) is None
+    assert short.prefills == 0
+
+    failing = StubPrefixCache(build_prompt_ids, fail=True)
+    prompt = build_prompt_ids("m", None, "hi")
+    assert failing.past_key_values("m", None, None, prompt) is None
+    assert failing.past_key_values("m", None, None, prompt) is None
+    assert failing.prefills == 1
+
+
+def test_a_real_dynamic_cache_is_copied_per_request():
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+
+    class DynamicPrefixCache(PrefixCache):
+        def _run_model(self, model, token_ids):
+            kv = transformers.DynamicCache()
+            kv.update(torch.zeros(1, 2, len(token_ids), 4), torch.zeros(1, 2, len(token_ids), 4), 0)
+            return kv
+
+    cache = DynamicPrefixCache(build_prompt_ids)
+    prompt = build_prompt_ids("m", None, "hi")
+    used = cache.past_key_values("m", None, None, prompt)
+    used.update(torch.ones(1, 2, 3, 4), torch.ones(1, 2, 3, 4), 0)
+
+    fresh = cache.past_key_values("m", None, None, prompt)
+    assert used.get_seq_length() == len(TEMPLATE) + 3
+    assert fresh.get_seq_length() == len(TEMPLATE)
+    assert fresh is not used
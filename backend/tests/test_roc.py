@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.services.roc import auc, downsample, roc_from_counts
+
+
+def _mann_whitney_auc(pos, neg):
+    wins = sum((p > n) + 0.5 * (p == n) for p in pos for n in neg)
+    return wins / (len(pos) * len(neg))
+
+
+def _counts(pos, neg):
+    thresholds = np.unique(np.concatenate((pos, neg)))
+    pos_counts = [int(np.sum(pos == t)) for t in thresholds]
+    neg_counts = [int(np.sum(neg == t)) for t in thresholds]
+    return thresholds, pos_counts, neg_counts
+
+
+def test_auc_matches_pairwise_definition_with_ties():
+    rng = np.random.default_rng(0)
+    pos = np.round(rng.normal(2.0, 1.0, 200), 1)
+    neg = np.round(rng.normal(0.0, 1.0, 150), 1)
+
+    fpr, tpr = roc_from_counts(*_counts(pos, neg))
+
+    assert (fpr[0], tpr[0]) == (0.0, 0.0)
+    assert (fpr[-1], tpr[-1]) == (1.0, 1.0)
+    assert np.all(np.diff(fpr) >= 0) and np.all(np.diff(tpr) >= 0)
+    assert abs(auc(fpr, tpr) - _mann_whitney_auc(pos, neg)) < 1e-9
+
+
+def test_threshold_order_does_not_matter():
+    fpr_a, tpr_a = roc_from_counts([1.0, 2.0, 3.0], [0, 2, 1], [1, 1, 0])
+    fpr_b, tpr_b = roc_from_counts([1.0, 3.0, 2.0], [0, 1, 2], [1, 0, 1])
+
+    np.testing.assert_allclose(fpr_a, fpr_b)
+    np.testing.assert_allclose(tpr_a, tpr_b)
+
+
+def test_downsample_keeps_endpoints():
+    fpr = np.linspace(0, 1, 1000)
+    points = downsample(fpr, fpr, 21)
+
+    assert len(points) == 21
+    assert points[0] == {"fpr": 0.0, "tpr": 0.0}
+    assert points[-1] == {"fpr": 1.0, "tpr": 1.0}
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.dashboard import METRIC_CONFIDENCE, METRIC_VERDICT, METRIC_Z_SCORE, AggregateRow
+from app.services.rollups import METRIC_ATTACKS, attack_rows, detection_rows, record
+
+
+def _det(is_watermarked, confidence, z_score):
+    return SimpleNamespace(is_watermarked=is_watermarked, confidence=confidence, z_score=z_score)
+
+
+def test_detection_rows_use_the_same_bins_as_the_sql_aggregate():
+    rows = detection_rows(
+        [
+            (_det(True, 1.0, 4.2), True),
+            (_det(True, 0.999, 4.2), True),
+            (_det(False, 0.2, -0.5), False),
+            (_det(False, None, None), False),
+        ]
+    )
+
+    assert sorted(rows) == sorted(
+        [
+            AggregateRow(METRIC_VERDICT, True, 1, 2),
+            AggregateRow(METRIC_VERDICT, False, 0, 2),
+            AggregateRow(METRIC_CONFIDENCE, True, 5, 2),
+            AggregateRow(METRIC_CONFIDENCE, False, 2, 1),
+            AggregateRow(METRIC_Z_SCORE, True, 420, 2),
+            AggregateRow(METRIC_Z_SCORE, False, -50, 1),
+        ]
+    )
+
+
+def test_attack_rows_count_per_ground_truth():
+    assert sorted(attack_rows([True, True, False])) == [
+        AggregateRow(METRIC_ATTACKS, False, 0, 1),
+        AggregateRow(METRIC_ATTACKS, True, 0, 2),
+    ]
+
+
+def test_record_upserts_in_key_order():
+    statements = []
+    db = SimpleNamespace(execute=statements.append)
+    rows = [
+        AggregateRow(METRIC_Z_SCORE, True, 3, 1),
+        AggregateRow(METRIC_VERDICT, False, 0, 1),
+        AggregateRow(METRIC_CONFIDENCE, True, 5, 1),
+        AggregateRow(METRIC_CONFIDENCE, False, 2, 1),
+    ]
+
+    record(db, rows)
+    record(db, reversed(rows))
+
+    orders = []
+    for stmt in statements:
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        orders.append(
+            [(params[f"metric_m{i}"], params[f"watermark_enabled_m{i}"], params[f"bucket_m{i}"]) for i in range(len(rows))]
+        )
+    assert orders[0] == orders[1] == sorted(orders[0])
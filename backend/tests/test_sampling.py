@@ -0,0 +1,41 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from app.services.sampling import SeededSampler  # noqa: E402
+
+VOCAB = 64
+
+
+def _draws(sampler, scores_per_step):
+    """Run ``sampler`` over fixed scores and return the token it picked per step and row."""
+    draws = []
+    input_ids = torch.zeros((scores_per_step[0].shape[0], 1), dtype=torch.long)
+    for scores in scores_per_step:
+        output = sampler(input_ids, scores)
+        # Exactly one finite score per row: the sampled token.
+        assert torch.isfinite(output).sum(dim=-1).tolist() == [1] * scores.shape[0]
+        draws.append(output.argmax(dim=-1).tolist())
+    return draws
+
+
+def test_a_row_samples_the_same_tokens_alone_and_in_a_batch():
+    generator = torch.Generator().manual_seed(0)
+    seeds = [11, 22, 33, 44]
+    steps = [torch.randn(len(seeds), VOCAB, generator=generator) for _ in range(20)]
+    options = {"temperature": 0.9, "top_k": 20, "top_p": 0.95}
+
+    batched = _draws(SeededSampler(seeds, **options), steps)
+    for row, seed in enumerate(seeds):
+        alone = _draws(SeededSampler([seed], **options), [scores[row:row + 1] for scores in steps])
+        assert [step[0] for step in alone] == [step[row] for step in batched]
+
+    # Another batch composition does not change the row either.
+    other = _draws(SeededSampler([99, 22], **options), [scores[[0, 1]] for scores in steps])
+    assert [step[1] for step in other] == [step[1] for step in batched]
+
+
+def test_different_seeds_sample_differently():
+    scores = [torch.zeros(2, VOCAB) for _ in range(20)]
+    draws = _draws(SeededSampler([1, 2], temperature=1.0, top_k=None, top_p=None), scores)
+    assert [step[0] for step in draws] != [step[1] for step in draws]
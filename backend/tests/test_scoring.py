@@ -0,0 +1,106 @@
+import numpy as np
+
+from app.services import scoring
+
+
+def test_pack_roundtrip():
+    rng = np.random.default_rng(0)
+    g_values = rng.integers(0, 2, size=(37, 3)).astype(np.uint8)
+    mask = rng.integers(0, 2, size=37).astype(bool)
+
+    row = scoring.g_values_row(7, {"g_values": g_values, "g_mask": mask, "z_score": 1.0})
+    assert row["detection_id"] == 7
+    assert (row["num_positions"], row["depth"]) == (37, 3)
+    # 37 * 3 bits -> 14 bytes
+    assert len(row["g_values"]) == 14
+
+    g_out, mask_out = scoring.unpack_g_values(row["g_values"], row["mask"], 37, 3)
+    assert np.array_equal(g_out, g_values)
+    assert np.array_equal(mask_out, mask)
+
+
+def test_g_values_row_pops_arrays_and_skips_empty():
+    result = {"g_values": np.zeros((2, 3)), "g_mask": np.ones(2, dtype=bool), "z_score": 0.0}
+    scoring.g_values_row(1, result)
+    assert result == {"z_score": 0.0}
+    assert scoring.g_values_row(1, {"z_score": 0.0}) is None
+
+
+def test_score_matches_mean_z_and_threshold():
+    g_all_ones = np.ones((100, 3))
+    g_half = np.tile([[1, 0, 1], [0, 1, 0]], (50, 1))
+    g_values, mask = scoring.stack(
+        [(g_all_ones, np.ones(100, dtype=bool)), (g_half, np.ones(100, dtype=bool)), (np.zeros((0, 3)), np.zeros(0, dtype=bool))]
+    )
+    results = scoring.score(g_values, mask, z_threshold=3.0)
+
+    # 300 ones out of 300: z = 0.5 / (0.5 / sqrt(300))
+    assert np.isclose(results[0]["z_score"], np.sqrt(300))
+    assert results[0]["is_watermarked"] is True
+    assert np.isclose(results[1]["z_score"], 0.0)
+    assert results[1]["is_watermarked"] is False
+    assert results[2] is None
+
+    # Masked positions do not count.
+    assert scoring.score(g_values, mask, z_threshold=100.0)[0]["is_watermarked"] is False
+
+
+def test_layer_weights_sum_to_depth_and_decrease():
+    weights = scoring.layer_weights(3)
+    assert np.isclose(weights.sum(), 3.0)
+    assert weights[0] > weights[1] > weights[2]
+
+
+def test_weighted_mean_z_is_standardised_under_the_null():
+    rng = np.random.default_rng(1)
+    g_values = rng.integers(0, 2, size=(2000, 200, 3)).astype(np.float64)
+    mask = np.ones((2000, 200), dtype=bool)
+    z_scores, _ = scoring.mean_z_scores(g_values, mask, scoring.layer_weights(3))
+    assert abs(z_scores.mean()) < 0.1
+    assert abs(z_scores.std() - 1.0) < 0.1
+
+
+def test_weighted_mean_favours_signal_in_early_layers():
+    g_values = np.zeros((1, 60, 3))
+    g_values[..., 0] = 1.0
+    g_values[..., 1] = np.tile([1.0, 0.0], 30)
+    mask = np.ones((1, 60), dtype=bool)
+
+    mean = scoring.score(g_values, mask, mode="mean")[0]
+    weighted = scoring.score(g_values, mask, mode="weighted_mean")[0]
+    assert weighted["scoring"] == "weighted_mean"
+    assert weighted["z_score"] > mean["z_score"]
+
+
+def test_bayesian_posterior():
+    mask = np.ones((2, 50), dtype=bool)
+    g_values = np.stack([np.ones((50, 3)), np.zeros((50, 3))])
+    posteriors = scoring.bayesian_posteriors(g_values, mask, prior=0.5, g_mean=0.6)
+    assert posteriors[0] > 0.99
+    assert posteriors[1] < 0.01
+
+    # Without evidence the posterior is the prior.
+    empty = scoring.bayesian_posteriors(g_values, np.zeros((2, 50), dtype=bool), prior=0.3, g_mean=0.6)
+    assert np.allclose(empty, 0.3)
+
+    results = scoring.score(g_values, mask, mode="bayesian")
+    assert results[0]["is_watermarked"] is True
+    assert results[0]["confidence"] == posteriors[0]
+    assert results[1]["is_watermarked"] is False
+
+
+def test_score_rows_in_chunks_matches_one_padded_batch():
+    rng = np.random.default_rng(2)
+    rows = []
+    for length in [5, 40, 0, 17, 33, 2, 29]:
+        g_values = rng.integers(0, 2, size=(length, 3)).astype(np.uint8)
+        rows.append((g_values, rng.integers(0, 2, size=length).astype(bool)))
+
+    g_values, mask = scoring.stack(rows)
+    assert g_values.dtype == np.uint8 and mask.dtype == bool
+    for mode in scoring.SCORING_MODES:
+        expected = scoring.score(g_values, mask, mode=mode)
+        chunked = scoring.score_rows(rows, mode=mode, chunk_size=3)
+        assert len(chunked) == len(rows)
+        for want, got in zip(expected, chunked):
+            assert (want is None and got is None) or got == {k: want[k] for k in got}
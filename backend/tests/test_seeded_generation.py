@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from app.services import ai  # noqa: E402
+
+PARAMS = {"model": "tiny-test-model", "watermark_enabled": False, "temperature": 1.0, "max_tokens": 12}
+
+
+class CharTokenizer:
+    """One token per character; enough for prompt building, padding and decoding."""
+
+    pad_token_id = 0
+    eos_token_id = 1
+
+    def encode(self, text):
+        return [2 + ord(c) % 250 for c in text]
+
+    def __call__(self, text):
+        return {"input_ids": self.encode(text)}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(ord("a") + int(i) % 26) for i in ids if not (skip_special_tokens and int(i) < 2))
+
+    def convert_tokens_to_ids(self, token):
+        return None
+
+
+def tiny_model():
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(
+        vocab_size=256,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=4,
+        max_position_embeddings=512,
+    )
+    return transformers.LlamaForCausalLM(config).eval()
+
+
+def test_a_seeded_request_samples_the_same_tokens_alone_and_alongside_others(monkeypatch):
+    model, tokenizer = tiny_model(), CharTokenizer()
+    monkeypatch.setattr(ai.llm_manager, "get_model", lambda name: (model, tokenizer))
+    submitted = []
+    submit = ai.generation_batcher.submit
+
+    async def recording_submit(key, item):
+        submitted.append(item)
+        return await submit(key, item)
+
+    monkeypatch.setattr(ai.generation_batcher, "submit", recording_submit)
+    prefixed = []
+    past_key_values = ai.prefix_cache.past_key_values
+
+    def recording_past_key_values(model_name, model, tokenizer, prompt_ids):
+        prefixed.append(list(prompt_ids))
+        return past_key_values(model_name, model, tokenizer, prompt_ids)
+
+    monkeypatch.setattr(ai.prefix_cache, "past_key_values", recording_past_key_values)
+
+    async def main():
+        alone = await ai.generate_text("the same prompt", {**PARAMS, "seed": 7})
+        # Unseeded requests are batched together and may reuse the prefix KV.
+        crowded = await asyncio.gather(
+            ai.generate_text("a much longer prompt that forces left padding", PARAMS),
+            ai.generate_text("the same prompt", {**PARAMS, "seed": 7}),
+            ai.generate_text("short", PARAMS),
+        )
+        return alone, crowded
+
+    alone, crowded = asyncio.run(main())
+
+    assert crowded[1]["token_ids"] == alone["token_ids"]
+    assert crowded[1]["output_text"] == alone["output_text"]
+    assert alone["seed"] == 7
+    # Only the unseeded requests went through the micro-batcher.
+    assert [text for text, _, _ in submitted] == ["a much longer prompt that forces left padding", "short"]
+    # ... and only they may start from the cached prompt prefix.
+    assert ai._build_prompt_ids(PARAMS["model"], tokenizer, "the same prompt") not in prefixed
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("torch")
+
+from app.services import ai  # noqa: E402
+from app.services.inference import InferencePool  # noqa: E402
+
+
+def test_closing_the_stream_stops_generation_and_frees_the_pool_slot(monkeypatch):
+    pool = InferencePool(max_workers=1, max_queue=0, retry_after=1)
+    stopped = threading.Event()
+
+    def fake_generate_stream(batch_key, input_text, max_tokens, seed, loop, queue, cancelled, reuse_prefix=True):
+        # Emits tokens until the consumer goes away, like model.generate with _CancelCriteria.
+        while not cancelled.wait(0.01):
+            loop.call_soon_threadsafe(queue.put_nowait, "tok ")
+        stopped.set()
+        return {"output_text": "", "token_ids": [], "seed": seed}
+
+    monkeypatch.setattr(ai, "inference_pool", pool)
+    monkeypatch.setattr(ai, "_generate_stream", fake_generate_stream)
+    monkeypatch.setattr(ai, "_generation_batch_key", lambda params: ("model",))
+
+    async def main():
+        events = ai.generate_text_stream("hello", {"seed": 1})
+        assert await events.__anext__() == ("token", "tok ")
+        # What the SSE endpoint does when the client disconnects.
+        await events.aclose()
+        assert await asyncio.to_thread(stopped.wait, 5)
+        for _ in range(100):
+            if pool.stats()["running"] == 0 and pool.stats()["queued"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        # The slot is free for the next request.
+        assert await pool.run(lambda: "next") == "next"
+
+    asyncio.run(main())
+    assert pool.stats()["rejected"] == 0
+    pool.shutdown()
@@ -0,0 +1,24 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.sweeps import MAX_SWEEP_VARIANTS, SweepCreate
+
+
+def test_sweep_grid_validation():
+    sweep = SweepCreate(generation_ids=[1, 2], attack_types=["deletion", "word_swap"], intensities=[0, 10, 50])
+    assert sweep.scoring == "mean"
+
+    with pytest.raises(ValidationError):
+        SweepCreate(generation_ids=[1], attack_types=["deletion"], intensities=[120])
+    with pytest.raises(ValidationError):
+        SweepCreate(generation_ids=[1], attack_types=["rot13"], intensities=[10])
+
+
+def test_sweep_variant_cap_counts_unique_values():
+    ids = list(range(500))
+    intensities = [float(i) for i in range(21)]
+    # Duplicates do not create extra variants.
+    SweepCreate(generation_ids=ids + ids, attack_types=["deletion", "deletion"], intensities=intensities)
+    assert 500 * 2 * 21 > MAX_SWEEP_VARIANTS
+    with pytest.raises(ValidationError):
+        SweepCreate(generation_ids=ids, attack_types=["deletion", "swap"], intensities=intensities)
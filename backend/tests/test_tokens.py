@@ -0,0 +1,49 @@
+from app.services.tokens import TokenCache, pack_token_ids, unpack_token_ids
+
+
+class FakeTokenizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return {"input_ids": [[ord(c) for c in text] for text in texts]}
+
+
+def test_pack_round_trip():
+    assert unpack_token_ids(pack_token_ids([1, 128000, 42])) == [1, 128000, 42]
+    assert unpack_token_ids(None) is None
+
+
+def test_encode_many_tokenizes_misses_once_in_one_call():
+    cache = TokenCache(max_entries=8)
+    tokenizer = FakeTokenizer()
+
+    first = cache.encode_many("m", tokenizer, ["ab", "cd"])
+    second = cache.encode_many("m", tokenizer, ["cd", "ab", "ef"])
+
+    assert first == [[97, 98], [99, 100]]
+    assert second == [[99, 100], [97, 98], [101, 102]]
+    assert tokenizer.calls == [["ab", "cd"], ["ef"]]
+    assert cache.stats()["hits"] == 2
+
+
+def test_known_ids_skip_the_tokenizer_and_fill_the_cache():
+    cache = TokenCache(max_entries=8)
+    tokenizer = FakeTokenizer()
+
+    assert cache.encode_many("m", tokenizer, ["ab"], known=[[7, 8]]) == [[7, 8]]
+    assert cache.encode_many("m", tokenizer, ["ab"]) == [[7, 8]]
+    assert tokenizer.calls == []
+
+
+def test_cache_is_bounded_and_per_tokenizer():
+    cache = TokenCache(max_entries=1)
+    tokenizer = FakeTokenizer()
+
+    cache.encode_many("m", tokenizer, ["ab"])
+    cache.encode_many("other", tokenizer, ["ab"])
+    cache.encode_many("m", tokenizer, ["ab"])
+
+    assert len(tokenizer.calls) == 3
+    assert cache.stats()["size"] == 1
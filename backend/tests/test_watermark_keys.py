@@ -0,0 +1,62 @@
+import logging
+
+import pytest
+
+from app.models.watermark_key import WatermarkKey
+from app.services.watermark_keys import DEFAULT_SECRET, KeyRegistry, check_secret, hkdf_keys, legacy_keys
+
+
+def test_hkdf_keys_separate_anagrams_unlike_the_legacy_scheme():
+    assert legacy_keys("ab", 3) == legacy_keys("ba", 3)
+    assert hkdf_keys("ab", 3, "s") != hkdf_keys("ba", 3, "s")
+    assert hkdf_keys("ab", 3, "s") != hkdf_keys("ab", 3, "other secret")
+    keys = hkdf_keys("ab", 30, "s")
+    assert len(set(keys)) == 30 and all(0 <= k < 2**62 for k in keys)
+
+
+def test_lookups_derive_in_memory_and_never_touch_the_database():
+    def no_database():
+        raise AssertionError("lookups must not open a session")
+
+    registry = KeyRegistry("s", no_database, max_size=2)
+    keys = registry.get("tenant-a", 3, "hkdf")
+    assert keys == hkdf_keys("tenant-a", 3, "s")
+    assert registry.get("tenant-a", 3, "hkdf") is keys
+    registry.get("tenant-b", 3, "hkdf")
+    registry.get("tenant-c", 3, "hkdf")
+    assert registry.stats() == {"size": 2, "max_size": 2, "pinned": 0, "hits": 1, "misses": 3}
+
+
+def test_persisted_keys_survive_a_secret_rotation(session_factory):
+    registry = KeyRegistry("first", session_factory)
+    with session_factory() as db:
+        registry.persist(db, ["tenant-a"], 3)
+        registry.persist(db, ["tenant-a", "tenant-b"], 3)
+        db.commit()
+        assert db.query(WatermarkKey).count() == 2
+
+    # Stored keys the current secret still derives are not kept in memory.
+    assert KeyRegistry("first", session_factory).load() == 0
+
+    # A new process with a rotated secret pins the stored keys.
+    rotated = KeyRegistry("second", session_factory)
+    assert rotated.load() == 2
+    assert rotated.get("tenant-a", 3, "hkdf") == hkdf_keys("tenant-a", 3, "first")
+    assert rotated.get("tenant-c", 3, "hkdf") == hkdf_keys("tenant-c", 3, "second")
+
+
+def test_legacy_keys_are_not_stored(session_factory):
+    registry = KeyRegistry("s", session_factory)
+    assert registry.get("12345", 3, "legacy") == legacy_keys("12345", 3)
+    assert registry.load() == 0
+    with pytest.raises(ValueError):
+        registry.get("12345", 3, "nope")
+
+
+def test_the_placeholder_secret_is_reported(caplog):
+    with caplog.at_level(logging.WARNING, logger="app.services.watermark_keys"):
+        assert check_secret("hkdf", "a-real-secret") is True
+        assert check_secret("legacy", DEFAULT_SECRET) is True
+        assert not caplog.records
+        assert check_secret("hkdf", DEFAULT_SECRET) is False
+    assert "WATERMARK_KEY_SECRET" in caplog.text